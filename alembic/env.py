@@ -1,4 +1,3 @@
-import os
 from logging.config import fileConfig
 
 from sqlalchemy import engine_from_config, create_engine
@@ -19,6 +18,7 @@ if config.config_file_name is not None:
 # for 'autogenerate' support
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
+from src.configs.feed import DatabaseSettings
 from src.domains.feed import Base
 target_metadata = Base.metadata
 
@@ -32,17 +32,23 @@ def get_url() -> str:
     """
     Define and return the url for the sqlalchemy.url
 
+    Read as by the app: DATABASE_URL if defined, else an url built from the
+    POSTGRES_* variables.
+
     Returns:
         sqlalchemy.url
     """
-    postgres_user = os.getenv("POSTGRES_USER", "postgres")
-    postgres_password = os.getenv("POSTGRES_PASSWORD", "SuperSecret")
-    postgres_db = os.getenv("POSTGRES_DB", "simple_feed_db")
-    postgres_host = os.getenv("POSTGRES_HOST", "database")
-    postgres_port = os.getenv("POSTGRES_PORT", 5432)
+    return DatabaseSettings().url
+
+
+def include_object(obj, name, type_, reflected, compare_to) -> bool:
+    """
+    Skip the database objects maintained outside of the models.
 
-    return f"postgresql://{postgres_user}:{postgres_password}" \
-           f"@{postgres_host}:{postgres_port}/{postgres_db}"
+    Returns:
+        False for the full-text search column and index of feeds
+    """
+    return name not in ("search_vector", "ix_feed_search_vector")
 
 
 def run_migrations_offline():
@@ -61,6 +67,7 @@ def run_migrations_offline():
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -80,7 +87,9 @@ def run_migrations_online():
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
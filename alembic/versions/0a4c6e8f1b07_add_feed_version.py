@@ -0,0 +1,29 @@
+"""Add feed version
+
+Revision ID: 0a4c6e8f1b07
+Revises: f3b8d0e4a706
+Create Date: 2022-05-23 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0a4c6e8f1b07'
+down_revision = 'f3b8d0e4a706'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'feed_version',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('feed_version')
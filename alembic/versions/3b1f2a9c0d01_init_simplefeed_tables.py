@@ -0,0 +1,31 @@
+"""Init simplefeed tables
+
+Revision ID: 3b1f2a9c0d01
+Revises:
+Create Date: 2022-04-01 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b1f2a9c0d01'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'feed',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('origin', sa.String(length=25), nullable=True),
+        sa.Column('event', sa.String(length=25), nullable=True),
+        sa.Column('description', sa.String(length=255), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('feed')
@@ -0,0 +1,40 @@
+"""Add feed stats delta
+
+Revision ID: 6d2e9a1c3f08
+Revises: 0a4c6e8f1b07
+Create Date: 2022-05-30 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6d2e9a1c3f08'
+down_revision = '0a4c6e8f1b07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'feed_stats_delta',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('bucket', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('origin', sa.String(length=25), nullable=False),
+        sa.Column('event', sa.String(length=25), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    # Fold the pending counts first, as the providers do.
+    op.execute(
+        "INSERT INTO feed_stats (bucket, origin, event, count) "
+        "SELECT bucket, origin, event, sum(count) FROM feed_stats_delta "
+        "GROUP BY bucket, origin, event "
+        "ON CONFLICT (bucket, origin, event) "
+        "DO UPDATE SET count = feed_stats.count + excluded.count"
+    )
+    op.drop_table('feed_stats_delta')
@@ -0,0 +1,42 @@
+"""Add feed created_at
+
+Revision ID: 7c4e5d6f8a02
+Revises: 3b1f2a9c0d01
+Create Date: 2022-04-20 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c4e5d6f8a02'
+down_revision = '3b1f2a9c0d01'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'feed',
+        sa.Column(
+            'created_at',
+            sa.DateTime(timezone=True),
+            server_default=sa.text('now()'),
+            nullable=False,
+        )
+    )
+    # Build the index without locking writes on the feed table.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f('ix_feed_created_at'),
+            'feed',
+            ['created_at'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    op.drop_index(op.f('ix_feed_created_at'), table_name='feed')
+    op.drop_column('feed', 'created_at')
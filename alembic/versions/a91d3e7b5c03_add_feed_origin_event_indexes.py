@@ -0,0 +1,39 @@
+"""Add feed origin and event indexes
+
+Revision ID: a91d3e7b5c03
+Revises: 7c4e5d6f8a02
+Create Date: 2022-04-25 10:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a91d3e7b5c03'
+down_revision = '7c4e5d6f8a02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Build the indexes without locking writes on the feed table.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_feed_origin_id',
+            'feed',
+            ['origin', 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_feed_event_id',
+            'feed',
+            ['event', 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    op.drop_index('ix_feed_event_id', table_name='feed')
+    op.drop_index('ix_feed_origin_id', table_name='feed')
@@ -0,0 +1,39 @@
+"""Add feed search vector
+
+Revision ID: d2f6b8c1e404
+Revises: a91d3e7b5c03
+Create Date: 2022-05-02 10:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2f6b8c1e404'
+down_revision = 'a91d3e7b5c03'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Adding a stored generated column rewrites the table once.
+    op.execute(
+        "ALTER TABLE feed ADD COLUMN search_vector tsvector "
+        "GENERATED ALWAYS AS "
+        "(to_tsvector('simple', coalesce(description, ''))) STORED"
+    )
+    # Build the index without locking writes on the feed table.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_feed_search_vector',
+            'feed',
+            ['search_vector'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    op.drop_index('ix_feed_search_vector', table_name='feed')
+    op.drop_column('feed', 'search_vector')
@@ -0,0 +1,100 @@
+"""Partition feed by created_at
+
+Revision ID: e5a7c9d2f605
+Revises: d2f6b8c1e404
+Create Date: 2022-05-09 10:00:00.000000
+
+The existing table becomes the first partition, `feed_legacy`, holding
+every feed created before the next UTC midnight: no row is copied. The
+rest of that month and the next month get their partitions, the next ones
+are created by `python -m src.commands.feed partitions`. There is no
+default partition: a feed outside of every partition can't be inserted.
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a7c9d2f605'
+down_revision = 'd2f6b8c1e404'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_feed_created_at', 'btree', 'created_at'),
+    ('ix_feed_origin_id', 'btree', 'origin, id'),
+    ('ix_feed_event_id', 'btree', 'event, id'),
+    ('ix_feed_search_vector', 'gin', 'search_vector'),
+]
+
+
+def create_indexes():
+    """Create the indexes of the feed table."""
+    for name, method, columns in INDEXES:
+        op.execute(f"CREATE INDEX {name} ON feed USING {method} ({columns})")
+
+
+def upgrade():
+    op.execute("ALTER TABLE feed RENAME TO feed_legacy")
+    op.execute("ALTER INDEX feed_pkey RENAME TO feed_legacy_pkey")
+    for name, _, _ in INDEXES:
+        op.execute(f"ALTER INDEX {name} RENAME TO "
+                   f"{name.replace('ix_feed_', 'ix_feed_legacy_')}")
+
+    op.execute(
+        "CREATE TABLE feed ("
+        "id integer NOT NULL DEFAULT nextval('feed_id_seq'::regclass), "
+        "origin varchar(25), "
+        "event varchar(25), "
+        "description varchar(255), "
+        "created_at timestamp with time zone NOT NULL DEFAULT now(), "
+        "search_vector tsvector GENERATED ALWAYS AS "
+        "(to_tsvector('simple', coalesce(description, ''))) STORED, "
+        "CONSTRAINT feed_pkey PRIMARY KEY (id, created_at)"
+        ") PARTITION BY RANGE (created_at)"
+    )
+    op.execute("ALTER SEQUENCE feed_id_seq OWNED BY feed.id")
+
+    # Attaching validates the bound with one scan of the legacy table. The
+    # next partitions are named by their start, as the maintenance command
+    # names them.
+    op.execute(
+        "DO $$ DECLARE upper_bound timestamptz; month_end timestamptz; "
+        "BEGIN "
+        "SELECT (date_trunc('day', greatest(max(created_at), now()) "
+        "AT TIME ZONE 'UTC') + interval '1 day') AT TIME ZONE 'UTC' "
+        "INTO upper_bound FROM feed_legacy; "
+        "EXECUTE format('ALTER TABLE feed ATTACH PARTITION feed_legacy "
+        "FOR VALUES FROM (MINVALUE) TO (%L)', upper_bound); "
+        "month_end := (date_trunc('month', upper_bound AT TIME ZONE 'UTC') "
+        "+ interval '1 month') AT TIME ZONE 'UTC'; "
+        "EXECUTE format('CREATE TABLE %I PARTITION OF feed "
+        "FOR VALUES FROM (%L) TO (%L)', "
+        "'feed_p' || to_char(upper_bound AT TIME ZONE 'UTC', 'YYYYMMDD'), "
+        "upper_bound, month_end); "
+        "EXECUTE format('CREATE TABLE %I PARTITION OF feed "
+        "FOR VALUES FROM (%L) TO (%L)', "
+        "'feed_p' || to_char(month_end AT TIME ZONE 'UTC', 'YYYYMMDD'), "
+        "month_end, (date_trunc('month', month_end AT TIME ZONE 'UTC') "
+        "+ interval '1 month') AT TIME ZONE 'UTC'); "
+        "END $$"
+    )
+    # Existing equivalent indexes of feed_legacy are attached, not rebuilt.
+    create_indexes()
+
+
+def downgrade():
+    op.execute(
+        "CREATE TABLE feed_unpartitioned "
+        "(LIKE feed INCLUDING DEFAULTS INCLUDING GENERATED)"
+    )
+    op.execute(
+        "INSERT INTO feed_unpartitioned "
+        "(id, origin, event, description, created_at) "
+        "SELECT id, origin, event, description, created_at FROM feed"
+    )
+    op.execute("ALTER SEQUENCE feed_id_seq OWNED BY feed_unpartitioned.id")
+    op.execute("DROP TABLE feed")
+    op.execute("ALTER TABLE feed_unpartitioned RENAME TO feed")
+    op.execute("ALTER TABLE feed ADD CONSTRAINT feed_pkey PRIMARY KEY (id)")
+    create_indexes()
@@ -0,0 +1,39 @@
+"""Add feed stats
+
+Revision ID: f3b8d0e4a706
+Revises: e5a7c9d2f605
+Create Date: 2022-05-16 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b8d0e4a706'
+down_revision = 'e5a7c9d2f605'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'feed_stats',
+        sa.Column('bucket', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('origin', sa.String(length=25), nullable=False),
+        sa.Column('event', sa.String(length=25), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('bucket', 'origin', 'event')
+    )
+    # Count the existing feeds once, the providers maintain it afterwards.
+    op.execute(
+        "INSERT INTO feed_stats (bucket, origin, event, count) "
+        "SELECT date_trunc('hour', created_at AT TIME ZONE 'UTC') "
+        "AT TIME ZONE 'UTC', origin, event, count(*) "
+        "FROM feed WHERE origin IS NOT NULL AND event IS NOT NULL "
+        "GROUP BY 1, 2, 3"
+    )
+
+
+def downgrade():
+    op.drop_table('feed_stats')
@@ -0,0 +1 @@
+"""Init for simple-feed."""
@@ -0,0 +1,266 @@
+"""
+Benchmark: websocket connections.
+
+Open 10000 idle websocket clients at once, then measure:
+- the memory each connection holds;
+- the fan-out of one new feed to all of them;
+- the refusal of the clients beyond `WS_MAX_CONNECTIONS`;
+- the memory left once they are gone.
+
+By default `main.app` is driven in-process through ASGI against a
+temporary SQLite database. Python allocations are traced, which leaves out
+the sockets and the websocket protocol of the server:
+
+    python -m benchmarks.connections --clients 10000
+
+Against a running server, the clients are real sockets. The memory is the
+resident memory of the worker read from /metrics, so run a single worker
+and raise the open files limit of the client:
+
+    python -m src.commands.serve --port 8000 &
+    ulimit -n 20000
+    python -m benchmarks.connections --url ws://127.0.0.1:8000/ws
+
+The result is printed as JSON.
+"""
+import argparse
+import asyncio
+import gc
+import importlib
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.request
+from typing import Any, Dict, List, Optional
+
+import websockets
+
+from benchmarks.api import WebSocketClient, http, new_feed, percentile, seed
+
+# Close code of the clients beyond the connection cap, see main.py
+TRY_AGAIN_LATER = 1013
+
+
+def traced_memory() -> int:
+    """Return the bytes allocated by Python, once garbage is collected."""
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def per_connection(before: float, after: float, connections: int) -> float:
+    """Return the memory held by each connection, in bytes."""
+    return (after - before) / connections if connections else 0.0
+
+
+def latencies_ms(latencies: List[float]) -> Dict[str, float]:
+    """Return the p50/p99/max of latencies in seconds, in milliseconds."""
+    latencies = sorted(latencies)
+    return {
+        "p50": percentile(latencies, 50) * 1000,
+        "p99": percentile(latencies, 99) * 1000,
+        "max": (latencies[-1] if latencies else 0.0) * 1000,
+    }
+
+
+async def gather_chunks(calls: List[Any], concurrency: int) -> List[Any]:
+    """Await coroutines `concurrency` at a time, return their results."""
+    results = []
+    for start in range(0, len(calls), concurrency):
+        results.extend(await asyncio.gather(
+            *calls[start:start + concurrency], return_exceptions=True))
+    return results
+
+
+async def in_process(args: argparse.Namespace) -> Dict[str, Any]:
+    """Open the clients against `main.app`, through ASGI."""
+    seed(args.database_url, rows=0)
+    # Settings are read when main is imported.
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("WS_MAX_CONNECTIONS", str(args.clients))
+    os.environ.update(dict(item.split("=", 1) for item in args.env))
+    main = importlib.import_module("main")
+    app = main.app
+
+    # The clients are created first: only the server side is measured.
+    sockets = [
+        WebSocketClient(app=app, path="/ws", query=args.query)
+        for _ in range(args.clients + args.extra)
+    ]
+    await app.router.startup()
+    tracemalloc.start()
+    try:
+        before = traced_memory()
+        start = time.perf_counter()
+        await gather_chunks(
+            [socket.connect() for socket in sockets], args.concurrency)
+        opened = time.perf_counter() - start
+        # Let every handler reach its wait for new feeds.
+        await asyncio.sleep(0.5)
+        connected = [
+            socket for socket in sockets if socket.close_code is None]
+        held = traced_memory()
+
+        start = time.perf_counter()
+        status, content = await http(
+            app, "POST", "/feed/", body=json.dumps(new_feed()).encode())
+        feed_id = json.loads(content)["id"] if status < 400 else None
+        deadline = start + args.timeout
+        while time.perf_counter() < deadline and any(
+                feed_id not in socket.received for socket in connected):
+            await asyncio.sleep(0.01)
+        delivered = [
+            socket.received[feed_id] - start
+            for socket in connected if feed_id in socket.received
+        ]
+
+        await gather_chunks(
+            [socket.close() for socket in connected], args.concurrency)
+        await asyncio.sleep(0.5)
+        released = traced_memory()
+        leaked = len(main.FEED_HUB.subscribers)
+    finally:
+        tracemalloc.stop()
+        await app.router.shutdown()
+
+    return {
+        "mode": "in-process",
+        "clients": len(sockets),
+        "connected": len(connected),
+        "rejected": sum(
+            socket.close_code == TRY_AGAIN_LATER for socket in sockets),
+        "connect_per_second": len(sockets) / opened if opened else 0.0,
+        "memory": {
+            "traced_bytes_per_connection": per_connection(
+                before, held, len(connected)),
+            "traced_bytes_left_after_close": released - before,
+        },
+        "fan_out": {
+            "delivered": len(delivered),
+            "missed": len(connected) - len(delivered),
+            "latency_ms": latencies_ms(delivered),
+        },
+        "subscribers_left": leaked,
+    }
+
+
+def read_resident_memory(url: str) -> Optional[float]:
+    """Return the resident memory of the server, read from its metrics."""
+    with urllib.request.urlopen(f"{url}/metrics") as response:
+        for line in response.read().decode().splitlines():
+            if line.startswith("process_resident_memory_bytes "):
+                return float(line.split()[1])
+    return None
+
+
+def create_feed(url: str) -> None:
+    """Create a feed on the server."""
+    request = urllib.request.Request(
+        f"{url}/feed/",
+        data=json.dumps(new_feed()).encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    urllib.request.urlopen(request).close()
+
+
+async def over_network(args: argparse.Namespace) -> Dict[str, Any]:
+    """Open the clients against a running server, through sockets."""
+    url = f"{args.url}?{args.query}" if args.query else args.url
+    http_url = args.url.replace("ws", "http", 1).rsplit("/", 1)[0]
+    loop = asyncio.get_running_loop()
+    before = await loop.run_in_executor(None, read_resident_memory, http_url)
+
+    start = time.perf_counter()
+    results = await gather_chunks(
+        [websockets.connect(url, ping_interval=None)
+         for _ in range(args.clients + args.extra)],
+        args.concurrency)
+    opened = time.perf_counter() - start
+    sockets = [
+        result for result in results if not isinstance(result, Exception)]
+    # Refused clients are closed right after the handshake.
+    await asyncio.sleep(1.0)
+    connected = [socket for socket in sockets if socket.close_code is None]
+    held = await loop.run_in_executor(None, read_resident_memory, http_url)
+
+    start = time.perf_counter()
+    await loop.run_in_executor(None, create_feed, http_url)
+
+    async def first_feed(socket) -> float:
+        await asyncio.wait_for(socket.recv(), timeout=args.timeout)
+        return time.perf_counter() - start
+
+    delivered = [
+        latency for latency in await gather_chunks(
+            [first_feed(socket) for socket in connected], len(connected) or 1)
+        if not isinstance(latency, Exception)
+    ]
+
+    await gather_chunks(
+        [socket.close() for socket in sockets], args.concurrency)
+    await asyncio.sleep(1.0)
+    released = await loop.run_in_executor(None, read_resident_memory, http_url)
+
+    memory = {}
+    if None not in (before, held, released):
+        memory = {
+            "resident_bytes_per_connection": per_connection(
+                before, held, len(connected)),
+            "resident_bytes_left_after_close": released - before,
+        }
+    return {
+        "mode": "network",
+        "clients": args.clients + args.extra,
+        "failed": len(results) - len(sockets),
+        "connected": len(connected),
+        "rejected": sum(
+            socket.close_code == TRY_AGAIN_LATER for socket in sockets),
+        "connect_per_second": len(results) / opened if opened else 0.0,
+        "memory": memory,
+        "fan_out": {
+            "delivered": len(delivered),
+            "missed": len(connected) - len(delivered),
+            "latency_ms": latencies_ms(delivered),
+        },
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the benchmark, return the exit status."""
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n\n")[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=10000,
+                        help="clients within the connection cap")
+    parser.add_argument("--extra", type=int, default=100,
+                        help="clients beyond the cap, expected to be refused")
+    parser.add_argument("--concurrency", type=int, default=500,
+                        help="clients connecting at once")
+    parser.add_argument("--query", default="delivery=single",
+                        help="query string of the clients")
+    parser.add_argument("--timeout", type=float, default=30.0,
+                        help="seconds to wait for the feed on every client")
+    parser.add_argument("--url", help="websocket url of a running server, "
+                                      "in-process if not set")
+    parser.add_argument("--database-url", help="temporary SQLite if not set")
+    parser.add_argument("--env", nargs="*", default=[], metavar="KEY=VALUE",
+                        help="settings of the app, in-process")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.url:
+            result = asyncio.run(over_network(args))
+        else:
+            if args.database_url is None:
+                args.database_url = f"sqlite:///{directory}/benchmark.db"
+            result = asyncio.run(in_process(args))
+
+    print(json.dumps(result, indent=2))
+    return 0 if result["fan_out"]["missed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Benchmark: feed serialization.
+
+Compare rows/sec of the validated path (pydantic DTOs validated by the
+provider then by the response_model) with the trusted path (`construct`
+and FeedJSONResponse).
+
+    python -m benchmarks.serialization --rows 10000 --repeat 5
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Callable, Dict, List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from src.apis.feed import FeedJSONResponse
+from src.domains.feed import FeedDetail
+
+RESPONSE_FIELD = create_response_field(
+    name="Response_read_feeds", type_=List[FeedDetail])
+
+
+def make_rows(count: int) -> List[Dict[str, Any]]:
+    """Return rows as read from the database."""
+    return [{
+        "id": i,
+        "origin": f"github.com_{i % 25}",
+        "event": "New repository",
+        "description": f"A new repository 'repo-{i}' has been created ...",
+    } for i in range(1, count + 1)]
+
+
+async def validated(rows: List[Dict[str, Any]]) -> bytes:
+    """Current path: validate rows, then validate the response model."""
+    feeds = [FeedDetail(
+        id=row["id"],
+        origin=row["origin"],
+        event=row["event"],
+        description=row["description"],
+    ) for row in rows]
+    content = await serialize_response(
+        field=RESPONSE_FIELD, response_content=feeds)
+    return JSONResponse(content=content).body
+
+
+async def trusted(rows: List[Dict[str, Any]]) -> bytes:
+    """Trusted path: build DTOs without validation, serialize them."""
+    feeds = [FeedDetail.construct(
+        id=row["id"],
+        origin=row["origin"],
+        event=row["event"],
+        description=row["description"],
+    ) for row in rows]
+    return FeedJSONResponse(content=feeds).body
+
+
+async def measure(
+        path: Callable[[List[Dict[str, Any]]], Any],
+        rows: List[Dict[str, Any]],
+        repeat: int
+) -> float:
+    """Return the best rows/sec over repeat runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await path(rows)
+        best = min(best, time.perf_counter() - start)
+    return len(rows) / best
+
+
+async def main(rows_count: int, repeat: int) -> Dict[str, Any]:
+    """Run the benchmark."""
+    rows = make_rows(rows_count)
+    assert json.loads(await validated(rows)) == json.loads(
+        await trusted(rows))
+
+    result = {
+        "rows": rows_count,
+        "validated_rows_per_sec": await measure(validated, rows, repeat),
+        "trusted_rows_per_sec": await measure(trusted, rows, repeat),
+    }
+    result["speedup"] = \
+        result["trusted_rows_per_sec"] / result["validated_rows_per_sec"]
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main(args.rows, args.repeat)), indent=2))
@@ -1,23 +1,169 @@
 """simplefeed.cloud API."""
 import asyncio
-from typing import List
+import datetime
+import math
+from typing import Any, List, Literal, Optional
 
-from fastapi import FastAPI, HTTPException, Request, WebSocket
-from fastapi.responses import HTMLResponse
+from fastapi import Body, Depends, FastAPI, Header, HTTPException, Query, \
+    Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import HTMLResponse, PlainTextResponse, \
+    StreamingResponse
 from fastapi.templating import Jinja2Templates
-from websockets.exceptions import ConnectionClosedOK
+from websockets.exceptions import ConnectionClosed
 
+from src.apis.feed import FeedJSONResponse, LatestFeedsFragment, dumps, \
+    SSE_HEARTBEAT, server_sent_event
+from src.apis.metrics import MetricsMiddleware
 from src.applications.feed import ReadFeeds, ReadFeedById, \
-    CreateNewFeedAndReadFeedByID
-from src.domains.feed import FeedDetail, FeedCreateError, Feed
-from src.providers.feed import SimpleFeedProvider
+    CreateNewFeedAndReadFeedByID, ReadFeedsPage, ExportFeeds, CreateNewFeeds, \
+    ReadFeedsVersion, SearchFeeds, ReadFeedStats, ResumeFeeds
+from src.configs.feed import FeedHubSettings, FeedBrokerSettings, \
+    RootPageSettings, FeedProviderSettings, MetricsSettings, \
+    FeedStreamSettings
+from src.core.feed import FeedHub, FeedSubscriber, batch_feeds, \
+    heartbeat_feeds
+from src.core.metrics import MetricsRegistry, resident_memory
+from src.domains.feed import FeedDetail, FeedCreateError, Feed, PoolStats, \
+    FeedCursor, FeedCursorError, FeedBatchResult, CacheStats, FeedSearchHit, \
+    FeedSearchCursor, FeedStats, FeedReplayError, SubscriberStats, \
+    FeedSubscription, FeedSubscriptionError, FeedCapacityError, FeedPartition
+from src.interfaces.feed import SimpleFeedInterface
+from src.providers.feed import SimpleFeedProvider, InMemoryFeedBroker, \
+    PostgresFeedBroker, CachedFeedProvider, READ_FROM_PRIMARY, \
+    InMemoryFeedProvider
 
 # Define provider for dependency injection
+PROVIDER_SETTINGS = FeedProviderSettings()
 DB_PROVIDER = SimpleFeedProvider()
+FEED_PROVIDER: SimpleFeedInterface = DB_PROVIDER
+if PROVIDER_SETTINGS.feed_provider == "memory":
+    FEED_PROVIDER = InMemoryFeedProvider()
+elif DB_PROVIDER.settings.cache_enabled:
+    FEED_PROVIDER = CachedFeedProvider(
+        feed_provider=DB_PROVIDER,
+        max_size=DB_PROVIDER.settings.cache_max_size,
+        ttl=DB_PROVIDER.settings.cache_ttl,
+        negative_ttl=DB_PROVIDER.settings.cache_negative_ttl,
+    )
+
+# Define hub broadcasting new feeds to websocket clients
+HUB_SETTINGS = FeedHubSettings()
+FEED_HUB = FeedHub(
+    queue_size=HUB_SETTINGS.ws_queue_size,
+    policy=HUB_SETTINGS.ws_slow_consumer_policy,
+    max_topics=HUB_SETTINGS.ws_max_topics,
+    max_subscribers=HUB_SETTINGS.ws_max_connections,
+)
+
+# Define the Server-Sent Events stream of new feeds, fed by the same hub
+STREAM_SETTINGS = FeedStreamSettings()
+
+# Define broker delivering new feeds to the hub of every worker
+BROKER_SETTINGS = FeedBrokerSettings()
+if BROKER_SETTINGS.broker == "postgres":
+    FEED_BROKER = PostgresFeedBroker(
+        dsn=DB_PROVIDER.DATABASE_URL,
+        channel=BROKER_SETTINGS.broker_channel,
+        batch_delay=BROKER_SETTINGS.broker_batch_delay,
+        batch_size=BROKER_SETTINGS.broker_batch_size,
+        max_pending=BROKER_SETTINGS.broker_max_pending,
+        reconnect_delay=BROKER_SETTINGS.broker_reconnect_delay,
+        health_interval=BROKER_SETTINGS.broker_health_interval,
+    )
+else:
+    FEED_BROKER = InMemoryFeedBroker()
+FEED_BROKER.subscribe(FEED_HUB.publish)
+
+# Define the metrics of requests, queries and websocket broadcast
+METRICS_SETTINGS = MetricsSettings()
+METRICS = MetricsRegistry()
+if METRICS_SETTINGS.metrics_enabled:
+    DB_QUERY_LATENCY = METRICS.histogram(
+        "db_query_duration_seconds",
+        "Latency of database queries per provider operation.",
+        labels=("operation",))
+    DB_ACQUIRE_LATENCY = METRICS.histogram(
+        "db_pool_acquire_duration_seconds",
+        "Wait for a connection of the database pool.",
+        labels=("database",))
+    DB_PROVIDER.query_hooks.append(
+        lambda operation, seconds: DB_QUERY_LATENCY.observe(
+            operation, value=seconds))
+    DB_PROVIDER.acquire_hooks.append(
+        lambda database, seconds: DB_ACQUIRE_LATENCY.observe(
+            database, value=seconds))
+    METRICS.gauge(
+        "db_pool_connections_in_use",
+        "Connections of the primary pool in use.",
+        collect=lambda: DB_PROVIDER.pool_stats().in_use)
+    METRICS.gauge(
+        "websocket_connections",
+        "Subscribers of the feed hub, e.g. websocket clients.",
+        collect=lambda: len(FEED_HUB.subscribers))
+    METRICS.gauge(
+        "feed_hub_queued_feeds",
+        "Feeds queued for the subscribers of the feed hub.",
+        collect=lambda: sum(
+            subscriber.queue.qsize() for subscriber in FEED_HUB.subscribers))
+    METRICS.gauge(
+        "feed_hub_queue_depth_max",
+        "Feeds queued for the most behind subscriber of the feed hub.",
+        collect=lambda: max((
+            subscriber.queue.qsize() for subscriber in FEED_HUB.subscribers
+        ), default=0))
+    METRICS.counter(
+        "websocket_feeds_sent_total",
+        "Feeds sent to the subscribers of the feed hub.",
+        collect=lambda: FEED_HUB.sent_totals().feeds)
+    METRICS.counter(
+        "websocket_frames_sent_total",
+        "Frames sent to the subscribers of the feed hub.",
+        collect=lambda: FEED_HUB.sent_totals().frames)
+    METRICS.counter(
+        "websocket_bytes_sent_total",
+        "Bytes sent to the subscribers of the feed hub, uncompressed.",
+        collect=lambda: FEED_HUB.sent_totals().bytes)
+    METRICS.counter(
+        "feed_hub_rejected_total",
+        "Websocket and SSE clients refused, the worker had too many.",
+        collect=lambda: FEED_HUB.rejected)
+    METRICS.counter(
+        "feed_hub_evicted_total",
+        "Websocket clients evicted, they stopped reading their feeds.",
+        collect=lambda: FEED_HUB.evicted)
+    if resident_memory() is not None:
+        METRICS.gauge(
+            "process_resident_memory_bytes",
+            "Resident memory of the worker.",
+            collect=resident_memory)
+    if isinstance(FEED_BROKER, PostgresFeedBroker):
+        METRICS.gauge(
+            "feed_broker_pending_feeds",
+            "Feeds waiting for the next NOTIFY of the broker.",
+            collect=lambda: FEED_BROKER.pending)
 
 # Define jinja template directory
 templates = Jinja2Templates(directory="templates")
 
+# Define the rendered latest feeds of the root page
+ROOT_PAGE_SETTINGS = RootPageSettings()
+ROOT_FRAGMENT = LatestFeedsFragment(
+    item_template=templates.get_template("feed-item.html"),
+    size=ROOT_PAGE_SETTINGS.root_page_size,
+)
+FEED_BROKER.subscribe(ROOT_FRAGMENT.publish)
+
+
+async def forget_dropped(partition: FeedPartition) -> None:
+    """Forget the rendered and cached feeds of a dropped partition."""
+    ROOT_FRAGMENT.clear()
+    if isinstance(FEED_PROVIDER, CachedFeedProvider):
+        FEED_PROVIDER.invalidate_range(
+            start=partition.start, end=partition.end)
+
+
+FEED_BROKER.subscribe_dropped(forget_dropped)
+
 tags_metadata = [
     {
         "name": "simplefeed.cloud",
@@ -48,61 +194,542 @@ app = FastAPI(
     },
     openapi_tags=tags_metadata,
 )
+if METRICS_SETTINGS.metrics_enabled:
+    app.add_middleware(
+        MetricsMiddleware,
+        registry=METRICS,
+        routes=lambda: {
+            route.endpoint: route.path
+            for route in app.routes if hasattr(route, "endpoint")
+        },
+    )
+
+
+@app.on_event("startup")
+async def startup():
+    """Open the database connection pool and start the feed broker."""
+    if PROVIDER_SETTINGS.feed_provider == "database":
+        await DB_PROVIDER.connect()
+    await FEED_BROKER.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop the feed broker and close the database connection pool."""
+    await FEED_BROKER.stop()
+    if PROVIDER_SETTINGS.feed_provider == "database":
+        await DB_PROVIDER.disconnect()
 
 
 @app.get("/", response_class=HTMLResponse)
 async def root(request: Request):
-    """root html."""
-    feeds = await ReadFeeds(feed_provider=DB_PROVIDER)()
+    """root html, with the latest feeds rendered once and kept up to date."""
+    if not ROOT_FRAGMENT.loaded:
+        ROOT_FRAGMENT.load(await ReadFeeds(feed_provider=FEED_PROVIDER)(
+            limit=ROOT_PAGE_SETTINGS.root_page_size, newest=True))
 
     return templates.TemplateResponse(
         "index-ws.html",
         {
             "request": request,
-            "feeds": feeds,
+            "feeds_html": ROOT_FRAGMENT.html,
+            "newest_id": ROOT_FRAGMENT.newest_id,
+            "oldest_id": ROOT_FRAGMENT.oldest_id,
+            "page_size": ROOT_PAGE_SETTINGS.root_page_size,
         }
     )
 
 
-@app.websocket("/ws")
-async def get_feeds_ws(websocket: WebSocket):
-    """root html."""
+async def receive_until_disconnect(
+        websocket: WebSocket,
+        subscriber: FeedSubscriber
+):
+    """
+    Change the topics of the subscriber as requested by the client.
+
+    The subscriber is closed once the websocket client is disconnected,
+    or sent an invalid subscription (close code 1008).
+    """
     try:
-        await websocket.accept()
         while True:
-            data = {
-                    "origin": "github.com (ws)",
-                    "event": "New repository",
-                    "description": "A new repository 'sassy' has been "
-                                   "created ...",
-                }
-            await websocket.send_json(data)
-            await asyncio.sleep(5)
-    except ConnectionClosedOK:
-        await websocket.close()
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+
+            try:
+                subscription = FeedSubscription.parse_raw(
+                    message.get("text") or message.get("bytes") or "")
+                topics = [
+                    (topic.origin, topic.event)
+                    for topic in subscription.topics
+                ]
+                if subscription.action == "subscribe":
+                    FEED_HUB.subscribe_topics(
+                        subscriber=subscriber, topics=topics)
+                else:
+                    FEED_HUB.unsubscribe_topics(
+                        subscriber=subscriber, topics=topics)
+
+            except (ValueError, FeedSubscriptionError):
+                await websocket.close(code=1008)
+                break
+    finally:
+        subscriber.close()
+
+
+# Close code of a client that missed too many feeds: it reloads the page.
+WS_CLOSE_REPLAY_TOO_LONG = 4000
+# Close code of a client refused or disconnected by the server, it
+# reconnects later: "Try Again Later".
+WS_CLOSE_TRY_AGAIN_LATER = 1013
+
+
+@app.websocket("/ws")
+async def get_feeds_ws(
+        websocket: WebSocket,
+        after_id: Optional[int] = None,
+        delivery: Literal["single", "batch"] = "single",
+        origin: Optional[List[str]] = Query(None),
+        event: Optional[List[str]] = Query(None),
+):
+    """
+    Send new feeds to the websocket client.
+
+    The client gets every feed, or the feeds of the origin and event sent
+    in the query, e.g. `?origin=github.com&origin=gitlab.com`. It changes
+    its topics without reconnecting by sending, e.g.
 
+        {"action": "subscribe", "topics": [{"origin": "github.com"}]}
+        {"action": "unsubscribe", "topics": [{}]}
 
-@app.get("/feeds", response_model=List[FeedDetail], tags=["items"])
-async def read_feeds() -> List[FeedDetail]:
-    """Read feeds."""
-    return await ReadFeeds(feed_provider=DB_PROVIDER)()
+    where `{}` is the topic of every feed.
 
+    A reconnecting client sends the last feed id it received as
+    `?after_id=`: the feeds it missed are replayed by chunks before the
+    new ones, without gap or duplicate.
 
-@app.get("/feed/{feed_id}", response_model=FeedDetail, tags=["items"])
-async def read_feed_by_id(feed_id: int) -> FeedDetail:
-    """Read feed by id."""
-    return await ReadFeedById(feed_provider=DB_PROVIDER)(feed_id=feed_id)
+    Each feed is sent in its own frame. With `?delivery=batch`, the feeds
+    queued within `ws_batch_delay` seconds are sent as one array frame.
+
+    Beyond `ws_max_connections` clients, a new one is closed with code
+    1013. A client not reading a frame within `ws_send_timeout` seconds is
+    evicted: its connection is dropped without closing handshake.
+    """
+    await websocket.accept()
+    subscriber: Optional[FeedSubscriber] = None
+    receiver: Optional[asyncio.Task] = None
+    try:
+        # Registered within the try: the finally always frees its slot.
+        subscriber = FEED_HUB.subscribe(
+            topics=FEED_HUB.topics(origins=origin, events=event))
+        receiver = asyncio.create_task(receive_until_disconnect(
+            websocket=websocket, subscriber=subscriber))
+        # Replicas may lag behind the feeds already published.
+        READ_FROM_PRIMARY.set(True)
+        feeds = ResumeFeeds(feed_provider=FEED_PROVIDER)(
+            subscriber=subscriber,
+            after_id=after_id,
+            chunk_size=HUB_SETTINGS.ws_replay_chunk_size,
+            max_feeds=HUB_SETTINGS.ws_replay_max,
+            origins=origin,
+            events=event,
+        )
+        if delivery == "batch":
+            batches = batch_feeds(
+                feeds=feeds,
+                delay=HUB_SETTINGS.ws_batch_delay,
+                max_feeds=HUB_SETTINGS.ws_batch_max_feeds,
+            )
+        else:
+            batches = ([feed] async for feed in feeds)
+
+        async for batch in batches:
+            if receiver.done():
+                break
+            text = dumps(batch if delivery == "batch" else batch[0]).decode()
+            await asyncio.wait_for(
+                websocket.send_text(text),
+                timeout=HUB_SETTINGS.ws_send_timeout)
+            subscriber.sent(feeds=len(batch), size=len(text))
+
+        if not receiver.done():
+            # Closed by the hub: the client is too slow.
+            await websocket.close(code=WS_CLOSE_TRY_AGAIN_LATER)
+
+    except FeedCapacityError:
+        await websocket.close(code=WS_CLOSE_TRY_AGAIN_LATER)
+
+    except FeedSubscriptionError:
+        await websocket.close(code=1008)
+
+    except asyncio.TimeoutError:
+        # Its socket is full: a closing frame wouldn't be sent either.
+        FEED_HUB.evict(subscriber)
+
+    except FeedReplayError:
+        await websocket.close(code=WS_CLOSE_REPLAY_TOO_LONG)
+
+    except (WebSocketDisconnect, ConnectionClosed):
+        pass
+
+    finally:
+        if receiver is not None:
+            receiver.cancel()
+        if subscriber is not None:
+            FEED_HUB.unsubscribe(subscriber)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag (weak comparison).
+
+    Args:
+        if_none_match: The If-None-Match header
+        etag: The current ETag
+
+    Returns:
+        True if the client already has the current representation
+    """
+    if not if_none_match:
+        return False
+
+    if if_none_match.strip() == "*":
+        return True
+
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return etag.replace("W/", "") in [tag.replace("W/", "") for tag in tags]
+
+
+READ_YOUR_WRITES_COOKIE = "simplefeed_read_primary"
+
+
+async def read_your_writes(request: Request) -> None:
+    """Send the reads of a client that created feeds recently to primary."""
+    if READ_YOUR_WRITES_COOKIE in request.cookies:
+        READ_FROM_PRIMARY.set(True)
+
+
+def remember_writes(response: Response) -> None:
+    """
+    Mark a client that created feeds for `read_your_writes_window` seconds.
+
+    Args:
+        response: The response of the creation
+    """
+    window = DB_PROVIDER.settings.read_your_writes_window
+    if window > 0:
+        response.set_cookie(
+            READ_YOUR_WRITES_COOKIE, "1", max_age=math.ceil(window),
+            httponly=True)
+
+
+@app.get(
+    "/feeds",
+    response_model=List[FeedDetail],
+    tags=["items"],
+    dependencies=[Depends(read_your_writes)],
+)
+async def read_feeds(
+        limit: int = Query(100, ge=1, le=1000),
+        after_id: Optional[int] = None,
+        before_id: Optional[int] = None,
+        cursor: Optional[str] = None,
+        since: Optional[datetime.datetime] = None,
+        until: Optional[datetime.datetime] = None,
+        origin: Optional[List[str]] = Query(None),
+        event: Optional[List[str]] = Query(None),
+        if_none_match: Optional[str] = Header(None),
+) -> List[FeedDetail]:
+    """
+    Read feeds ordered by id, using keyset pagination.
+
+    Feeds are serialized without being validated again against the
+    response model.
+
+    The cursor of the next page is returned in the `X-Next-Cursor` header,
+    it overrides after_id and before_id when sent back. since and until
+    filter on the creation time, origin and event accept several values,
+    e.g. `?origin=github.com&origin=gitlab.com`. Filters must be sent with
+    every page.
+
+    The ETag changes with any creation or deletion of feeds, send it back
+    in If-None-Match to get a 304 while nothing changed.
+    """
+    try:
+        feed_cursor = FeedCursor.decode(cursor) if cursor else FeedCursor(
+            after_id=after_id, before_id=before_id)
+
+    except FeedCursorError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    # The version and the page are read from the same replica.
+    DB_PROVIDER.pin_read_database()
+    version = await ReadFeedsVersion(feed_provider=FEED_PROVIDER)()
+    etag = f'"feeds-{version}"'
+    if etag_matches(if_none_match=if_none_match, etag=etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    page = await ReadFeedsPage(feed_provider=FEED_PROVIDER)(
+        limit=limit, cursor=feed_cursor, since=since, until=until,
+        origins=origin, events=event)
+    headers = {"ETag": etag}
+    if page.next_cursor:
+        headers["X-Next-Cursor"] = page.next_cursor
+
+    return FeedJSONResponse(content=page.feeds, headers=headers)
+
+
+@app.get(
+    "/feeds/stats",
+    response_model=List[FeedStats],
+    tags=["items"],
+    dependencies=[Depends(read_your_writes)],
+)
+async def read_feed_stats(
+        bucket: Literal["hour", "total"] = "total",
+        group_by: List[Literal["origin", "event"]] = Query(
+            ["origin", "event"]),
+        since: Optional[datetime.datetime] = None,
+        until: Optional[datetime.datetime] = None,
+        origin: Optional[List[str]] = Query(None),
+        event: Optional[List[str]] = Query(None),
+) -> List[FeedStats]:
+    """
+    Read the number of feeds created, per hour with `bucket=hour`.
+
+    Counts are grouped by origin and event, send `group_by` to choose,
+    e.g. `?group_by=origin`. since and until select whole hours.
+    """
+    stats = await ReadFeedStats(feed_provider=FEED_PROVIDER)(
+        bucket=bucket, group_by=group_by, since=since, until=until,
+        origins=origin, events=event)
+
+    return FeedJSONResponse(content=stats)
+
+
+@app.get(
+    "/feeds/search",
+    response_model=List[FeedSearchHit],
+    tags=["items"],
+    dependencies=[Depends(read_your_writes)],
+)
+async def search_feeds(
+        q: str = Query(..., min_length=1, max_length=255),
+        limit: int = Query(20, ge=1, le=100),
+        cursor: Optional[str] = None,
+) -> List[FeedSearchHit]:
+    """
+    Search feeds by the words of their description, best ranked first.
+
+    Every word must match. The cursor of the next page is returned in the
+    `X-Next-Cursor` header, send it back with the same q.
+    """
+    try:
+        search_cursor = FeedSearchCursor.decode(cursor) if cursor else None
+
+    except FeedCursorError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    page = await SearchFeeds(feed_provider=FEED_PROVIDER)(
+        terms=q, limit=limit, cursor=search_cursor)
+    headers = {}
+    if page.next_cursor:
+        headers["X-Next-Cursor"] = page.next_cursor
+
+    return FeedJSONResponse(content=page.hits, headers=headers)
+
+
+@app.get(
+    "/feeds/stream",
+    response_class=StreamingResponse,
+    tags=["items"],
+)
+async def stream_feeds(
+        after_id: Optional[int] = None,
+        origin: Optional[List[str]] = Query(None),
+        event: Optional[List[str]] = Query(None),
+        last_event_id: Optional[int] = Header(None),
+) -> StreamingResponse:
+    """
+    Stream new feeds as Server-Sent Events, for clients without websocket.
+
+    Each feed is a `message` event with the feed id as event id. A client
+    reconnecting with Last-Event-ID (or `?after_id=`) first gets the feeds
+    it missed; when they are too many, a `reset` event ends the stream.
+    origin and event select the feeds as on `/ws`. A comment line is sent
+    after `sse_heartbeat_interval` seconds without feed. Beyond
+    `ws_max_connections` clients, a new one gets a 503.
+    """
+    topics = FEED_HUB.topics(origins=origin, events=event)
+    if len(topics) > FEED_HUB.max_topics:
+        raise HTTPException(
+            status_code=400,
+            detail=f"No more than {FEED_HUB.max_topics} topics.")
+
+    if FEED_HUB.full:
+        FEED_HUB.rejected += 1
+        raise HTTPException(
+            status_code=503,
+            detail="Too many connections, retry later.",
+            headers={"Retry-After": str(
+                math.ceil(STREAM_SETTINGS.sse_retry / 1000))})
+
+    async def events():
+        # Subscribed once streaming: the stream ends by unsubscribing.
+        try:
+            subscriber = FEED_HUB.subscribe(topics=topics)
+        except FeedCapacityError:
+            return
+
+        # Replicas may lag behind the feeds already published.
+        READ_FROM_PRIMARY.set(True)
+        feeds = ResumeFeeds(feed_provider=FEED_PROVIDER)(
+            subscriber=subscriber,
+            after_id=last_event_id if last_event_id is not None else after_id,
+            chunk_size=HUB_SETTINGS.ws_replay_chunk_size,
+            max_feeds=HUB_SETTINGS.ws_replay_max,
+            origins=origin,
+            events=event,
+        )
+        try:
+            yield server_sent_event(retry=STREAM_SETTINGS.sse_retry)
+            async for feed in heartbeat_feeds(
+                    feeds=feeds,
+                    interval=STREAM_SETTINGS.sse_heartbeat_interval):
+                if feed is None:
+                    yield SSE_HEARTBEAT
+                    continue
+
+                message = server_sent_event(data=dumps(feed), event_id=feed.id)
+                subscriber.sent(feeds=1, size=len(message))
+                yield message
+
+        except FeedReplayError:
+            yield server_sent_event(data=b"{}", event="reset")
+
+        finally:
+            subscriber.close()
+            FEED_HUB.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get(
+    "/feeds/export",
+    response_class=StreamingResponse,
+    tags=["items"],
+    dependencies=[Depends(read_your_writes)],
+)
+async def export_feeds(after_id: Optional[int] = None) -> StreamingResponse:
+    """Export feeds ordered by id as newline-delimited JSON."""
+    feeds = ExportFeeds(feed_provider=FEED_PROVIDER)(after_id=after_id)
+
+    async def ndjson():
+        async for feed in feeds:
+            yield dumps(feed) + b"\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+@app.get(
+    "/feed/{feed_id}",
+    response_model=FeedDetail,
+    tags=["items"],
+    dependencies=[Depends(read_your_writes)],
+)
+async def read_feed_by_id(
+        feed_id: int,
+        if_none_match: Optional[str] = Header(None),
+) -> FeedDetail:
+    """
+    Read feed by id.
+
+    Feeds are immutable, the ETag is built from the id and the creation
+    time of the feed: a matching If-None-Match gets a 304 while the feed
+    exists. A deleted feed, e.g. with its partition, is not found.
+    """
+    feed = await ReadFeedById(feed_provider=FEED_PROVIDER)(feed_id=feed_id)
+    if feed is None:
+        return FeedJSONResponse(content=None)
+
+    created_at = round(feed.created_at.timestamp() * 1000000) \
+        if feed.created_at else 0
+    etag = f'"feed-{feed.id}-{created_at}"'
+    if etag_matches(if_none_match=if_none_match, etag=etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    return FeedJSONResponse(content=feed, headers={"ETag": etag})
 
 
 @app.post("/feed/", response_model=FeedDetail, tags=["items"])
-async def create_feed(feed: Feed) -> FeedDetail:
+async def create_feed(feed: Feed, response: Response) -> FeedDetail:
     """Create a new feed."""
     try:
-        return await CreateNewFeedAndReadFeedByID(
-            feed_provider=DB_PROVIDER)(feed=feed)
+        feed_detail = await CreateNewFeedAndReadFeedByID(
+            feed_provider=FEED_PROVIDER,
+            feed_publisher=FEED_BROKER,
+        )(feed=feed)
+        remember_writes(response=response)
+        return feed_detail
 
     except FeedCreateError as exc:
         raise HTTPException(status_code=400, detail=str(exc))
 
     except Exception as exc:
         raise HTTPException(status_code=404, detail=str(exc))
+
+
+@app.post("/feeds/batch", response_model=FeedBatchResult, tags=["items"])
+async def create_feeds(
+        response: Response,
+        feeds: List[Any] = Body(...),
+) -> FeedBatchResult:
+    """
+    Create new feeds, errors are reported per feed.
+
+    The feeds are validated one by one, so an invalid feed does not reject
+    the whole batch.
+    """
+    result = await CreateNewFeeds(
+        feed_provider=FEED_PROVIDER, feed_publisher=FEED_BROKER)(feeds=feeds)
+    remember_writes(response=response)
+    return result
+
+
+@app.get("/stats/pool", response_model=PoolStats, tags=["stats"])
+async def read_pool_stats() -> PoolStats:
+    """Read database connection pool statistics."""
+    return DB_PROVIDER.pool_stats()
+
+
+@app.get(
+    "/stats/websockets",
+    response_model=List[SubscriberStats],
+    tags=["stats"],
+)
+async def read_websocket_stats() -> List[SubscriberStats]:
+    """Read the delivery statistics of each websocket connection."""
+    return [subscriber.stats() for subscriber in FEED_HUB.subscribers]
+
+
+@app.get("/stats/cache", response_model=CacheStats, tags=["stats"])
+async def read_cache_stats() -> CacheStats:
+    """Read feed cache statistics."""
+    if not isinstance(FEED_PROVIDER, CachedFeedProvider):
+        raise HTTPException(status_code=404, detail="Feed cache is disabled.")
+
+    return FEED_PROVIDER.cache_stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse, tags=["stats"])
+async def read_metrics() -> PlainTextResponse:
+    """Read request, query and websocket metrics (Prometheus format)."""
+    if not METRICS_SETTINGS.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled.")
+
+    return PlainTextResponse(
+        METRICS.render(), media_type=MetricsRegistry.CONTENT_TYPE)
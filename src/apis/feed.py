@@ -1 +1,180 @@
 """Feature: feed."""
+import datetime
+import json
+from typing import Any, List, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+from jinja2 import Template
+from pydantic import BaseModel
+
+from src.domains.feed import FeedDetail
+from src.interfaces.feed import FeedPublisherInterface
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """
+    Serialize objects unknown to the JSON encoder.
+
+    DTOs are serialized from their attributes as they are: they come from
+    our own database and are not validated again.
+    """
+    if isinstance(obj, BaseModel):
+        return obj.__dict__
+
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        return obj.isoformat()
+
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON "
+                    f"serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Serialize to JSON with orjson when installed.
+
+    Args:
+        content: DTOs, lists or dicts
+
+    Returns:
+        JSON bytes
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+
+    return json.dumps(
+        content,
+        default=_default,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+# Comment line of a Server-Sent Events stream, ignored by the clients.
+SSE_HEARTBEAT = b": ping\n\n"
+
+
+def server_sent_event(
+        data: Optional[bytes] = None,
+        event_id: Optional[Any] = None,
+        event: Optional[str] = None,
+        retry: Optional[int] = None,
+) -> bytes:
+    """
+    Format a Server-Sent Event.
+
+    Args:
+        data: The data, on a single line (e.g. JSON)
+        event_id: The id, sent back by the client in Last-Event-ID
+        event: The event type, `message` if None
+        retry: The reconnection delay advised to the client, in ms
+
+    Returns:
+        The event, with its terminating blank line
+    """
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}".encode())
+    if event is not None:
+        lines.append(f"event: {event}".encode())
+    if retry is not None:
+        lines.append(f"retry: {retry}".encode())
+    if data is not None:
+        lines.append(b"data: " + data)
+    return b"\n".join(lines) + b"\n\n"
+
+
+class FeedJSONResponse(JSONResponse):
+    """
+    JSON response for trusted feed DTOs.
+
+    Returned as is, it bypasses the validation of the response_model.
+    """
+
+    def render(self, content: Any) -> bytes:
+        """Render the content."""
+        return dumps(content)
+
+
+class LatestFeedsFragment(FeedPublisherInterface):
+    """
+    Rendered HTML of the latest feeds, newest first.
+
+    Each feed is rendered once with the item template. Published feeds are
+    rendered and inserted, the oldest ones are dropped beyond `size`.
+    """
+
+    def __init__(self, item_template: Template, size: int):
+        """Init."""
+        self.item_template = item_template
+        self.size = size
+        self.loaded = False
+        self._items: List[Tuple[int, str]] = []
+        self._html: Optional[str] = None
+
+    @property
+    def html(self) -> str:
+        """Return the HTML of the latest feeds."""
+        if self._html is None:
+            self._html = "".join(html for _, html in self._items)
+        return self._html
+
+    @property
+    def newest_id(self) -> Optional[int]:
+        """Return the id of the newest rendered feed."""
+        return self._items[0][0] if self._items else None
+
+    @property
+    def oldest_id(self) -> Optional[int]:
+        """Return the id of the oldest rendered feed."""
+        return self._items[-1][0] if self._items else None
+
+    def load(self, feeds: List[FeedDetail]) -> None:
+        """
+        Render feeds read from the database.
+
+        Args:
+            feeds: A list of FeedDetail DTO
+        """
+        for feed in feeds:
+            self.add(feed)
+        self.loaded = True
+
+    def add(self, feed: FeedDetail) -> None:
+        """
+        Render a feed and insert it by id.
+
+        Args:
+            feed: A FeedDetail DTO
+        """
+        index = 0
+        while index < len(self._items) and self._items[index][0] > feed.id:
+            index += 1
+        if index < len(self._items) and self._items[index][0] == feed.id:
+            return
+        if index >= self.size:
+            return
+
+        self._items.insert(index, (feed.id, self.item_template.render(
+            feed=feed)))
+        del self._items[self.size:]
+        self._html = None
+
+    def clear(self) -> None:
+        """Forget the rendered feeds, they are loaded again."""
+        self._items = []
+        self._html = None
+        self.loaded = False
+
+    async def publish(self, feed: FeedDetail) -> None:
+        """
+        Render a new feed.
+
+        Args:
+            feed: A FeedDetail DTO
+        """
+        self.add(feed)
@@ -0,0 +1,83 @@
+"""Feature: metrics."""
+import time
+from typing import Any, Callable, Dict, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.metrics import MetricsRegistry
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing HTTP requests.
+
+    Requests are counted in flight until their response starts, then their
+    latency is observed per method, route and status. Streamed responses,
+    e.g. `/feeds/stream` or `/feeds/export`, are timed to their first byte:
+    how long they stay open is not a latency, the hub gauges report them.
+    The route is the path template of the matched endpoint, e.g.
+    `/feed/{feed_id}`, so that ids don't make a sample each; unmatched
+    paths share the `unmatched` route.
+    """
+
+    def __init__(
+            self,
+            app: ASGIApp,
+            registry: MetricsRegistry,
+            routes: Callable[[], Dict[Any, str]],
+    ):
+        """
+        Init.
+
+        Args:
+            app: The ASGI app
+            registry: Where the metrics are added
+            routes: A callable returning the path template of each
+                endpoint, read once on the first request
+        """
+        self.app = app
+        self.routes = routes
+        self._paths: Optional[Dict[Any, str]] = None
+        self.in_flight = registry.gauge(
+            "http_requests_in_flight",
+            "Number of HTTP requests being handled.")
+        self.latency = registry.histogram(
+            "http_request_duration_seconds",
+            "Latency of HTTP requests, until the response starts.",
+            labels=("method", "route", "status"))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        """Handle a request."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        timed = False
+
+        def observe(status: int) -> None:
+            nonlocal timed
+            if not timed:
+                timed = True
+                self.in_flight.dec()
+                self.latency.observe(
+                    scope["method"], self.route(scope), str(status),
+                    value=time.perf_counter() - start)
+
+        async def send_status(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                observe(message["status"])
+            await send(message)
+
+        self.in_flight.inc()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            # No response started: the request failed.
+            observe(500)
+
+    def route(self, scope: Scope) -> str:
+        """Return the path template of the endpoint the router matched."""
+        if self._paths is None:
+            self._paths = self.routes()
+        return self._paths.get(scope.get("endpoint"), "unmatched")
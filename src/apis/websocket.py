@@ -0,0 +1,86 @@
+"""Feature: websocket."""
+import dataclasses
+from typing import List, Sequence, Tuple
+
+from websockets import frames
+from websockets.extensions import Extension
+from websockets.extensions.permessage_deflate import PerMessageDeflate, \
+    ServerPerMessageDeflateFactory
+from websockets.typing import ExtensionParameter
+
+from src.configs.feed import FeedHubSettings
+
+
+class ThresholdPerMessageDeflate(PerMessageDeflate):
+    """
+    Per-Message Deflate compressing only the messages of `min_size` bytes.
+
+    RFC 7692 lets a sender leave a message uncompressed: small frames
+    aren't worth the CPU and barely shrink.
+    """
+
+    def __init__(self, *args, min_size: int = 0, **kwargs):
+        """Init."""
+        super().__init__(*args, **kwargs)
+        self.min_size = min_size
+
+    def encode(self, frame: frames.Frame) -> frames.Frame:
+        """Encode an outgoing frame, unless it is a small message."""
+        if frame.fin and frame.opcode in (frames.OP_TEXT, frames.OP_BINARY) \
+                and len(frame.data) < self.min_size:
+            return dataclasses.replace(frame, rsv1=False)
+
+        return super().encode(frame)
+
+
+class ThresholdServerPerMessageDeflateFactory(ServerPerMessageDeflateFactory):
+    """Negotiate Per-Message Deflate, compressing messages of `min_size`."""
+
+    def __init__(self, *args, min_size: int = 0, **kwargs):
+        """Init."""
+        super().__init__(*args, **kwargs)
+        self.min_size = min_size
+
+    def process_request_params(
+            self,
+            params: Sequence[ExtensionParameter],
+            accepted_extensions: Sequence[Extension],
+    ) -> Tuple[List[ExtensionParameter], PerMessageDeflate]:
+        """Accept the parameters of a client, keep the threshold."""
+        response, extension = super().process_request_params(
+            params, accepted_extensions)
+        return response, ThresholdPerMessageDeflate(
+            extension.remote_no_context_takeover,
+            extension.local_no_context_takeover,
+            extension.remote_max_window_bits,
+            extension.local_max_window_bits,
+            extension.compress_settings,
+            min_size=self.min_size,
+        )
+
+
+def deflate_factory(
+        settings: FeedHubSettings,
+) -> ThresholdServerPerMessageDeflateFactory:
+    """
+    Return the Per-Message Deflate offer of the server.
+
+    Memory per connection is bounded by the window and the memory level:
+    about `2 ** (window_bits + 2) + 2 ** (mem_level + 9)` bytes for the
+    compressor, dropped after each message without context takeover.
+
+    Args:
+        settings: The WS_DEFLATE_* settings
+
+    Returns:
+        A server extension factory
+    """
+    return ThresholdServerPerMessageDeflateFactory(
+        server_no_context_takeover=settings.ws_deflate_no_context_takeover,
+        server_max_window_bits=settings.ws_deflate_window_bits,
+        compress_settings={
+            "level": settings.ws_deflate_level,
+            "memLevel": settings.ws_deflate_mem_level,
+        },
+        min_size=settings.ws_deflate_min_size,
+    )
@@ -1,9 +1,14 @@
 """Feature: feed."""
+import datetime
+from typing import Any, AsyncIterator, List, Optional, Sequence, Set
 
-from typing import List, Optional
+from pydantic import ValidationError
 
-from src.domains.feed import FeedDetail, Feed
-from src.interfaces.feed import SimpleFeedInterface
+from src.domains.feed import FeedDetail, Feed, FeedCursor, FeedPage, \
+    FeedBatchResult, FeedSearchCursor, FeedSearchPage, FeedPartition, \
+    FeedPartitionReport, FeedStats, FeedReplayError, FeedBatchError
+from src.interfaces.feed import SimpleFeedInterface, FeedPublisherInterface, \
+    FeedPartitionInterface, FeedSubscriberInterface, FeedBrokerInterface
 
 
 class ReadFeeds:
@@ -16,14 +21,296 @@ class ReadFeeds:
         """Init."""
         self.feed_provider = feed_provider
 
-    async def __call__(self) -> List[FeedDetail]:
+    async def __call__(
+            self,
+            limit: Optional[int] = None,
+            after_id: Optional[int] = None,
+            before_id: Optional[int] = None,
+            newest: bool = False,
+            since: Optional[datetime.datetime] = None,
+            until: Optional[datetime.datetime] = None,
+            origins: Optional[List[str]] = None,
+            events: Optional[List[str]] = None,
+    ) -> List[FeedDetail]:
         """
         Read feeds.
 
+        Args:
+            limit: Maximum number of feeds, all feeds if None
+            after_id: Only feeds with an id greater than after_id
+            before_id: Only feeds with an id lower than before_id
+            newest: Without after_id, the limit applies to the newest feeds
+            since: Only feeds created at or after since
+            until: Only feeds created before until
+            origins: Only feeds from one of these origins
+            events: Only feeds of one of these events
+
         Returns:
             A list of FeedDetail DTO.
         """
-        return await self.feed_provider.read_feeds()
+        return await self.feed_provider.read_feeds(
+            limit=limit, after_id=after_id, before_id=before_id,
+            newest=newest, since=since, until=until, origins=origins,
+            events=events)
+
+
+class ReadFeedsPage:
+    """Read a page of feeds."""
+
+    def __init__(
+            self,
+            feed_provider: SimpleFeedInterface
+    ):
+        """Init."""
+        self.feed_provider = feed_provider
+
+    async def __call__(
+            self,
+            limit: int,
+            cursor: Optional[FeedCursor] = None,
+            since: Optional[datetime.datetime] = None,
+            until: Optional[datetime.datetime] = None,
+            origins: Optional[List[str]] = None,
+            events: Optional[List[str]] = None,
+    ) -> FeedPage:
+        """
+        Read a page of feeds.
+
+        Args:
+            limit: Maximum number of feeds in the page
+            cursor: A FeedCursor, the first page if None
+            since: Only feeds created at or after since
+            until: Only feeds created before until
+            origins: Only feeds from one of these origins
+            events: Only feeds of one of these events
+
+        Returns:
+            A FeedPage DTO with the cursor of the next page, if any.
+        """
+        cursor = cursor or FeedCursor()
+        feeds = await ReadFeeds(feed_provider=self.feed_provider)(
+            limit=limit,
+            after_id=cursor.after_id,
+            before_id=cursor.before_id,
+            since=since,
+            until=until,
+            origins=origins,
+            events=events,
+        )
+
+        next_cursor = None
+        if feeds and len(feeds) == limit:
+            if cursor.backward:
+                next_cursor = FeedCursor(before_id=feeds[0].id)
+            else:
+                next_cursor = FeedCursor(
+                    after_id=feeds[-1].id, before_id=cursor.before_id)
+
+        return FeedPage(
+            feeds=feeds,
+            next_cursor=next_cursor.encode() if next_cursor else None)
+
+
+class ReadFeedsVersion:
+    """Read the version of the feeds."""
+
+    def __init__(
+            self,
+            feed_provider: SimpleFeedInterface
+    ):
+        """Init."""
+        self.feed_provider = feed_provider
+
+    async def __call__(self) -> str:
+        """
+        Read the version of the feeds.
+
+        Returns:
+            A version string, changed by any creation or deletion.
+        """
+        return await self.feed_provider.read_feeds_version()
+
+
+class ExportFeeds:
+    """Export all feeds as a stream."""
+
+    def __init__(
+            self,
+            feed_provider: SimpleFeedInterface
+    ):
+        """Init."""
+        self.feed_provider = feed_provider
+
+    def __call__(
+            self,
+            after_id: Optional[int] = None,
+    ) -> AsyncIterator[FeedDetail]:
+        """
+        Export feeds.
+
+        Args:
+            after_id: Only feeds with an id greater than after_id
+
+        Returns:
+            An async iterator of FeedDetail DTO.
+        """
+        return self.feed_provider.iter_feeds(after_id=after_id)
+
+
+class ResumeFeeds:
+    """Replay the feeds missed by a subscriber, then follow the new ones."""
+
+    def __init__(
+            self,
+            feed_provider: SimpleFeedInterface
+    ):
+        """Init."""
+        self.feed_provider = feed_provider
+
+    async def __call__(
+            self,
+            subscriber: FeedSubscriberInterface,
+            after_id: Optional[int] = None,
+            chunk_size: int = 100,
+            max_feeds: int = 10000,
+            origins: Optional[List[str]] = None,
+            events: Optional[List[str]] = None,
+    ) -> AsyncIterator[FeedDetail]:
+        """
+        Yield the feeds created after after_id, then the new feeds.
+
+        Subscribe before calling it: feeds created during the replay are
+        queued by the subscriber, those already replayed are skipped. The
+        replay reads chunks by keyset until the last feed, and starts
+        again from there if the subscriber dropped feeds meanwhile.
+
+        Args:
+            subscriber: A subscriber of the new feeds
+            after_id: The last feed seen, nothing is replayed if None
+            chunk_size: Feeds read per query
+            max_feeds: Maximum number of feeds replayed
+            origins: Only replay feeds with one of these origins
+            events: Only replay feeds with one of these events
+
+        Raises:
+            FeedReplayError: more than max_feeds feeds were missed, the
+                first ones are already yielded.
+
+        Returns:
+            An async iterator of FeedDetail DTO, it ends once the
+            subscriber is closed.
+        """
+        replayed: Set[int] = set()
+        dropped = subscriber.dropped - 1
+        last_id = after_id
+        while after_id is not None and dropped != subscriber.dropped:
+            dropped = subscriber.dropped
+            while True:
+                feeds = await self.feed_provider.read_feeds(
+                    limit=chunk_size, after_id=last_id, origins=origins,
+                    events=events)
+                if len(replayed) + len(feeds) > max_feeds:
+                    raise FeedReplayError(
+                        f"More than {max_feeds} feeds to replay after "
+                        f"{after_id}.")
+
+                for feed in feeds:
+                    replayed.add(feed.id)
+                    yield feed
+
+                if feeds:
+                    last_id = feeds[-1].id
+                if len(feeds) < chunk_size:
+                    break
+
+        while True:
+            feed = await subscriber.get()
+            if feed is None:
+                return
+
+            if feed.id in replayed:
+                # A feed is published once: it won't be seen again.
+                replayed.discard(feed.id)
+                continue
+
+            yield feed
+
+
+class ReadFeedStats:
+    """Read the number of feeds created."""
+
+    def __init__(
+            self,
+            feed_provider: SimpleFeedInterface
+    ):
+        """Init."""
+        self.feed_provider = feed_provider
+
+    async def __call__(
+            self,
+            bucket: str = "total",
+            group_by: Sequence[str] = ("origin", "event"),
+            since: Optional[datetime.datetime] = None,
+            until: Optional[datetime.datetime] = None,
+            origins: Optional[List[str]] = None,
+            events: Optional[List[str]] = None,
+    ) -> List[FeedStats]:
+        """
+        Read the number of feeds created.
+
+        Args:
+            bucket: "hour" for a count per hour, "total" for all hours
+            group_by: A count per "origin" and/or "event"
+            since: Only hours starting at or after since
+            until: Only hours starting before until
+            origins: Only feeds from one of these origins
+            events: Only feeds of one of these events
+
+        Returns:
+            A list of FeedStats DTO.
+        """
+        return await self.feed_provider.read_feed_stats(
+            bucket=bucket, group_by=group_by, since=since, until=until,
+            origins=origins, events=events)
+
+
+class SearchFeeds:
+    """Search feeds."""
+
+    def __init__(
+            self,
+            feed_provider: SimpleFeedInterface
+    ):
+        """Init."""
+        self.feed_provider = feed_provider
+
+    async def __call__(
+            self,
+            terms: str,
+            limit: int,
+            cursor: Optional[FeedSearchCursor] = None,
+    ) -> FeedSearchPage:
+        """
+        Search a page of feeds by the words of their description.
+
+        Args:
+            terms: Words to search
+            limit: Maximum number of hits in the page
+            cursor: A FeedSearchCursor, the first page if None
+
+        Returns:
+            A FeedSearchPage DTO with the cursor of the next page, if any.
+        """
+        hits = await self.feed_provider.search_feeds(
+            terms=terms, limit=limit, after=cursor)
+
+        next_cursor = None
+        if hits and len(hits) == limit:
+            next_cursor = FeedSearchCursor(rank=hits[-1].rank, id=hits[-1].id)
+
+        return FeedSearchPage(
+            hits=hits,
+            next_cursor=next_cursor.encode() if next_cursor else None)
 
 
 class ReadFeedById:
@@ -69,19 +356,91 @@ class CreateNewFeed:
         return await self.feed_provider.create_feed(feed=feed)
 
 
+class CreateNewFeeds:
+    """Create new feeds."""
+
+    def __init__(
+            self,
+            feed_provider: SimpleFeedInterface,
+            feed_publisher: Optional[FeedPublisherInterface] = None,
+    ):
+        """Init."""
+        self.feed_provider = feed_provider
+        self.feed_publisher = feed_publisher
+
+    async def __call__(self, feeds: List[Any]) -> FeedBatchResult:
+        """
+        Create new feeds and publish the created ones.
+
+        Each feed is validated on its own: an invalid one is reported in the
+        errors with its index, the others are still created.
+
+        Args:
+            feeds: A list of Feed DTO, or of their fields (e.g. parsed JSON).
+
+        Returns:
+            A FeedBatchResult DTO
+        """
+        created_at = datetime.datetime.now(datetime.timezone.utc)
+        result = FeedBatchResult(ids=[None] * len(feeds), errors=[])
+        indexes, feed_details = [], []
+        for index, feed in enumerate(feeds):
+            try:
+                if not isinstance(feed, Feed):
+                    feed = Feed.parse_obj(feed)
+            except ValidationError as exc:
+                result.errors.append(FeedBatchError(
+                    index=index, detail=self.invalid_detail(exc)))
+                continue
+            indexes.append(index)
+            feed_details.append(FeedDetail(
+                **feed.dict(exclude={"created_at"}),
+                created_at=created_at,
+            ))
+
+        if feed_details:
+            created = await self.feed_provider.create_feeds(
+                feeds=feed_details)
+            for index, feed_id in zip(indexes, created.ids):
+                result.ids[index] = feed_id
+            result.errors.extend(
+                FeedBatchError(index=indexes[error.index], detail=error.detail)
+                for error in created.errors
+            )
+            result.errors.sort(key=lambda error: error.index)
+
+        if self.feed_publisher is not None:
+            for feed_detail, index in zip(feed_details, indexes):
+                if result.ids[index] is not None:
+                    feed_detail.id = result.ids[index]
+                    await self.feed_publisher.publish(feed_detail)
+
+        return result
+
+    @staticmethod
+    def invalid_detail(exc: ValidationError) -> str:
+        """Return the validation errors of a feed on one line."""
+        return "Invalid feed. " + "; ".join(
+            f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}"
+            for error in exc.errors()
+        )
+
+
 class CreateNewFeedAndReadFeedByID:
     """Create a new feed and read feed by ID."""
 
     def __init__(
             self,
-            feed_provider: SimpleFeedInterface
+            feed_provider: SimpleFeedInterface,
+            feed_publisher: Optional[FeedPublisherInterface] = None,
     ):
         """Init."""
         self.feed_provider = feed_provider
+        self.feed_publisher = feed_publisher
 
     async def __call__(self, feed: Feed) -> Optional[FeedDetail]:
         """
-        Create a new feed.
+        Create a new feed and publish it.
 
         Args:
             feed: A Feed DTO.
@@ -89,7 +448,123 @@ class CreateNewFeedAndReadFeedByID:
         Returns:
             A FeedDetail DTO
         """
-        feed_detail = FeedDetail(**feed.dict())
+        feed_detail = FeedDetail(
+            **feed.dict(exclude={"created_at"}),
+            created_at=datetime.datetime.now(datetime.timezone.utc))
         feed_detail.id = await CreateNewFeed(
-            feed_provider=self.feed_provider)(feed=feed)
+            feed_provider=self.feed_provider)(feed=feed_detail)
+
+        if self.feed_publisher is not None:
+            await self.feed_publisher.publish(feed_detail)
+
         return feed_detail
+
+
+class MaintainFeedPartitions:
+    """Create the next partitions of feeds and drop the expired ones."""
+
+    def __init__(
+            self,
+            partition_provider: FeedPartitionInterface,
+            feed_broker: Optional[FeedBrokerInterface] = None,
+    ):
+        """Init."""
+        self.partition_provider = partition_provider
+        self.feed_broker = feed_broker
+
+    async def __call__(
+            self,
+            interval: str,
+            premake: int,
+            retention: Optional[int] = None,
+            now: Optional[datetime.datetime] = None,
+            dry_run: bool = False,
+    ) -> FeedPartitionReport:
+        """
+        Maintain the partitions of feeds.
+
+        Partitions are aligned on UTC days or months. The current one and
+        the `premake` next ones are created, except the ranges already
+        held by a partition. Partitions ending `retention` intervals or
+        more before the current one are dropped with their feeds.
+
+        There is no default partition: a feed outside of every partition
+        can't be inserted, the next partition is always created.
+
+        Dropping a partition bumps the feeds version, then the broker
+        tells every worker to forget the dropped feeds it has rendered or
+        cached.
+
+        Args:
+            interval: "day" or "month"
+            premake: Number of partitions created after the current one,
+                at least 1
+            retention: Number of partitions kept before the current one,
+                none is dropped if None
+            now: The current time, now if None
+            dry_run: Only report the partitions to create and drop
+
+        Returns:
+            A FeedPartitionReport DTO
+        """
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        current = self._floor(now, interval)
+        partitions = [
+            partition for partition in
+            await self.partition_provider.read_partitions()
+            if partition.start is not None or partition.end is not None
+        ]
+        report = FeedPartitionReport()
+
+        for count in range(max(premake, 1) + 1):
+            start = self._shift(current, interval, count)
+            end = self._shift(current, interval, count + 1)
+            for partition in partitions + report.created:
+                if (partition.start is None or partition.start < end) and \
+                        (partition.end is None or partition.end > start):
+                    start = max(start, partition.end or end)
+            if start < end:
+                report.created.append(FeedPartition(
+                    name=f"feed_p{start:%Y%m%d}", start=start, end=end))
+
+        if retention is not None:
+            cutoff = self._shift(current, interval, -retention)
+            report.dropped = [
+                partition for partition in partitions
+                if partition.end is not None and partition.end <= cutoff
+            ]
+
+        if not dry_run:
+            for partition in report.created:
+                await self.partition_provider.create_partition(
+                    partition=partition)
+            for partition in report.dropped:
+                await self.partition_provider.drop_partition(
+                    partition=partition)
+                if self.feed_broker is not None:
+                    await self.feed_broker.publish_dropped(partition)
+
+        return report
+
+    @staticmethod
+    def _floor(moment: datetime.datetime, interval: str) -> datetime.datetime:
+        """Return the start of the UTC day or month of a moment."""
+        moment = moment.astimezone(datetime.timezone.utc).replace(
+            hour=0, minute=0, second=0, microsecond=0)
+        if interval == "month":
+            moment = moment.replace(day=1)
+        return moment
+
+    @staticmethod
+    def _shift(
+            start: datetime.datetime,
+            interval: str,
+            count: int,
+    ) -> datetime.datetime:
+        """Return the start of a day or month `count` intervals later."""
+        if interval == "day":
+            return start + datetime.timedelta(days=count)
+
+        month = start.month - 1 + count
+        return start.replace(
+            year=start.year + month // 12, month=month % 12 + 1)
@@ -0,0 +1,73 @@
+"""
+Maintenance commands: feed.
+
+Create the next partitions of the feed table and drop the expired ones,
+e.g. daily from cron:
+
+    python -m src.commands.feed partitions --interval month --retention 12
+
+Defaults come from the PARTITION_* environment variables.
+"""
+import argparse
+import asyncio
+from typing import List, Optional
+
+from databases import Database
+
+from src.applications.feed import MaintainFeedPartitions
+from src.configs.feed import DatabaseSettings, FeedBrokerSettings, \
+    FeedPartitionSettings
+from src.providers.feed import FeedPartitionProvider, PostgresFeedBroker
+
+
+async def partitions(args: argparse.Namespace) -> None:
+    """Maintain the partitions of the feed table."""
+    url = DatabaseSettings().url
+    broker_settings = FeedBrokerSettings()
+    feed_broker = None
+    if broker_settings.broker == "postgres":
+        # The workers forget the feeds of the dropped partitions.
+        feed_broker = PostgresFeedBroker(
+            dsn=url, channel=broker_settings.broker_channel)
+
+    async with Database(url) as database:
+        report = await MaintainFeedPartitions(
+            partition_provider=FeedPartitionProvider(database=database),
+            feed_broker=feed_broker)(
+            interval=args.interval,
+            premake=args.premake,
+            retention=args.retention,
+            dry_run=args.dry_run,
+        )
+
+    print(report.json(indent=2))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Run a maintenance command."""
+    settings = FeedPartitionSettings()
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parser_partitions = commands.add_parser(
+        "partitions", help="create and drop partitions of the feed table")
+    parser_partitions.add_argument(
+        "--interval", choices=["day", "month"],
+        default=settings.partition_interval)
+    parser_partitions.add_argument(
+        "--premake", type=int, default=settings.partition_premake,
+        help="partitions created after the current one, at least 1")
+    parser_partitions.add_argument(
+        "--retention", type=int, default=settings.partition_retention,
+        help="partitions kept before the current one, all if not set")
+    parser_partitions.add_argument(
+        "--dry-run", action="store_true",
+        help="only print the partitions to create and drop")
+    parser_partitions.set_defaults(handler=partitions)
+
+    args = parser.parse_args(argv)
+    asyncio.run(args.handler(args))
+
+
+if __name__ == "__main__":
+    main()
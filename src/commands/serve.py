@@ -0,0 +1,69 @@
+"""
+Run the API with uvicorn.
+
+Websocket connections negotiate Per-Message Deflate with the WS_DEFLATE_*
+settings, which the uvicorn command line can't configure, and are pinged
+every WS_PING_INTERVAL seconds:
+
+    python -m src.commands.serve --host 0.0.0.0 --port 80
+"""
+import argparse
+import resource
+from typing import List, Optional
+
+import uvicorn
+from uvicorn.protocols.websockets.websockets_impl import WebSocketProtocol
+
+from src.apis.websocket import deflate_factory
+from src.configs.feed import FeedHubSettings
+
+
+class DeflateWebSocketProtocol(WebSocketProtocol):
+    """Websocket protocol of uvicorn offering Per-Message Deflate."""
+
+    def __init__(self, *args, **kwargs):
+        """Init."""
+        super().__init__(*args, **kwargs)
+        self.available_extensions = [deflate_factory(FeedHubSettings())]
+
+
+def raise_open_files_limit() -> int:
+    """
+    Raise the soft limit of open files to the hard one.
+
+    Each websocket client holds a file descriptor: the usual soft limit of
+    1024 would refuse connections long before `ws_max_connections`.
+
+    Returns:
+        The limit of open files
+    """
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != hard:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+            soft = hard
+        except (OSError, ValueError):
+            pass
+    return soft
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Run the API."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    settings = FeedHubSettings()
+    ws = DeflateWebSocketProtocol if settings.ws_deflate else "websockets"
+    raise_open_files_limit()
+    uvicorn.run(
+        "main:app", host=args.host, port=args.port, workers=args.workers,
+        ws=ws,
+        ws_ping_interval=settings.ws_ping_interval or None,
+        ws_ping_timeout=settings.ws_ping_timeout or None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Feature: feed.
+
+Every field of the settings can be overridden by an environment variable
+with the same name (case-insensitive), e.g. `POOL_MAX_SIZE=20`.
+"""
+from typing import Any, Dict, List, Literal, Optional
+
+from pydantic import BaseSettings
+
+
+def database_dialect(url: Any) -> str:
+    """
+    Return the dialect of a database url.
+
+    `postgres://` is an alias of `postgresql://`, a driver such as
+    `+aiopg` is left out.
+
+    Args:
+        url: A database url, a string or a `databases.DatabaseURL`
+
+    Returns:
+        The dialect, e.g. "postgresql" or "sqlite"
+    """
+    dialect = str(url).split(":", 1)[0].split("+", 1)[0]
+    return "postgresql" if dialect == "postgres" else dialect
+
+
+class DatabaseSettings(BaseSettings):
+    """Database settings."""
+
+    postgres_host: str = "database"
+    postgres_port: int = 5432
+    postgres_user: str = "postgres"
+    postgres_password: str = "SuperSecret"
+    postgres_db: str = "simple_feed_db"
+    database_url: Optional[str] = None
+
+    # Read replicas, e.g. DATABASE_REPLICA_URLS='["postgresql://..."]'
+    database_replica_urls: List[str] = []
+    replica_health_interval: float = 5.0
+    replica_health_timeout: float = 1.0
+    # Reads of a client go to the primary this long after it creates feeds
+    read_your_writes_window: float = 0.0
+
+    # Connection pool
+    pool_min_size: int = 1
+    pool_max_size: int = 10
+    pool_acquire_timeout: float = 10.0
+    # Idle connections are closed after this many seconds
+    pool_max_idle_time: float = 300.0
+    pool_max_queries: int = 50000
+
+    # Batch insert
+    batch_chunk_size: int = 500
+
+    # Counts of new feeds are folded in the feed_stats rollup this often
+    stats_compact_interval: float = 60.0
+
+    # Read-through cache of feeds by id (opt-in)
+    cache_enabled: bool = False
+    cache_max_size: int = 10000
+    cache_ttl: float = 300.0
+    cache_negative_ttl: float = 1.0
+
+    # Group commit of single feed creations (opt-in)
+    write_coalesce: bool = False
+    write_coalesce_delay: float = 0.005
+    write_coalesce_max_rows: int = 100
+
+    @property
+    def url(self) -> str:
+        """
+        Return the database url.
+
+        Returns:
+            DATABASE_URL if defined, else an url built from POSTGRES_*
+        """
+        if self.database_url:
+            return self.database_url
+
+        return f"postgresql://{self.postgres_user}:{self.postgres_password}" \
+               f"@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
+
+    def pool_options(self, url: str) -> Dict[str, Any]:
+        """
+        Return the pool options for a database url.
+
+        Only the postgres backend (asyncpg) manages a real pool, other
+        backends get no option.
+
+        Args:
+            url: A database url
+
+        Returns:
+            Keyword arguments for `databases.Database`
+        """
+        if database_dialect(url) != "postgresql":
+            return {}
+
+        return {
+            "min_size": self.pool_min_size,
+            "max_size": self.pool_max_size,
+            "max_inactive_connection_lifetime": self.pool_max_idle_time,
+            "max_queries": self.pool_max_queries,
+        }
+
+
+class FeedProviderSettings(BaseSettings):
+    """Feed provider settings."""
+
+    # "memory" keeps feeds in the worker memory, without database
+    feed_provider: Literal["database", "memory"] = "database"
+
+
+class FeedHubSettings(BaseSettings):
+    """Websocket broadcast settings."""
+
+    ws_queue_size: int = 100
+    ws_slow_consumer_policy: Literal["drop", "disconnect"] = "drop"
+    # Feeds missed by a reconnecting client, read per query
+    ws_replay_chunk_size: int = 100
+    # Beyond, the client is closed with code 4000 and reloads the page
+    ws_replay_max: int = 10000
+    # `?delivery=batch` clients get the feeds queued for `ws_batch_delay`
+    # seconds, or up to `ws_batch_max_feeds`, in one array frame
+    ws_batch_delay: float = 0.05
+    ws_batch_max_feeds: int = 100
+    # Per-Message Deflate negotiated by `python -m src.commands.serve`,
+    # messages smaller than `ws_deflate_min_size` bytes aren't compressed
+    ws_deflate: bool = True
+    ws_deflate_min_size: int = 512
+    ws_deflate_level: int = 6
+    ws_deflate_window_bits: int = 12
+    ws_deflate_mem_level: int = 5
+    ws_deflate_no_context_takeover: bool = False
+    # (origin, event) topics a websocket client can subscribe to
+    ws_max_topics: int = 100
+    # Websocket and SSE clients of a worker, beyond they are refused with
+    # close code 1013 or status 503; unlimited if 0
+    ws_max_connections: int = 10000
+    # Pings of `python -m src.commands.serve`: a client not answering
+    # within `ws_ping_timeout` seconds is disconnected; no ping if 0
+    ws_ping_interval: float = 20.0
+    ws_ping_timeout: float = 20.0
+    # A client not reading a frame within `ws_send_timeout` seconds is
+    # evicted, its queued feeds are dropped
+    ws_send_timeout: float = 10.0
+
+
+class FeedStreamSettings(BaseSettings):
+    """Server-Sent Events settings of /feeds/stream."""
+
+    # Seconds without feed before a comment line keeps the stream alive
+    sse_heartbeat_interval: float = 15.0
+    # Reconnection delay advised to the clients, in milliseconds
+    sse_retry: int = 3000
+
+
+class FeedBrokerSettings(BaseSettings):
+    """Feed broker settings."""
+
+    broker: Literal["memory", "postgres"] = "memory"
+    broker_channel: str = "simplefeed_feeds"
+    broker_batch_delay: float = 0.01
+    broker_batch_size: int = 100
+    broker_max_pending: int = 10000
+    broker_reconnect_delay: float = 1.0
+    broker_health_interval: float = 30.0
+
+
+class RootPageSettings(BaseSettings):
+    """Landing page settings."""
+
+    root_page_size: int = 50
+
+
+class FeedPartitionSettings(BaseSettings):
+    """Partition maintenance settings of the feed table (Postgres)."""
+
+    partition_interval: Literal["day", "month"] = "month"
+    # Partitions created ahead of the current one
+    partition_premake: int = 3
+    # Partitions kept before the current one, all of them if None
+    partition_retention: Optional[int] = None
+
+
+class MetricsSettings(BaseSettings):
+    """Instrumentation settings."""
+
+    # Time requests and queries, exposed at /metrics
+    metrics_enabled: bool = True
@@ -0,0 +1,402 @@
+"""Feature: feed."""
+import asyncio
+import itertools
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set, \
+    Tuple
+
+from src.domains.feed import FeedCapacityError, FeedDetail, \
+    FeedSubscriptionError, SubscriberStats
+from src.interfaces.feed import FeedPublisherInterface, \
+    FeedSubscriberInterface
+
+
+# A topic of the feed hub is an (origin, event) pair, None matches any value.
+Topic = Tuple[Optional[str], Optional[str]]
+EVERY_FEED: Topic = (None, None)
+
+
+class FeedSubscriber(FeedSubscriberInterface):
+    """
+    A subscriber of the feed hub, e.g. a websocket connection.
+
+    Feeds are queued in a bounded queue. When the queue is full, the
+    `drop` policy discards the oldest feed, the `disconnect` policy
+    closes the subscriber.
+    """
+
+    def __init__(self, queue_size: int, policy: str, subscriber_id: int = 0):
+        """Init."""
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.policy = policy
+        self.id = subscriber_id
+        self.topics: Set[Topic] = set()
+        self.dropped = 0
+        self.closed = False
+        self.feeds_sent = 0
+        self.frames_sent = 0
+        self.bytes_sent = 0
+
+    def sent(self, feeds: int, size: int) -> None:
+        """
+        Count a frame sent to the client.
+
+        Args:
+            feeds: The number of feeds of the frame
+            size: The size of the frame in bytes, before compression
+        """
+        self.feeds_sent += feeds
+        self.frames_sent += 1
+        self.bytes_sent += size
+
+    def stats(self) -> SubscriberStats:
+        """
+        Return the delivery statistics.
+
+        Returns:
+            A SubscriberStats DTO
+        """
+        return SubscriberStats(
+            id=self.id,
+            feeds=self.feeds_sent,
+            frames=self.frames_sent,
+            bytes=self.bytes_sent,
+            queued=self.queue.qsize(),
+            dropped=self.dropped,
+        )
+
+    def put(self, feed: FeedDetail) -> None:
+        """
+        Queue a feed without waiting.
+
+        Args:
+            feed: A FeedDetail DTO
+        """
+        if self.closed:
+            return
+
+        if self.queue.full():
+            if self.policy == "disconnect":
+                self.close()
+                return
+            self.queue.get_nowait()
+            self.dropped += 1
+
+        self.queue.put_nowait(feed)
+
+    async def get(self) -> Optional[FeedDetail]:
+        """
+        Wait for the next feed.
+
+        Returns:
+            A FeedDetail DTO or None once the subscriber is closed
+        """
+        if self.closed and self.queue.empty():
+            return None
+
+        return await self.queue.get()
+
+    def close(self) -> None:
+        """Close the subscriber, pending feeds are discarded."""
+        self.closed = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        # Wake up the consumer.
+        self.queue.put_nowait(None)
+
+
+class FeedHub(FeedPublisherInterface):
+    """
+    In-process pub/sub hub fanning out new feeds to subscribers.
+
+    Subscribers are indexed by topic: a feed is only offered to the
+    subscribers of its (origin, event), (origin, any), (any, event) and
+    (any, any) topics, publishing costs the number of matching subscribers.
+    """
+
+    def __init__(
+            self,
+            queue_size: int = 100,
+            policy: str = "drop",
+            max_topics: int = 100,
+            max_subscribers: int = 0,
+    ):
+        """
+        Init.
+
+        Args:
+            queue_size: Feeds queued per subscriber
+            policy: What happens to a full queue, see FeedSubscriber
+            max_topics: Topics per subscriber
+            max_subscribers: Subscribers of the hub, unlimited if 0
+        """
+        self.queue_size = queue_size
+        self.policy = policy
+        self.max_topics = max_topics
+        self.max_subscribers = max_subscribers
+        # Subscriptions refused because the hub was full, subscribers
+        # closed because they stopped reading
+        self.rejected = 0
+        self.evicted = 0
+        self.subscribers: Set[FeedSubscriber] = set()
+        self._topics: Dict[Topic, Set[FeedSubscriber]] = {}
+        # Delivery counters of the subscribers gone
+        self.feeds_sent = 0
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self._ids = itertools.count(1)
+
+    @staticmethod
+    def topics(
+            origins: Optional[Iterable[str]] = None,
+            events: Optional[Iterable[str]] = None,
+    ) -> Set[Topic]:
+        """
+        Return the topics of feeds matching any origin and any event.
+
+        Args:
+            origins: Any origin if empty or None
+            events: Any event if empty or None
+
+        Returns:
+            A set of topics
+        """
+        return {
+            (origin, event)
+            for origin in (origins or [None])
+            for event in (events or [None])
+        }
+
+    @property
+    def full(self) -> bool:
+        """Return True if the hub can't take one more subscriber."""
+        return 0 < self.max_subscribers <= len(self.subscribers)
+
+    def subscribe(
+            self,
+            topics: Optional[Iterable[Topic]] = None,
+    ) -> FeedSubscriber:
+        """
+        Add a subscriber.
+
+        Args:
+            topics: The topics of the subscriber, every feed if None
+
+        Raises:
+            FeedCapacityError: the hub has `max_subscribers` already.
+            FeedSubscriptionError: too many topics.
+
+        Returns:
+            A FeedSubscriber
+        """
+        if self.full:
+            self.rejected += 1
+            raise FeedCapacityError(
+                f"The hub can't have more than {self.max_subscribers} "
+                f"subscribers.")
+
+        subscriber = FeedSubscriber(
+            queue_size=self.queue_size, policy=self.policy,
+            subscriber_id=next(self._ids))
+        self.subscribe_topics(
+            subscriber=subscriber,
+            topics={EVERY_FEED} if topics is None else topics)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def subscribe_topics(
+            self,
+            subscriber: FeedSubscriber,
+            topics: Iterable[Topic],
+    ) -> None:
+        """
+        Add topics to a subscriber.
+
+        Args:
+            subscriber: A FeedSubscriber
+            topics: The topics to add
+
+        Raises:
+            FeedSubscriptionError: the subscriber would have more than
+                `max_topics` topics, none is added.
+        """
+        topics = set(topics) - subscriber.topics
+        if len(subscriber.topics) + len(topics) > self.max_topics:
+            raise FeedSubscriptionError(
+                f"A subscriber can't have more than {self.max_topics} "
+                f"topics.")
+
+        for topic in topics:
+            self._topics.setdefault(topic, set()).add(subscriber)
+        subscriber.topics |= topics
+
+    def unsubscribe_topics(
+            self,
+            subscriber: FeedSubscriber,
+            topics: Iterable[Topic],
+    ) -> None:
+        """
+        Remove topics of a subscriber.
+
+        Args:
+            subscriber: A FeedSubscriber
+            topics: The topics to remove, unknown ones are ignored
+        """
+        for topic in set(topics) & subscriber.topics:
+            subscribers = self._topics[topic]
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._topics[topic]
+            subscriber.topics.discard(topic)
+
+    def unsubscribe(self, subscriber: FeedSubscriber) -> None:
+        """
+        Remove a subscriber.
+
+        Args:
+            subscriber: A FeedSubscriber
+        """
+        if subscriber in self.subscribers:
+            self.unsubscribe_topics(
+                subscriber=subscriber, topics=list(subscriber.topics))
+            self.subscribers.discard(subscriber)
+            self.feeds_sent += subscriber.feeds_sent
+            self.frames_sent += subscriber.frames_sent
+            self.bytes_sent += subscriber.bytes_sent
+
+    def evict(self, subscriber: FeedSubscriber) -> None:
+        """
+        Close a subscriber not reading its feeds, e.g. a half-open socket.
+
+        Args:
+            subscriber: A FeedSubscriber, unsubscribed by its reader
+        """
+        subscriber.close()
+        self.evicted += 1
+
+    def sent_totals(self) -> SubscriberStats:
+        """
+        Return the delivery counters of every subscriber, gone or not.
+
+        Returns:
+            A SubscriberStats DTO, with the number of subscribers as id
+        """
+        totals = SubscriberStats(
+            id=len(self.subscribers),
+            feeds=self.feeds_sent,
+            frames=self.frames_sent,
+            bytes=self.bytes_sent,
+        )
+        for subscriber in self.subscribers:
+            totals.feeds += subscriber.feeds_sent
+            totals.frames += subscriber.frames_sent
+            totals.bytes += subscriber.bytes_sent
+            totals.queued += subscriber.queue.qsize()
+            totals.dropped += subscriber.dropped
+        return totals
+
+    async def publish(self, feed: FeedDetail) -> None:
+        """
+        Send a feed to every subscriber of its topics.
+
+        Never waits on a subscriber, a slow one only affects its own queue.
+
+        Args:
+            feed: A FeedDetail DTO
+        """
+        subscribers: Set[FeedSubscriber] = set()
+        for topic in ((feed.origin, feed.event), (feed.origin, None),
+                      (None, feed.event), EVERY_FEED):
+            subscribers.update(self._topics.get(topic, ()))
+
+        for subscriber in subscribers:
+            subscriber.put(feed)
+            if subscriber.closed:
+                self.unsubscribe(subscriber)
+
+
+async def batch_feeds(
+        feeds: AsyncIterator[FeedDetail],
+        delay: float,
+        max_feeds: int,
+) -> AsyncIterator[List[FeedDetail]]:
+    """
+    Group feeds into batches.
+
+    A batch is yielded `delay` seconds after its first feed, or once it
+    has `max_feeds` feeds, whichever comes first.
+
+    Args:
+        feeds: An async iterator of FeedDetail DTO
+        delay: Maximum delay of a feed, in seconds
+        max_feeds: Maximum number of feeds per batch
+
+    Returns:
+        An async iterator of lists of FeedDetail DTO
+    """
+    loop = asyncio.get_running_loop()
+    iterator = feeds.__aiter__()
+    # The next feed is awaited by a task: waiting for it with a timeout
+    # must not cancel the iterator.
+    pending = asyncio.ensure_future(iterator.__anext__())
+    try:
+        while True:
+            batch: List[FeedDetail] = []
+            deadline: Optional[float] = None
+            while len(batch) < max_feeds:
+                timeout = None if deadline is None \
+                    else max(deadline - loop.time(), 0)
+                done, _ = await asyncio.wait({pending}, timeout=timeout)
+                if not done:
+                    break
+
+                try:
+                    batch.append(pending.result())
+                except StopAsyncIteration:
+                    if batch:
+                        yield batch
+                    return
+
+                if deadline is None:
+                    deadline = loop.time() + delay
+                pending = asyncio.ensure_future(iterator.__anext__())
+
+            yield batch
+
+    finally:
+        pending.cancel()
+
+
+async def heartbeat_feeds(
+        feeds: AsyncIterator[FeedDetail],
+        interval: float,
+) -> AsyncIterator[Optional[FeedDetail]]:
+    """
+    Yield the feeds, and None after `interval` seconds without feed.
+
+    Args:
+        feeds: An async iterator of FeedDetail DTO
+        interval: Seconds without feed before a heartbeat
+
+    Returns:
+        An async iterator of FeedDetail DTO or None for a heartbeat
+    """
+    iterator = feeds.__aiter__()
+    # Waiting for the next feed with a timeout must not cancel the iterator.
+    pending = asyncio.ensure_future(iterator.__anext__())
+    try:
+        while True:
+            done, _ = await asyncio.wait({pending}, timeout=interval)
+            if not done:
+                yield None
+                continue
+
+            try:
+                feed = pending.result()
+            except StopAsyncIteration:
+                return
+
+            pending = asyncio.ensure_future(iterator.__anext__())
+            yield feed
+
+    finally:
+        pending.cancel()
@@ -0,0 +1,261 @@
+"""Feature: metrics."""
+import bisect
+import math
+import os
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+Labels = Tuple[str, ...]
+
+# Prometheus default buckets, in seconds.
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0,
+    7.5, 10.0,
+)
+
+
+def _escape(value: str) -> str:
+    """Escape a label value of the Prometheus text format."""
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r'\"')
+
+
+def _number(value: float) -> str:
+    """Format a sample value of the Prometheus text format."""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def resident_memory() -> Optional[float]:
+    """
+    Return the resident memory of the process.
+
+    Returns:
+        A number of bytes, None if unknown (no /proc, e.g. macOS)
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+
+    return float(pages * os.sysconf("SC_PAGE_SIZE"))
+
+
+class Metric:
+    """A metric family, its samples are split by label values."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str]):
+        """Init."""
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+
+    def _label_text(self, values: Labels, extra: str = "") -> str:
+        """Return the labels of a sample, e.g. `{route="/feeds"}`."""
+        pairs = [
+            f'{name}="{_escape(value)}"'
+            for name, value in zip(self.labels, values)
+        ]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self) -> List[str]:
+        """Return the sample lines."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """Return the metric family in the Prometheus text format."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Value(Metric):
+    """
+    A metric with a value per label set.
+
+    Given a `collect` callable, the value is read when rendered: it
+    returns a value or a value per label set.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            labels: Sequence[str],
+            collect: Optional[
+                Callable[[], Union[float, Dict[Labels, float]]]] = None,
+    ):
+        """Init."""
+        super().__init__(name, documentation, labels)
+        self.values: Dict[Labels, float] = {}
+        self.collect = collect
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        """
+        Increase the value of a label set.
+
+        Args:
+            labels: The label values, in the order of the metric labels
+            amount: The increment
+        """
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        """Return the sample lines."""
+        values = self.values
+        if self.collect is not None:
+            collected = self.collect()
+            values = collected if isinstance(collected, dict) \
+                else {(): collected}
+
+        return [
+            f"{self.name}{self._label_text(labels)} {_number(value)}"
+            for labels, value in sorted(values.items())
+        ]
+
+
+class Counter(Value):
+    """A value that only increases, e.g. a number of timeouts."""
+
+    type = "counter"
+
+
+class Gauge(Value):
+    """A value that goes up and down, e.g. a number of requests in flight."""
+
+    type = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        """Decrease the value of a label set."""
+        self.values[labels] = self.values.get(labels, 0.0) - amount
+
+    def set(self, *labels: str, value: float) -> None:
+        """Set the value of a label set."""
+        self.values[labels] = value
+
+
+class Histogram(Metric):
+    """Observed values counted in cumulative buckets, e.g. latencies."""
+
+    type = "histogram"
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            labels: Sequence[str],
+            buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        """Init."""
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: the count of each bucket (not cumulative, the last
+        # one is +Inf), the sum and the count of the observed values.
+        self.values: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, *labels: str, value: float) -> None:
+        """
+        Count an observed value.
+
+        Args:
+            labels: The label values, in the order of the metric labels
+            value: e.g. a duration in seconds
+        """
+        state = self.values.get(labels)
+        if state is None:
+            state = self.values[labels] = (
+                [0] * (len(self.buckets) + 1), [0.0, 0])
+        counts, totals = state
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        totals[0] += value
+        totals[1] += 1
+
+    def samples(self) -> List[str]:
+        """Return the sample lines."""
+        lines = []
+        bounds = [_number(bound) for bound in self.buckets] + ["+Inf"]
+        for labels, (counts, (total, count)) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                le = f'le="{bound}"'
+                lines.append(
+                    f"{self.name}_bucket{self._label_text(labels, le)} "
+                    f"{cumulative}")
+            lines.append(
+                f"{self.name}_sum{self._label_text(labels)} {_number(total)}")
+            lines.append(
+                f"{self.name}_count{self._label_text(labels)} {int(count)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Metrics of the process, rendered in the Prometheus text format."""
+
+    # Text responses add `; charset=utf-8`.
+    CONTENT_TYPE = "text/plain; version=0.0.4"
+
+    def __init__(self):
+        """Init."""
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        """
+        Add a metric.
+
+        Raises:
+            ValueError: a metric with the same name exists
+
+        Returns:
+            The metric
+        """
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered.")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(
+            self,
+            name: str,
+            documentation: str,
+            labels: Sequence[str] = (),
+            collect: Optional[
+                Callable[[], Union[float, Dict[Labels, float]]]] = None,
+    ) -> Counter:
+        """Add a counter, read from `collect` when rendered if given."""
+        return self.register(Counter(name, documentation, labels, collect))
+
+    def gauge(
+            self,
+            name: str,
+            documentation: str,
+            labels: Sequence[str] = (),
+            collect: Optional[
+                Callable[[], Union[float, Dict[Labels, float]]]] = None,
+    ) -> Gauge:
+        """Add a gauge, read from `collect` when rendered if given."""
+        return self.register(Gauge(name, documentation, labels, collect))
+
+    def histogram(
+            self,
+            name: str,
+            documentation: str,
+            labels: Sequence[str] = (),
+            buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """Add a histogram."""
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text format."""
+        return "".join(
+            metric.render() + "\n" for metric in self.metrics.values())
@@ -1,44 +1,344 @@
 """Feature: feed."""
-from typing import Optional
+import base64
+import datetime
+from typing import List, Literal, Optional
 
-from pydantic import BaseModel
-from sqlalchemy import Column, Integer, String
+from pydantic import BaseModel, Field
+from sqlalchemy import DDL, Column, DateTime, Index, Integer, String, \
+    event, func
 from sqlalchemy.orm import declarative_base
 
 Base = declarative_base()
 
 
 class FeedModel(Base):
-    """Feed model."""
+    """
+    Feed model.
+
+    On Postgres, the migrations range-partition the table by created_at
+    (see alembic/versions/e5a7c9d2f605), its primary key is then
+    (id, created_at). Ids still come from one sequence and stay unique,
+    the model keeps id alone: `create_all` makes a plain table. Lookups
+    by id without a created_at bound probe the index of every partition.
+    """
 
     __tablename__ = "feed"
+    __table_args__ = (
+        # Filters on origin or event, ordered by id for keyset pagination.
+        Index("ix_feed_origin_id", "origin", "id"),
+        Index("ix_feed_event_id", "event", "id"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     origin = Column(String(25))
     event = Column(String(25))
     description = Column(String(255))
-    # date_time: Column(DateTime(timezone=True))
+    created_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        index=True,
+    )
 
     def __repr__(self):
         """Feed representation."""
         return f"{self.__class__.__name__}(id={self.id}, " \
                f"origin={self.origin}, event={self.event}, " \
-               f"description={self.description})"
+               f"description={self.description}, " \
+               f"created_at={self.created_at})"
+
+
+class FeedStatsModel(Base):
+    """
+    Feed counts per hour, origin and event.
+
+    The counts of new feeds are appended to feed_stats_delta by the
+    transaction creating them, then folded in here periodically:
+    statistics are read from both without scanning the feed table.
+    """
+
+    __tablename__ = "feed_stats"
+
+    bucket = Column(DateTime(timezone=True), primary_key=True)
+    origin = Column(String(25), primary_key=True)
+    event = Column(String(25), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        """Feed stats representation."""
+        return f"{self.__class__.__name__}(bucket={self.bucket}, " \
+               f"origin={self.origin}, event={self.event}, " \
+               f"count={self.count})"
+
+
+class FeedStatsDeltaModel(Base):
+    """
+    Feed counts per hour, origin and event, not yet in feed_stats.
+
+    Rows are only inserted, concurrent transactions don't wait for each
+    other, and deleted when folded in feed_stats.
+    """
+
+    __tablename__ = "feed_stats_delta"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    bucket = Column(DateTime(timezone=True), nullable=False)
+    origin = Column(String(25), nullable=False)
+    event = Column(String(25), nullable=False)
+    count = Column(Integer, nullable=False)
+
+    def __repr__(self):
+        """Feed stats delta representation."""
+        return f"{self.__class__.__name__}(bucket={self.bucket}, " \
+               f"origin={self.origin}, event={self.event}, " \
+               f"count={self.count})"
+
+
+# Rows of the feed_version counter: a transaction bumps one of them.
+FEED_VERSION_SHARDS = 16
+
+
+class FeedVersionModel(Base):
+    """
+    Version of the feeds, the sum of a few counter rows.
+
+    Every transaction creating or deleting feeds bumps one row, picked at
+    random: concurrent transactions seldom wait for each other. The sum is
+    read in constant time for the ETag of the feeds.
+    """
+
+    __tablename__ = "feed_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        """Feed version representation."""
+        return f"{self.__class__.__name__}(version={self.version})"
+
+
+# Full-text index on descriptions, maintained by the database itself and
+# not mapped: a generated tsvector column on Postgres, an external content
+# FTS5 table kept in sync by triggers on SQLite.
+FEED_SEARCH_DDL = {
+    "postgresql": [
+        "ALTER TABLE feed ADD COLUMN search_vector tsvector "
+        "GENERATED ALWAYS AS "
+        "(to_tsvector('simple', coalesce(description, ''))) STORED",
+        "CREATE INDEX ix_feed_search_vector ON feed "
+        "USING gin (search_vector)",
+    ],
+    "sqlite": [
+        "CREATE VIRTUAL TABLE feed_fts USING fts5("
+        "description, content='feed', content_rowid='id')",
+        "CREATE TRIGGER feed_fts_insert AFTER INSERT ON feed BEGIN "
+        "INSERT INTO feed_fts(rowid, description) "
+        "VALUES (new.id, new.description); END",
+        "CREATE TRIGGER feed_fts_delete AFTER DELETE ON feed BEGIN "
+        "INSERT INTO feed_fts(feed_fts, rowid, description) "
+        "VALUES ('delete', old.id, old.description); END",
+        "CREATE TRIGGER feed_fts_update AFTER UPDATE ON feed BEGIN "
+        "INSERT INTO feed_fts(feed_fts, rowid, description) "
+        "VALUES ('delete', old.id, old.description); "
+        "INSERT INTO feed_fts(rowid, description) "
+        "VALUES (new.id, new.description); END",
+    ],
+}
+
+for dialect, statements in FEED_SEARCH_DDL.items():
+    for statement in statements:
+        event.listen(
+            FeedModel.__table__,
+            "after_create",
+            DDL(statement).execute_if(dialect=dialect),
+        )
 
 
 class Feed(BaseModel):
-    """Base Feed DTO."""
+    """Base Feed DTO, within the lengths of the feed table."""
 
-    origin: str
-    event: str
-    description: str
+    origin: str = Field(..., max_length=25)
+    event: str = Field(..., max_length=25)
+    description: str = Field(..., max_length=255)
 
 
 class FeedDetail(Feed):
     """Feed detail."""
 
     id: Optional[int] = None
-    # date_time: datetime.datetime
+    created_at: Optional[datetime.datetime] = None
+
+
+class FeedSearchHit(FeedDetail):
+    """Feed found by a full-text search."""
+
+    rank: float
+
+
+class OpaqueCursor(BaseModel):
+    """Keyset cursor sent to clients as an opaque string."""
+
+    def encode(self) -> str:
+        """
+        Encode the cursor.
+
+        Returns:
+            An url-safe opaque string
+        """
+        return base64.urlsafe_b64encode(
+            self.json(exclude_none=True).encode()).decode()
+
+    @classmethod
+    def decode(cls, cursor: str):
+        """
+        Decode a cursor.
+
+        Args:
+            cursor: An opaque string returned by `encode`
+
+        Raises:
+            FeedCursorError: cursor is invalid.
+
+        Returns:
+            A cursor of this class
+        """
+        try:
+            return cls.parse_raw(base64.urlsafe_b64decode(cursor.encode()))
+        except ValueError:
+            raise FeedCursorError(f"Invalid cursor '{cursor}'.")
+
+
+class FeedCursor(OpaqueCursor):
+    """Opaque keyset cursor on feed id."""
+
+    after_id: Optional[int] = None
+    before_id: Optional[int] = None
+
+    @property
+    def backward(self) -> bool:
+        """Return True if the page is read from the newest to the oldest."""
+        return self.before_id is not None and self.after_id is None
+
+
+class FeedSearchCursor(OpaqueCursor):
+    """Opaque keyset cursor on the rank and id of a search hit."""
+
+    rank: float
+    id: int
+
+
+class FeedPage(BaseModel):
+    """A page of feeds."""
+
+    feeds: List[FeedDetail]
+    next_cursor: Optional[str] = None
+
+
+class FeedSearchPage(BaseModel):
+    """A page of search hits."""
+
+    hits: List[FeedSearchHit]
+    next_cursor: Optional[str] = None
+
+
+class FeedBatchError(BaseModel):
+    """Error on one feed of a batch."""
+
+    index: int
+    detail: str
+
+
+class FeedBatchResult(BaseModel):
+    """Result of a batch of feeds creation."""
+
+    ids: List[Optional[int]]
+    errors: List[FeedBatchError] = []
+
+
+class PoolStats(BaseModel):
+    """Connection pool statistics."""
+
+    min_size: int = 0
+    max_size: int = 0
+    size: int = 0
+    in_use: int = 0
+    idle: int = 0
+    acquired: int = 0
+    timeouts: int = 0
+    wait_time_total: float = 0.0
+    wait_time_max: float = 0.0
+    replicas: int = 0
+    replicas_healthy: int = 0
+
+
+class FeedStats(BaseModel):
+    """Number of feeds created, per hour, origin or event if grouped."""
+
+    bucket: Optional[datetime.datetime] = None
+    origin: Optional[str] = None
+    event: Optional[str] = None
+    count: int
+
+
+class CacheStats(BaseModel):
+    """Feed cache statistics."""
+
+    size: int = 0
+    max_size: int = 0
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+class FeedTopic(BaseModel):
+    """Feeds of an origin and an event, any of them if None."""
+
+    origin: Optional[str] = None
+    event: Optional[str] = None
+
+
+class FeedSubscription(BaseModel):
+    """
+    Change of the topics of a websocket client, e.g.
+
+        {"action": "subscribe", "topics": [{"origin": "github.com"}]}
+
+    The topic `{}` matches every feed.
+    """
+
+    action: Literal["subscribe", "unsubscribe"]
+    topics: List[FeedTopic]
+
+
+class SubscriberStats(BaseModel):
+    """Delivery statistics of a feed hub subscriber, e.g. a websocket."""
+
+    id: int
+    feeds: int = 0
+    frames: int = 0
+    bytes: int = 0
+    queued: int = 0
+    dropped: int = 0
+
+
+class FeedPartition(BaseModel):
+    """
+    A partition of the feed table.
+
+    It holds the feeds created from start (inclusive, unbounded if None) to
+    end (exclusive, unbounded if None). The default partition has neither.
+    """
+
+    name: str
+    start: Optional[datetime.datetime] = None
+    end: Optional[datetime.datetime] = None
+
+
+class FeedPartitionReport(BaseModel):
+    """Partitions created and dropped by a maintenance run."""
+
+    created: List[FeedPartition] = []
+    dropped: List[FeedPartition] = []
 
 
 class FeedExceptions(Exception):
@@ -47,3 +347,23 @@ class FeedExceptions(Exception):
 
 class FeedCreateError(FeedExceptions):
     """Raise when trying to create a new feed."""
+
+
+class FeedPoolTimeoutError(FeedExceptions):
+    """Raise when no database connection is available in time."""
+
+
+class FeedCursorError(FeedExceptions):
+    """Raise when a pagination cursor can't be decoded."""
+
+
+class FeedReplayError(FeedExceptions):
+    """Raise when too many feeds were missed to replay them."""
+
+
+class FeedSubscriptionError(FeedExceptions):
+    """Raise when a subscription to new feeds is invalid."""
+
+
+class FeedCapacityError(FeedExceptions):
+    """Raise when there is no room for one more subscriber to new feeds."""
@@ -1,24 +1,120 @@
 """Feature: feed."""
 
 import abc
-from typing import List, Optional
+import datetime
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, \
+    Sequence
 
-from src.domains.feed import FeedDetail, Feed
+from src.domains.feed import FeedDetail, Feed, FeedBatchResult, \
+    FeedSearchCursor, FeedSearchHit, FeedPartition, FeedStats
 
 
 class SimpleFeedInterface(abc.ABC):
     """Abstract class for SimpleFeed."""
 
     @abc.abstractmethod
-    async def read_feeds(self) -> List[FeedDetail]:
+    async def read_feeds(
+            self,
+            limit: Optional[int] = None,
+            after_id: Optional[int] = None,
+            before_id: Optional[int] = None,
+            newest: bool = False,
+            since: Optional[datetime.datetime] = None,
+            until: Optional[datetime.datetime] = None,
+            origins: Optional[List[str]] = None,
+            events: Optional[List[str]] = None,
+    ) -> List[FeedDetail]:
         """
-        Read feeds.
+        Read feeds ordered by id.
+
+        Args:
+            limit: Maximum number of feeds, all feeds if None
+            after_id: Only feeds with an id greater than after_id
+            before_id: Only feeds with an id lower than before_id. Without
+                after_id, the limit applies to the newest feeds.
+            newest: Without after_id, the limit applies to the newest feeds
+            since: Only feeds created at or after since
+            until: Only feeds created before until
+            origins: Only feeds from one of these origins
+            events: Only feeds of one of these events
 
         Returns:
             A list of FeedDetail DTO
         """
         raise NotImplementedError
 
+    @abc.abstractmethod
+    async def read_feeds_version(self) -> str:
+        """
+        Read a version of the feeds, changed by any creation or deletion.
+
+        Returns:
+            A version string
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def iter_feeds(
+            self,
+            after_id: Optional[int] = None,
+    ) -> AsyncIterator[FeedDetail]:
+        """
+        Iterate over feeds ordered by id without loading them in memory.
+
+        Args:
+            after_id: Only feeds with an id greater than after_id
+
+        Returns:
+            An async iterator of FeedDetail DTO
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def search_feeds(
+            self,
+            terms: str,
+            limit: int,
+            after: Optional[FeedSearchCursor] = None,
+    ) -> List[FeedSearchHit]:
+        """
+        Search feeds by the words of their description, best ranked first.
+
+        Args:
+            terms: Words to search
+            limit: Maximum number of hits
+            after: Only hits ranked after this cursor
+
+        Returns:
+            A list of FeedSearchHit DTO
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def read_feed_stats(
+            self,
+            bucket: str = "total",
+            group_by: Sequence[str] = ("origin", "event"),
+            since: Optional[datetime.datetime] = None,
+            until: Optional[datetime.datetime] = None,
+            origins: Optional[List[str]] = None,
+            events: Optional[List[str]] = None,
+    ) -> List[FeedStats]:
+        """
+        Read the number of feeds created.
+
+        Args:
+            bucket: "hour" for a count per hour, "total" for all hours
+            group_by: A count per "origin" and/or "event"
+            since: Only hours starting at or after since
+            until: Only hours starting before until
+            origins: Only feeds from one of these origins
+            events: Only feeds of one of these events
+
+        Returns:
+            A list of FeedStats DTO
+        """
+        raise NotImplementedError
+
     @abc.abstractmethod
     async def read_feed_by_id(self, feed_id: int) -> Optional[FeedDetail]:
         """
@@ -44,3 +140,142 @@ class SimpleFeedInterface(abc.ABC):
             A key id
         """
         raise NotImplementedError
+
+    @abc.abstractmethod
+    async def create_feeds(self, feeds: List[Feed]) -> FeedBatchResult:
+        """
+        Create new feeds.
+
+        A feed that can't be created doesn't prevent the others to be.
+
+        Args:
+            feeds: A list of Feed DTO.
+
+        Returns:
+            A FeedBatchResult DTO, ids in input order
+        """
+        raise NotImplementedError
+
+
+class FeedPublisherInterface(abc.ABC):
+    """Abstract class for publishing new feeds."""
+
+    @abc.abstractmethod
+    async def publish(self, feed: FeedDetail) -> None:
+        """
+        Publish a new feed.
+
+        Args:
+            feed: A FeedDetail DTO
+        """
+        raise NotImplementedError
+
+
+class FeedSubscriberInterface(abc.ABC):
+    """
+    Abstract class for a subscriber of new feeds.
+
+    `dropped` counts the feeds discarded because the subscriber was too
+    slow.
+    """
+
+    dropped: int = 0
+
+    @abc.abstractmethod
+    async def get(self) -> Optional[FeedDetail]:
+        """
+        Wait for the next feed.
+
+        Returns:
+            A FeedDetail DTO or None once the subscriber is closed
+        """
+        raise NotImplementedError
+
+
+class FeedBrokerInterface(FeedPublisherInterface):
+    """
+    Abstract class for a feed broker.
+
+    A broker delivers the published feeds and dropped partitions to the
+    handlers subscribed in every worker, including the publishing one.
+    """
+
+    @abc.abstractmethod
+    def subscribe(
+            self,
+            handler: Callable[[FeedDetail], Awaitable[None]]
+    ) -> None:
+        """
+        Add a handler called for each published feed.
+
+        Args:
+            handler: An async callable taking a FeedDetail DTO
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def subscribe_dropped(
+            self,
+            handler: Callable[[FeedPartition], Awaitable[None]]
+    ) -> None:
+        """
+        Add a handler called for each dropped partition.
+
+        Args:
+            handler: An async callable taking a FeedPartition DTO
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def publish_dropped(self, partition: FeedPartition) -> None:
+        """
+        Tell every worker that a partition and its feeds were dropped.
+
+        Args:
+            partition: A FeedPartition DTO
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def start(self) -> None:
+        """Start receiving feeds."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def stop(self) -> None:
+        """Deliver the pending feeds and stop receiving feeds."""
+        raise NotImplementedError
+
+
+class FeedPartitionInterface(abc.ABC):
+    """Abstract class for the partitions of the feed table."""
+
+    @abc.abstractmethod
+    async def read_partitions(self) -> List[FeedPartition]:
+        """
+        Read the partitions of the feed table.
+
+        Returns:
+            A list of FeedPartition DTO
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def create_partition(self, partition: FeedPartition) -> None:
+        """
+        Create a partition of the feed table.
+
+        Args:
+            partition: A FeedPartition DTO with a start and an end
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def drop_partition(self, partition: FeedPartition) -> None:
+        """
+        Drop a partition of the feed table and its feeds.
+
+        Args:
+            partition: A FeedPartition DTO
+        """
+        raise NotImplementedError
@@ -1,42 +1,814 @@
 """Feature: feed."""
-from typing import List, Optional
+import asyncio
+import bisect
+import datetime
+import heapq
+import json
+import random
+import re
+import time
+from array import array
+from collections import Counter, OrderedDict
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, \
+    List, Optional, Sequence, Set, Tuple
 
+import asyncpg
 from databases import Database
-from sqlalchemy import select, insert
+from databases.core import Connection
+from sqlalchemy import String, and_, bindparam, column, func, insert, \
+    literal_column, or_, select, table, text, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.sql.elements import TextClause
 
-from src.domains.feed import FeedDetail, FeedModel, FeedCreateError, Feed
-from src.interfaces.feed import SimpleFeedInterface
+from src.configs.feed import DatabaseSettings, database_dialect
+from src.domains.feed import FeedDetail, FeedModel, FeedCreateError, Feed, \
+    FeedPoolTimeoutError, PoolStats, FeedBatchResult, FeedBatchError, \
+    CacheStats, FeedSearchCursor, FeedSearchHit, FeedPartition, FeedStats, \
+    FeedStatsModel, FeedStatsDeltaModel, FeedVersionModel, \
+    FEED_VERSION_SHARDS
+from src.interfaces.feed import SimpleFeedInterface, FeedBrokerInterface, \
+    FeedPartitionInterface
+
+
+# Set for a client that created feeds recently (read-your-writes): its reads
+# are sent to the primary database instead of a replica.
+READ_FROM_PRIMARY: ContextVar[bool] = ContextVar(
+    "read_from_primary", default=False)
+# Set by `SimpleFeedProvider.pin_read_database` for a request reading
+# several times: its reads go to the same database.
+READ_DATABASE: ContextVar[Optional[Database]] = ContextVar(
+    "read_database", default=None)
+
+
+def bump_feeds_version(dialect: str) -> Any:
+    """
+    Return the statement bumping the version of the feeds.
+
+    Run it last in the transaction creating or deleting feeds: the row is
+    locked until the commit. One of FEED_VERSION_SHARDS rows is bumped,
+    created by its first bump.
+
+    Args:
+        dialect: The dialect of the database, "postgresql" or "sqlite"
+
+    Returns:
+        An INSERT ... ON CONFLICT statement
+    """
+    query = (postgresql if dialect == "postgresql" else sqlite).insert(
+        FeedVersionModel).values(
+        id=random.randrange(FEED_VERSION_SHARDS), version=1)
+    return query.on_conflict_do_update(
+        index_elements=[FeedVersionModel.id],
+        set_={"version": FeedVersionModel.version + 1},
+    )
+
+
+class FeedWriteCoalescer:
+    """
+    Group concurrent feed creations into batches.
+
+    A batch is written when `max_rows` feeds are pending or `delay`
+    seconds after its first feed, whichever comes first.
+    """
+
+    def __init__(
+            self,
+            write: Callable[[List[Feed]], Awaitable[FeedBatchResult]],
+            delay: float,
+            max_rows: int,
+    ):
+        """Init."""
+        self.write = write
+        self.delay = delay
+        self.max_rows = max_rows
+        self._pending: List[Tuple[Feed, asyncio.Future]] = []
+        self._timer: Optional[asyncio.Task] = None
+        self._flushes: Set[asyncio.Task] = set()
+
+    async def submit(self, feed: Feed) -> int:
+        """
+        Add a feed to the next batch.
+
+        Args:
+            feed: A Feed DTO.
+
+        Raises:
+            FeedCreateError: the feed of the batch can't be created.
+
+        Returns:
+            A key id
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((feed, future))
+
+        if len(self._pending) >= self.max_rows:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+
+        return await future
+
+    async def close(self) -> None:
+        """Write the pending feeds and wait for the running batches."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._flush()
+        await asyncio.gather(*self._flushes)
+
+    async def _flush_later(self) -> None:
+        """Write the pending feeds after the delay."""
+        await asyncio.sleep(self.delay)
+        self._timer = None
+        self._flush()
+
+    def _flush(self) -> None:
+        """Write the pending feeds in background."""
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        task = asyncio.create_task(self._write(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _write(self, batch: List[Tuple[Feed, asyncio.Future]]) -> None:
+        """
+        Write a batch and resolve the future of each feed.
+
+        Args:
+            batch: A list of (Feed DTO, future)
+        """
+        try:
+            result = await self.write([feed for feed, _ in batch])
+
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(
+                        FeedCreateError(f"Unable to create a new feed. {exc}"))
+            return
+
+        errors = {error.index: error.detail for error in result.errors}
+        for index, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            if index in errors:
+                future.set_exception(FeedCreateError(errors[index]))
+            else:
+                future.set_result(result.ids[index])
+
+
+class TimedConnection:
+    """
+    A database connection timing each query.
+
+    Every query calls the hooks with the operation of the provider, e.g.
+    `read_feeds`, and its duration in seconds. Streamed queries are timed
+    until the last row.
+    """
+
+    def __init__(
+            self,
+            connection: Connection,
+            operation: str,
+            hooks: List[Callable[[str, float], None]],
+    ):
+        """Init."""
+        self.connection = connection
+        self.operation = operation
+        self.hooks = hooks
+
+    def _observe(self, start: float) -> None:
+        """Call the hooks with the duration of a query."""
+        duration = time.perf_counter() - start
+        for hook in self.hooks:
+            hook(self.operation, duration)
+
+    async def fetch_all(self, query: Any, values: Optional[dict] = None):
+        """Run a query and return every row."""
+        start = time.perf_counter()
+        try:
+            return await self.connection.fetch_all(query=query, values=values)
+        finally:
+            self._observe(start)
+
+    async def fetch_one(self, query: Any, values: Optional[dict] = None):
+        """Run a query and return the first row."""
+        start = time.perf_counter()
+        try:
+            return await self.connection.fetch_one(query=query, values=values)
+        finally:
+            self._observe(start)
+
+    async def fetch_val(
+            self,
+            query: Any,
+            values: Optional[dict] = None,
+            column: Any = 0,
+    ):
+        """Run a query and return a value of the first row."""
+        start = time.perf_counter()
+        try:
+            return await self.connection.fetch_val(
+                query=query, values=values, column=column)
+        finally:
+            self._observe(start)
+
+    async def execute(self, query: Any, values: Optional[dict] = None):
+        """Run a query."""
+        start = time.perf_counter()
+        try:
+            return await self.connection.execute(query=query, values=values)
+        finally:
+            self._observe(start)
+
+    async def execute_many(self, query: Any, values: list):
+        """Run a query with each values."""
+        start = time.perf_counter()
+        try:
+            return await self.connection.execute_many(
+                query=query, values=values)
+        finally:
+            self._observe(start)
+
+    async def iterate(
+            self,
+            query: Any,
+            values: Optional[dict] = None,
+    ) -> AsyncIterator[Any]:
+        """Run a query and stream the rows."""
+        start = time.perf_counter()
+        try:
+            async for row in self.connection.iterate(
+                    query=query, values=values):
+                yield row
+        finally:
+            self._observe(start)
+
+    def transaction(self, **kwargs: Any) -> Any:
+        """Return a transaction of the connection."""
+        return self.connection.transaction(**kwargs)
+
+    @property
+    def raw_connection(self) -> Any:
+        """Return the connection of the driver."""
+        return self.connection.raw_connection
 
 
 class SimpleFeedProvider(SimpleFeedInterface):
-    """Simple feed providers."""
+    """
+    Simple feed providers.
+
+    Rows come from our own database: DTOs are built with `construct`,
+    without validation.
+
+    Feeds are written to the primary database. With replicas, reads are
+    spread across the healthy replicas, and go to the primary when none
+    is healthy or READ_FROM_PRIMARY is set.
+
+    Hooks time the database: `query_hooks` are called with the operation
+    and the duration of every query, `acquire_hooks` with the database
+    (`primary` or `replica`) and the wait of every pool acquire.
+    """
+
+    settings = DatabaseSettings()
+    DATABASE_URL = settings.url
+
+    database = Database(DATABASE_URL, **settings.pool_options(DATABASE_URL))
+
+    # Statements folding feed_stats_delta in feed_stats, by dialect. SQLite
+    # has a single writer: the rows read are the rows deleted.
+    COMPACT_STATS = {
+        "postgresql": [
+            "WITH moved AS (DELETE FROM feed_stats_delta "
+            "RETURNING bucket, origin, event, count) "
+            "INSERT INTO feed_stats (bucket, origin, event, count) "
+            "SELECT bucket, origin, event, sum(count) FROM moved "
+            "GROUP BY bucket, origin, event ORDER BY bucket, origin, event "
+            "ON CONFLICT (bucket, origin, event) "
+            "DO UPDATE SET count = feed_stats.count + excluded.count",
+        ],
+        "sqlite": [
+            "INSERT INTO feed_stats (bucket, origin, event, count) "
+            "SELECT bucket, origin, event, sum(count) FROM feed_stats_delta "
+            "WHERE true GROUP BY bucket, origin, event "
+            "ON CONFLICT (bucket, origin, event) "
+            "DO UPDATE SET count = feed_stats.count + excluded.count",
+            "DELETE FROM feed_stats_delta",
+        ],
+    }
+
+    def __init__(self):
+        """Init."""
+        self._in_use = 0
+        self._acquired = 0
+        self._timeouts = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+        self._write_coalescer: Optional[FeedWriteCoalescer] = None
+        self.replicas: List[Database] = [
+            Database(url, **self.settings.pool_options(url))
+            for url in self.settings.database_replica_urls
+        ]
+        self._unhealthy: Set[Database] = set()
+        self._next_replica = 0
+        self._health_task: Optional[asyncio.Task] = None
+        self._compact_task: Optional[asyncio.Task] = None
+        self.query_hooks: List[Callable[[str, float], None]] = []
+        self.acquire_hooks: List[Callable[[str, float], None]] = []
+
+    @property
+    def dialect(self) -> str:
+        """Return the dialect of the primary database, e.g. "sqlite"."""
+        return database_dialect(self.database.url)
+
+    async def connect(self) -> None:
+        """
+        Open the connection pools, start folding the feed counts and
+        checking the replicas.
+        """
+        await self.database.connect()
+        self._compact_task = asyncio.create_task(self._compact_forever())
+        if self.replicas:
+            await self.check_replicas()
+            self._health_task = asyncio.create_task(self._check_forever())
+
+    async def disconnect(self) -> None:
+        """Write the pending feeds and close the connection pools."""
+        if self._write_coalescer is not None:
+            await self._write_coalescer.close()
+        for task in (self._health_task, self._compact_task):
+            if task is not None:
+                task.cancel()
+        self._health_task = self._compact_task = None
+        for replica in self.replicas:
+            if replica.is_connected:
+                await replica.disconnect()
+        await self.database.disconnect()
+
+    async def check_replicas(self) -> None:
+        """
+        Check the health of every replica.
+
+        A replica is healthy when it answers a trivial query in time, an
+        unavailable one is connected again on the next checks.
+        """
+        for replica in self.replicas:
+            try:
+                if not replica.is_connected:
+                    await replica.connect()
+                await asyncio.wait_for(
+                    replica.fetch_val(query="SELECT 1"),
+                    timeout=self.settings.replica_health_timeout)
+
+            except Exception:  # Noqa
+                self._unhealthy.add(replica)
+
+            else:
+                self._unhealthy.discard(replica)
+
+    async def _check_forever(self) -> None:
+        """Check the health of the replicas periodically."""
+        while True:
+            await asyncio.sleep(self.settings.replica_health_interval)
+            await self.check_replicas()
+
+    async def _compact_forever(self) -> None:
+        """Fold the feed counts in the feed_stats rollup periodically."""
+        while True:
+            await asyncio.sleep(self.settings.stats_compact_interval)
+            try:
+                await self.compact_feed_stats()
+
+            except Exception:  # Noqa
+                # Folded with the next ones.
+                pass
+
+    def _read_database(self) -> Database:
+        """
+        Return the database to read from.
+
+        Returns:
+            The pinned database while it is healthy, else the next healthy
+            replica, the primary if there is none or the client reads its
+            own writes
+        """
+        if READ_FROM_PRIMARY.get():
+            return self.database
+
+        healthy = [
+            replica for replica in self.replicas
+            if replica not in self._unhealthy
+        ]
+        pinned = READ_DATABASE.get()
+        if pinned is self.database or pinned in healthy:
+            return pinned
+
+        if not healthy:
+            return self.database
+
+        self._next_replica = (self._next_replica + 1) % len(healthy)
+        return healthy[self._next_replica]
+
+    def pin_read_database(self) -> None:
+        """
+        Send the next reads of the current context to the same database.
+
+        Replicas lag differently: a version read from one replica and a
+        page read from another could disagree. Call it once per request,
+        e.g. before reading a version and a page.
+        """
+        READ_DATABASE.set(self._read_database())
+
+    async def _acquire(self, database: Database) -> Connection:
+        """
+        Acquire a connection from the pool of a database.
+
+        Raises:
+            FeedPoolTimeoutError: no connection available in time.
+
+        Returns:
+            A database connection
+        """
+        connection = database.connection()
+        try:
+            await asyncio.wait_for(
+                connection.__aenter__(),
+                timeout=self.settings.pool_acquire_timeout)
+        except asyncio.TimeoutError:
+            self._timeouts += 1
+            raise FeedPoolTimeoutError(
+                f"No database connection available after "
+                f"{self.settings.pool_acquire_timeout}s.")
+
+        return connection
 
-    POSTGRES_HOST = "database"
-    POSTGRES_PORT = 5432
-    POSTGRES_USER = "postgres"
-    POSTGRES_PASSWORD = "SuperSecret"
-    POSTGRES_DB = "simple_feed_db"
-    DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}" \
-                   f"@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+    @asynccontextmanager
+    async def connection(
+            self,
+            read_only: bool = False,
+            operation: str = "query",
+    ) -> AsyncIterator[Connection]:
+        """
+        Acquire a connection from the pool.
+
+        Args:
+            read_only: Acquire it from a replica if any is healthy. An
+                unavailable replica is marked unhealthy, the connection
+                comes from the primary.
+            operation: The name of the queries for the query hooks
+
+        Raises:
+            FeedPoolTimeoutError: no connection available in time.
+
+        Yields:
+            A database connection
+        """
+        database = self._read_database() if read_only else self.database
+        start = time.perf_counter()
+        try:
+            connection = await self._acquire(database=database)
+
+        except FeedPoolTimeoutError:
+            raise
+
+        except Exception:  # Noqa
+            if database is self.database:
+                raise
+            self._unhealthy.add(database)
+            database = self.database
+            connection = await self._acquire(database=database)
+
+        wait_time = time.perf_counter() - start
+        self._acquired += 1
+        self._wait_time_total += wait_time
+        self._wait_time_max = max(self._wait_time_max, wait_time)
+        for hook in self.acquire_hooks:
+            hook("primary" if database is self.database else "replica",
+                 wait_time)
+        self._in_use += 1
+        try:
+            if self.query_hooks:
+                yield TimedConnection(
+                    connection=connection, operation=operation,
+                    hooks=self.query_hooks)
+            else:
+                yield connection
+        finally:
+            self._in_use -= 1
+            await connection.__aexit__()
+
+    @asynccontextmanager
+    async def write_transaction(self, db: Connection) -> AsyncIterator[None]:
+        """
+        Run the queries of a connection in a transaction writing feeds.
+
+        A deferred SQLite transaction fails at once with "database is
+        locked" when another connection writes: the write lock is taken
+        when it begins (BEGIN IMMEDIATE), waiting for the other writers up
+        to the busy timeout. Within a transaction, or on Postgres, it is a
+        transaction as usual.
+
+        Args:
+            db: A database connection
+        """
+        if self.dialect != "sqlite" or \
+                db.raw_connection.in_transaction:
+            async with db.transaction():
+                yield
+            return
+
+        await db.execute(query="BEGIN IMMEDIATE")
+        try:
+            yield
+
+        except BaseException:
+            await db.execute(query="ROLLBACK")
+            raise
+
+        await db.execute(query="COMMIT")
+
+    def pool_stats(self) -> PoolStats:
+        """
+        Return the connection pool statistics.
+
+        Returns:
+            A PoolStats DTO
+        """
+        stats = PoolStats(
+            in_use=self._in_use,
+            acquired=self._acquired,
+            timeouts=self._timeouts,
+            wait_time_total=self._wait_time_total,
+            wait_time_max=self._wait_time_max,
+            replicas=len(self.replicas),
+            replicas_healthy=len([
+                replica for replica in self.replicas
+                if replica not in self._unhealthy
+            ]),
+        )
+        options = self.database.options
+        stats.min_size = options.get("min_size", 0)
+        stats.max_size = options.get("max_size", 0)
 
-    database = Database(DATABASE_URL)
+        pool = getattr(self.database._backend, "_pool", None)  # Noqa
+        if hasattr(pool, "get_size"):
+            stats.size = pool.get_size()
+            stats.idle = pool.get_idle_size()
 
-    async def read_feeds(self) -> List[FeedDetail]:
+        return stats
+
+    async def read_feeds(
+            self,
+            limit: Optional[int] = None,
+            after_id: Optional[int] = None,
+            before_id: Optional[int] = None,
+            newest: bool = False,
+            since: Optional[datetime.datetime] = None,
+            until: Optional[datetime.datetime] = None,
+            origins: Optional[List[str]] = None,
+            events: Optional[List[str]] = None,
+    ) -> List[FeedDetail]:
         """
-        Read feeds.
+        Read feeds ordered by id.
+
+        Pages are selected with a keyset condition on the primary key, the
+        cost of a page does not depend on its depth. Time ranges use the
+        index on created_at, origins and events the composite indexes on
+        (origin, id) and (event, id) which also serve the ordering.
+
+        Args:
+            limit: Maximum number of feeds, all feeds if None
+            after_id: Only feeds with an id greater than after_id
+            before_id: Only feeds with an id lower than before_id. Without
+                after_id, the limit applies to the newest feeds.
+            newest: Without after_id, the limit applies to the newest feeds
+            since: Only feeds created at or after since
+            until: Only feeds created before until
+            origins: Only feeds from one of these origins
+            events: Only feeds of one of these events
 
         Returns:
             A list of FeedDetail DTO
         """
         query = select(FeedModel)
-        async with self.database as db:
+        if after_id is not None:
+            query = query.where(FeedModel.id > after_id)
+        if before_id is not None:
+            query = query.where(FeedModel.id < before_id)
+        if since is not None:
+            query = query.where(FeedModel.created_at >= since)
+        if until is not None:
+            query = query.where(FeedModel.created_at < until)
+        if origins:
+            query = query.where(FeedModel.origin.in_(origins))
+        if events:
+            query = query.where(FeedModel.event.in_(events))
+
+        backward = (before_id is not None or newest) and after_id is None
+        query = query.order_by(
+            FeedModel.id.desc() if backward else FeedModel.id.asc())
+        if limit is not None:
+            query = query.limit(limit)
+
+        async with self.connection(
+                read_only=True, operation="read_feeds") as db:
             result: List[FeedModel] = await db.fetch_all(query=query)  # Noqa
-            return [FeedDetail(
-                id=feed.id,
-                origin=feed.origin,
-                event=feed.event,
-                description=feed.description,
-            ) for feed in result]
+
+        feeds = [FeedDetail.construct(
+            id=feed.id,
+            origin=feed.origin,
+            event=feed.event,
+            description=feed.description,
+            created_at=feed.created_at,
+        ) for feed in result]
+
+        if backward:
+            feeds.reverse()
+
+        return feeds
+
+    async def read_feeds_version(self) -> str:
+        """
+        Read a version of the feeds, changed by any creation or deletion.
+
+        The version is the sum of the counter rows bumped by the
+        transactions writing feeds: no feed is scanned.
+
+        Returns:
+            A version string
+        """
+        query = select(func.sum(FeedVersionModel.version))
+        async with self.connection(
+                read_only=True, operation="read_feeds_version") as db:
+            version = await db.fetch_val(query=query)
+
+        return str(version or 0)
+
+    async def iter_feeds(
+            self,
+            after_id: Optional[int] = None,
+    ) -> AsyncIterator[FeedDetail]:
+        """
+        Iterate over feeds ordered by id without loading them in memory.
+
+        Rows are fetched through a server-side cursor, the connection is
+        held until the iteration ends.
+
+        Args:
+            after_id: Only feeds with an id greater than after_id
+
+        Yields:
+            A FeedDetail DTO
+        """
+        query = select(FeedModel).order_by(FeedModel.id.asc())
+        if after_id is not None:
+            query = query.where(FeedModel.id > after_id)
+
+        async with self.connection(
+                read_only=True, operation="iter_feeds") as db:
+            async for feed in db.iterate(query=query):
+                yield FeedDetail.construct(
+                    id=feed.id,
+                    origin=feed.origin,
+                    event=feed.event,
+                    description=feed.description,
+                    created_at=feed.created_at,
+                )
+
+    async def search_feeds(
+            self,
+            terms: str,
+            limit: int,
+            after: Optional[FeedSearchCursor] = None,
+    ) -> List[FeedSearchHit]:
+        """
+        Search feeds by the words of their description.
+
+        Hits are ordered by decreasing rank then id, pages are selected
+        with a keyset condition on both. Postgres matches the terms with
+        websearch_to_tsquery on the generated search_vector column (GIN
+        index), SQLite with the FTS5 table, every term being required.
+
+        Args:
+            terms: Words to search
+            limit: Maximum number of hits
+            after: Only hits ranked after this cursor
+
+        Returns:
+            A list of FeedSearchHit DTO
+        """
+        if self.dialect == "postgresql":
+            vector = literal_column("feed.search_vector")
+            tsquery = func.websearch_to_tsquery(
+                literal_column("'simple'::regconfig"), terms)
+            rank = func.ts_rank(vector, tsquery)
+            query = select(FeedModel, rank.label("rank")).where(
+                vector.op("@@")(tsquery))
+        else:
+            words = terms.split()
+            if not words:
+                return []
+            # Quoted words: the terms are never parsed as FTS5 syntax.
+            match = " ".join(
+                '"' + word.replace('"', '""') + '"' for word in words)
+            fts = table("feed_fts", column("rowid"))
+            # bm25 is lower for better matches.
+            rank = -func.bm25(literal_column("feed_fts"))
+            query = select(FeedModel, rank.label("rank")).select_from(
+                FeedModel.__table__.join(fts, fts.c.rowid == FeedModel.id)
+            ).where(literal_column("feed_fts").op("MATCH")(match))
+
+        if after is not None:
+            query = query.where(or_(
+                rank < after.rank,
+                and_(rank == after.rank, FeedModel.id < after.id),
+            ))
+        query = query.order_by(
+            rank.desc(), FeedModel.id.desc()).limit(limit)
+
+        async with self.connection(
+                read_only=True, operation="search_feeds") as db:
+            result = await db.fetch_all(query=query)
+
+        return [FeedSearchHit.construct(
+            id=feed.id,
+            origin=feed.origin,
+            event=feed.event,
+            description=feed.description,
+            created_at=feed.created_at,
+            rank=feed.rank,
+        ) for feed in result]
+
+    async def read_feed_stats(
+            self,
+            bucket: str = "total",
+            group_by: Sequence[str] = ("origin", "event"),
+            since: Optional[datetime.datetime] = None,
+            until: Optional[datetime.datetime] = None,
+            origins: Optional[List[str]] = None,
+            events: Optional[List[str]] = None,
+    ) -> List[FeedStats]:
+        """
+        Read the number of feeds created from the feed_stats rollup.
+
+        The counts not folded in the rollup yet are added from
+        feed_stats_delta. The cost depends on the number of hours, origins
+        and events, not on the number of feeds.
+
+        Args:
+            bucket: "hour" for a count per hour, "total" for all hours
+            group_by: A count per "origin" and/or "event"
+            since: Only hours starting at or after since
+            until: Only hours starting before until
+            origins: Only feeds from one of these origins
+            events: Only feeds of one of these events
+
+        Returns:
+            A list of FeedStats DTO
+        """
+        def counts(model: Any) -> Any:
+            query = select(
+                model.bucket, model.origin, model.event, model.count)
+            if since is not None:
+                query = query.where(model.bucket >= since)
+            if until is not None:
+                query = query.where(model.bucket < until)
+            if origins:
+                query = query.where(model.origin.in_(origins))
+            if events:
+                query = query.where(model.event.in_(events))
+            return query
+
+        stats = union_all(
+            counts(FeedStatsModel), counts(FeedStatsDeltaModel)
+        ).subquery("stats")
+        columns = []
+        if bucket == "hour":
+            columns.append(stats.c.bucket)
+        if "origin" in group_by:
+            columns.append(stats.c.origin)
+        if "event" in group_by:
+            columns.append(stats.c.event)
+
+        query = select(
+            *columns, func.sum(stats.c.count).label("count")
+        ).group_by(*columns).order_by(*columns)
+
+        async with self.connection(
+                read_only=True, operation="read_feed_stats") as db:
+            rows = await db.fetch_all(query=query)
+
+        return [FeedStats.construct(
+            **{column.name: row[column.name] for column in columns},
+            count=row["count"] or 0,
+        ) for row in rows]
 
     async def read_feed_by_id(self, feed_id: int) -> Optional[FeedDetail]:
         """
@@ -50,14 +822,16 @@ class SimpleFeedProvider(SimpleFeedInterface):
         """
         query = select(FeedModel).where(FeedModel.id.__eq__(feed_id))
 
-        async with self.database as db:
+        async with self.connection(
+                read_only=True, operation="read_feed_by_id") as db:
             result: List[FeedModel] = await db.fetch_all(query=query)  # Noqa
 
-        feeds = [FeedDetail(
+        feeds = [FeedDetail.construct(
             id=feed.id,
             origin=feed.origin,
             event=feed.event,
             description=feed.description,
+            created_at=feed.created_at,
         ) for feed in result]
 
         if not feeds:
@@ -69,18 +843,1223 @@ class SimpleFeedProvider(SimpleFeedInterface):
         """
         Create a new feed.
 
+        With `write_coalesce`, concurrent creations are grouped and written
+        with `create_feeds`.
+
         Args:
             feed: A Feed DTO.
 
         Returns:
             A key id
         """
+        if self.settings.write_coalesce:
+            if self._write_coalescer is None:
+                self._write_coalescer = FeedWriteCoalescer(
+                    write=self.create_feeds,
+                    delay=self.settings.write_coalesce_delay,
+                    max_rows=self.settings.write_coalesce_max_rows,
+                )
+            return await self._write_coalescer.submit(feed=feed)
+
         try:
-            query = insert(FeedModel)
-            values = feed.dict()
-            async with self.database as db:
-                result = await db.execute(query=query, values=values)
-            return result
+            async with self.connection(operation="create_feed") as db:
+                async with self.write_transaction(db=db):
+                    ids = await self._insert_feeds(db=db, feeds=[feed])
+            return ids[0]
 
         except Exception as exc:
             raise FeedCreateError(f"Unable to create a new feed. {exc}")
+
+    async def create_feeds(self, feeds: List[Feed]) -> FeedBatchResult:
+        """
+        Create new feeds.
+
+        Feeds are inserted by chunks of `batch_chunk_size` rows, one
+        multi-row INSERT and one transaction per chunk. When a chunk fails,
+        its feeds are inserted one by one to isolate the invalid ones.
+
+        Args:
+            feeds: A list of Feed DTO.
+
+        Returns:
+            A FeedBatchResult DTO, ids in input order
+        """
+        result = FeedBatchResult(ids=[None] * len(feeds))
+        chunk_size = self.settings.batch_chunk_size
+
+        async with self.connection(operation="create_feeds") as db:
+            for start in range(0, len(feeds), chunk_size):
+                chunk = feeds[start:start + chunk_size]
+                try:
+                    async with self.write_transaction(db=db):
+                        ids = await self._insert_feeds(db=db, feeds=chunk)
+
+                except Exception:  # Noqa
+                    ids = []
+                    for index, feed in enumerate(chunk, start=start):
+                        try:
+                            async with self.write_transaction(db=db):
+                                ids.extend(await self._insert_feeds(
+                                    db=db, feeds=[feed]))
+
+                        except Exception as exc:
+                            ids.append(None)
+                            result.errors.append(FeedBatchError(
+                                index=index,
+                                detail=f"Unable to create a new feed. {exc}"))
+
+                result.ids[start:start + len(chunk)] = ids
+
+        return result
+
+    @staticmethod
+    def _values(feed: Feed) -> Dict[str, Any]:
+        """
+        Return the column values of a new feed.
+
+        Args:
+            feed: A Feed DTO, created_at defaults to now
+
+        Returns:
+            The values to insert
+        """
+        values = feed.dict(exclude={"id"})
+        if values.get("created_at") is None:
+            values["created_at"] = datetime.datetime.now(datetime.timezone.utc)
+        return values
+
+    async def _insert_feeds(
+            self,
+            db: Connection,
+            feeds: List[Feed]
+    ) -> List[int]:
+        """
+        Insert feeds with a single multi-row INSERT and count them.
+
+        Run it in a transaction: the feed_stats rollup and the version of
+        the feeds are updated by the same transaction.
+
+        Args:
+            db: A database connection
+            feeds: A list of Feed DTO.
+
+        Returns:
+            The feed ids in input order
+        """
+        values = [self._values(feed=feed) for feed in feeds]
+
+        if self.dialect == "postgresql":
+            rows = await db.fetch_all(
+                query=self.insert_statement(values=values))
+            ids = [row[0] for row in rows]
+        else:
+            # No RETURNING: sqlite allocates consecutive rowids to the
+            # statement, the last one is returned.
+            last_id = await db.execute(
+                query=insert(FeedModel).values(values))
+            ids = list(range(last_id - len(feeds) + 1, last_id + 1))
+
+        await self._count_feeds(db=db, values=values)
+        await db.execute(
+            query=bump_feeds_version(self.dialect))
+        return ids
+
+    @staticmethod
+    def insert_statement(values: List[Dict[str, Any]]) -> TextClause:
+        """
+        Return the statement inserting feeds, returning their ids.
+
+        The ids are drawn next to the position of each feed, before the
+        insert: they map back to the input without relying on the order
+        the sequence follows.
+
+        Args:
+            values: The values of the feeds, from _values
+
+        Returns:
+            An INSERT statement returning one id per feed, in input order
+        """
+        return text(
+            "WITH input AS MATERIALIZED ("
+            "SELECT nextval(pg_get_serial_sequence('feed', 'id')) AS id, "
+            "origin, event, description, created_at, position "
+            "FROM unnest(CAST(:origins AS varchar[]), "
+            "CAST(:events AS varchar[]), CAST(:descriptions AS varchar[]), "
+            "CAST(:created_ats AS timestamptz[])) WITH ORDINALITY "
+            "AS feeds (origin, event, description, created_at, position)"
+            "), inserted AS ("
+            "INSERT INTO feed (id, origin, event, description, created_at) "
+            "SELECT id, origin, event, description, created_at FROM input"
+            ") SELECT id FROM input ORDER BY position"
+        ).bindparams(
+            origins=[value["origin"] for value in values],
+            events=[value["event"] for value in values],
+            descriptions=[value["description"] for value in values],
+            created_ats=[value["created_at"] for value in values],
+        )
+
+    async def _count_feeds(
+            self,
+            db: Connection,
+            values: List[Dict[str, Any]],
+    ) -> None:
+        """
+        Append the counts of inserted feeds to feed_stats_delta.
+
+        One row per hour, origin and event of the batch is inserted: no
+        row is updated, concurrent transactions don't wait for each other.
+
+        Args:
+            db: A database connection
+            values: The values of the inserted feeds
+        """
+        counts: Dict[Tuple[datetime.datetime, str, str], int] = {}
+        for value in values:
+            created_at = value["created_at"]
+            if created_at.tzinfo is None:
+                created_at = created_at.replace(tzinfo=datetime.timezone.utc)
+            bucket = created_at.astimezone(datetime.timezone.utc).replace(
+                minute=0, second=0, microsecond=0)
+            key = (bucket, value["origin"], value["event"])
+            counts[key] = counts.get(key, 0) + 1
+
+        await db.execute(query=insert(FeedStatsDeltaModel).values([{
+            "bucket": bucket,
+            "origin": origin,
+            "event": event,
+            "count": count,
+        } for (bucket, origin, event), count in counts.items()]))
+
+    async def compact_feed_stats(self) -> None:
+        """
+        Fold the rows of feed_stats_delta in the feed_stats rollup.
+
+        On Postgres, the rows are deleted and folded by one statement: rows
+        committed meanwhile are folded next time. Rows are upserted in key
+        order, concurrent runs lock them in the same order.
+        """
+        async with self.connection(operation="compact_feed_stats") as db:
+            async with self.write_transaction(db=db):
+                for query in self.COMPACT_STATS[self.dialect]:
+                    await db.execute(query=query)
+
+
+class CachedFeedProvider(SimpleFeedInterface):
+    """
+    Read-through cache of feeds by id in front of a feed provider.
+
+    Feeds are immutable once created, they are kept `ttl` seconds in a
+    bounded LRU. Unknown ids are kept `negative_ttl` seconds and
+    invalidated when a feed is created with the same id.
+    """
+
+    def __init__(
+            self,
+            feed_provider: SimpleFeedInterface,
+            max_size: int = 10000,
+            ttl: float = 300.0,
+            negative_ttl: float = 1.0,
+            clock: Callable[[], float] = time.monotonic,
+    ):
+        """Init."""
+        self.feed_provider = feed_provider
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[int, Tuple[float, Optional[FeedDetail]]]" \
+            = OrderedDict()
+
+    def cache_stats(self) -> CacheStats:
+        """
+        Return the cache statistics.
+
+        Returns:
+            A CacheStats DTO
+        """
+        return CacheStats(
+            size=len(self._entries),
+            max_size=self.max_size,
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+        )
+
+    def invalidate(self, feed_id: int) -> None:
+        """
+        Remove a feed from the cache.
+
+        Args:
+            feed_id: A feed id
+        """
+        self._entries.pop(feed_id, None)
+
+    def invalidate_range(
+            self,
+            start: Optional[datetime.datetime] = None,
+            end: Optional[datetime.datetime] = None,
+    ) -> None:
+        """
+        Remove the feeds created in a range from the cache.
+
+        Args:
+            start: Created at or after start, unbounded if None
+            end: Created before end, unbounded if None
+        """
+        for feed_id, (_, feed) in list(self._entries.items()):
+            if feed is None or feed.created_at is None:
+                continue
+            created_at = feed.created_at
+            if created_at.tzinfo is None:
+                created_at = created_at.replace(tzinfo=datetime.timezone.utc)
+            if (start is None or created_at >= start) and \
+                    (end is None or created_at < end):
+                del self._entries[feed_id]
+
+    async def read_feeds(
+            self,
+            limit: Optional[int] = None,
+            after_id: Optional[int] = None,
+            before_id: Optional[int] = None,
+            newest: bool = False,
+            since: Optional[datetime.datetime] = None,
+            until: Optional[datetime.datetime] = None,
+            origins: Optional[List[str]] = None,
+            events: Optional[List[str]] = None,
+    ) -> List[FeedDetail]:
+        """
+        Read feeds ordered by id, not cached.
+
+        Args:
+            limit: Maximum number of feeds, all feeds if None
+            after_id: Only feeds with an id greater than after_id
+            before_id: Only feeds with an id lower than before_id
+            newest: Without after_id, the limit applies to the newest feeds
+            since: Only feeds created at or after since
+            until: Only feeds created before until
+            origins: Only feeds from one of these origins
+            events: Only feeds of one of these events
+
+        Returns:
+            A list of FeedDetail DTO
+        """
+        return await self.feed_provider.read_feeds(
+            limit=limit, after_id=after_id, before_id=before_id,
+            newest=newest, since=since, until=until, origins=origins,
+            events=events)
+
+    async def read_feeds_version(self) -> str:
+        """
+        Read a version of the feeds, not cached.
+
+        Returns:
+            A version string
+        """
+        return await self.feed_provider.read_feeds_version()
+
+    def iter_feeds(
+            self,
+            after_id: Optional[int] = None,
+    ) -> AsyncIterator[FeedDetail]:
+        """
+        Iterate over feeds ordered by id, not cached.
+
+        Args:
+            after_id: Only feeds with an id greater than after_id
+
+        Returns:
+            An async iterator of FeedDetail DTO
+        """
+        return self.feed_provider.iter_feeds(after_id=after_id)
+
+    async def search_feeds(
+            self,
+            terms: str,
+            limit: int,
+            after: Optional[FeedSearchCursor] = None,
+    ) -> List[FeedSearchHit]:
+        """
+        Search feeds by the words of their description, not cached.
+
+        Args:
+            terms: Words to search
+            limit: Maximum number of hits
+            after: Only hits ranked after this cursor
+
+        Returns:
+            A list of FeedSearchHit DTO
+        """
+        return await self.feed_provider.search_feeds(
+            terms=terms, limit=limit, after=after)
+
+    async def read_feed_stats(
+            self,
+            bucket: str = "total",
+            group_by: Sequence[str] = ("origin", "event"),
+            since: Optional[datetime.datetime] = None,
+            until: Optional[datetime.datetime] = None,
+            origins: Optional[List[str]] = None,
+            events: Optional[List[str]] = None,
+    ) -> List[FeedStats]:
+        """
+        Read the number of feeds created, not cached.
+
+        Args:
+            bucket: "hour" for a count per hour, "total" for all hours
+            group_by: A count per "origin" and/or "event"
+            since: Only hours starting at or after since
+            until: Only hours starting before until
+            origins: Only feeds from one of these origins
+            events: Only feeds of one of these events
+
+        Returns:
+            A list of FeedStats DTO
+        """
+        return await self.feed_provider.read_feed_stats(
+            bucket=bucket, group_by=group_by, since=since, until=until,
+            origins=origins, events=events)
+
+    async def read_feed_by_id(self, feed_id: int) -> Optional[FeedDetail]:
+        """
+        Read feed by id from the cache, or from the provider on a miss.
+
+        Args:
+            feed_id: A feed id
+
+        Returns:
+            A FeedDetail DTO or None
+        """
+        now = self.clock()
+        entry = self._entries.get(feed_id)
+        if entry is not None and entry[0] > now:
+            self._entries.move_to_end(feed_id)
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        feed = await self.feed_provider.read_feed_by_id(feed_id=feed_id)
+
+        expires = now + (self.ttl if feed is not None else self.negative_ttl)
+        self._entries[feed_id] = (expires, feed)
+        self._entries.move_to_end(feed_id)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+        return feed
+
+    async def create_feed(self, feed: Feed) -> int:
+        """
+        Create a new feed and invalidate its id.
+
+        Args:
+            feed: A Feed DTO.
+
+        Returns:
+            A key id
+        """
+        feed_id = await self.feed_provider.create_feed(feed=feed)
+        self.invalidate(feed_id)
+        return feed_id
+
+    async def create_feeds(self, feeds: List[Feed]) -> FeedBatchResult:
+        """
+        Create new feeds and invalidate their ids.
+
+        Args:
+            feeds: A list of Feed DTO.
+
+        Returns:
+            A FeedBatchResult DTO, ids in input order
+        """
+        result = await self.feed_provider.create_feeds(feeds=feeds)
+        for feed_id in result.ids:
+            if feed_id is not None:
+                self.invalidate(feed_id)
+        return result
+
+
+class InMemoryFeedProvider(SimpleFeedInterface):
+    """
+    Feeds stored in memory, column by column.
+
+    Each column is a compact array: created_at in microseconds since the
+    epoch, origin and event as codes of a shared dictionary of strings.
+    Ids are consecutive from 1, the row of a feed is its id - 1. Rows of
+    each origin and event are indexed, in id order, for filtered keyset
+    pages. Feed counts per hour, origin and event are kept on creation.
+
+    No I/O: a baseline for benchmarks, an edge cache or a test backend.
+    """
+
+    EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+    WORDS = re.compile(r"\w+")
+
+    def __init__(self):
+        """Init."""
+        self._created_at = array("q")
+        self._origins = array("I")
+        self._events = array("I")
+        self._descriptions: List[str] = []
+        self._strings: List[str] = []
+        self._codes: Dict[str, int] = {}
+        self._origin_rows: Dict[int, array] = {}
+        self._event_rows: Dict[int, array] = {}
+        self._stats: Dict[Tuple[int, int, int], int] = {}
+
+    def __len__(self) -> int:
+        """Return the number of feeds."""
+        return len(self._descriptions)
+
+    async def read_feeds(
+            self,
+            limit: Optional[int] = None,
+            after_id: Optional[int] = None,
+            before_id: Optional[int] = None,
+            newest: bool = False,
+            since: Optional[datetime.datetime] = None,
+            until: Optional[datetime.datetime] = None,
+            origins: Optional[List[str]] = None,
+            events: Optional[List[str]] = None,
+    ) -> List[FeedDetail]:
+        """
+        Read feeds ordered by id.
+
+        Pages start from the row of after_id or before_id. With origins
+        or events, only the indexed rows of these values are visited.
+
+        Args:
+            limit: Maximum number of feeds, all feeds if None
+            after_id: Only feeds with an id greater than after_id
+            before_id: Only feeds with an id lower than before_id. Without
+                after_id, the limit applies to the newest feeds.
+            newest: Without after_id, the limit applies to the newest feeds
+            since: Only feeds created at or after since
+            until: Only feeds created before until
+            origins: Only feeds from one of these origins
+            events: Only feeds of one of these events
+
+        Returns:
+            A list of FeedDetail DTO
+        """
+        start = max(after_id or 0, 0)
+        stop = len(self)
+        if before_id is not None:
+            stop = max(min(before_id - 1, stop), 0)
+        backward = (before_id is not None or newest) and after_id is None
+
+        origin_codes = self._lookup(origins)
+        event_codes = self._lookup(events)
+        if origin_codes is not None:
+            rows = self._indexed_rows(
+                self._origin_rows, origin_codes, start, stop, backward)
+        elif event_codes is not None:
+            rows = self._indexed_rows(
+                self._event_rows, event_codes, start, stop, backward)
+        else:
+            rows = range(stop - 1, start - 1, -1) if backward \
+                else range(start, stop)
+
+        since_us = self._microseconds(since) if since is not None else None
+        until_us = self._microseconds(until) if until is not None else None
+        feeds = []
+        for row in rows:
+            if limit is not None and len(feeds) >= limit:
+                break
+            if event_codes is not None and \
+                    self._events[row] not in event_codes:
+                continue
+            created_at = self._created_at[row]
+            if since_us is not None and created_at < since_us:
+                continue
+            if until_us is not None and created_at >= until_us:
+                continue
+            feeds.append(self._feed(row))
+
+        if backward:
+            feeds.reverse()
+
+        return feeds
+
+    async def read_feeds_version(self) -> str:
+        """
+        Read a version of the feeds, changed by any creation.
+
+        Feeds are only appended: the number of feeds.
+
+        Returns:
+            A version string
+        """
+        return str(len(self))
+
+    async def iter_feeds(
+            self,
+            after_id: Optional[int] = None,
+    ) -> AsyncIterator[FeedDetail]:
+        """
+        Iterate over feeds ordered by id.
+
+        Args:
+            after_id: Only feeds with an id greater than after_id
+
+        Yields:
+            A FeedDetail DTO
+        """
+        row = max(after_id or 0, 0)
+        while row < len(self):
+            yield self._feed(row)
+            row += 1
+
+    async def search_feeds(
+            self,
+            terms: str,
+            limit: int,
+            after: Optional[FeedSearchCursor] = None,
+    ) -> List[FeedSearchHit]:
+        """
+        Search feeds by the words of their description.
+
+        Every description is scanned. Every word is required, the rank is
+        the number of occurrences of the words.
+
+        Args:
+            terms: Words to search
+            limit: Maximum number of hits
+            after: Only hits ranked after this cursor
+
+        Returns:
+            A list of FeedSearchHit DTO
+        """
+        words = self.WORDS.findall(terms.lower())
+        if not words:
+            return []
+
+        ranked = []
+        for row, description in enumerate(self._descriptions):
+            counts = Counter(self.WORDS.findall(description.lower()))
+            if not all(counts[word] for word in words):
+                continue
+            rank = float(sum(counts[word] for word in words))
+            if after is not None and (rank, row + 1) >= (after.rank, after.id):
+                continue
+            ranked.append((rank, row))
+
+        return [FeedSearchHit.construct(
+            **self._feed(row).__dict__, rank=rank)
+            for rank, row in heapq.nlargest(limit, ranked)]
+
+    async def read_feed_stats(
+            self,
+            bucket: str = "total",
+            group_by: Sequence[str] = ("origin", "event"),
+            since: Optional[datetime.datetime] = None,
+            until: Optional[datetime.datetime] = None,
+            origins: Optional[List[str]] = None,
+            events: Optional[List[str]] = None,
+    ) -> List[FeedStats]:
+        """
+        Read the number of feeds created from the counts per hour.
+
+        Args:
+            bucket: "hour" for a count per hour, "total" for all hours
+            group_by: A count per "origin" and/or "event"
+            since: Only hours starting at or after since
+            until: Only hours starting before until
+            origins: Only feeds from one of these origins
+            events: Only feeds of one of these events
+
+        Returns:
+            A list of FeedStats DTO
+        """
+        origin_codes = self._lookup(origins)
+        event_codes = self._lookup(events)
+        since_us = self._microseconds(since) if since is not None else None
+        until_us = self._microseconds(until) if until is not None else None
+
+        counts: Dict[Tuple[Any, ...], int] = {}
+        for (hour, origin, event), count in self._stats.items():
+            if origin_codes is not None and origin not in origin_codes:
+                continue
+            if event_codes is not None and event not in event_codes:
+                continue
+            if since_us is not None and hour < since_us:
+                continue
+            if until_us is not None and hour >= until_us:
+                continue
+            key = (
+                self._datetime(hour) if bucket == "hour" else None,
+                self._strings[origin] if "origin" in group_by else None,
+                self._strings[event] if "event" in group_by else None,
+            )
+            counts[key] = counts.get(key, 0) + count
+
+        if not counts and bucket != "hour" and not group_by:
+            counts[(None, None, None)] = 0
+
+        return [FeedStats.construct(
+            bucket=hour, origin=origin, event=event, count=count)
+            for (hour, origin, event), count in sorted(
+                counts.items(), key=lambda item: tuple(
+                    (value is not None, value) for value in item[0]))]
+
+    async def read_feed_by_id(self, feed_id: int) -> Optional[FeedDetail]:
+        """
+        Read feed by id.
+
+        Args:
+            feed_id: A feed id
+
+        Returns:
+            A FeedDetail DTO or None
+        """
+        if not 0 < feed_id <= len(self):
+            return None
+
+        return self._feed(feed_id - 1)
+
+    async def create_feed(self, feed: Feed) -> int:
+        """
+        Create a new feed.
+
+        Args:
+            feed: A Feed DTO.
+
+        Returns:
+            A key id
+        """
+        return self._append(feed=feed)
+
+    async def create_feeds(self, feeds: List[Feed]) -> FeedBatchResult:
+        """
+        Create new feeds.
+
+        Args:
+            feeds: A list of Feed DTO.
+
+        Returns:
+            A FeedBatchResult DTO, ids in input order
+        """
+        return FeedBatchResult(ids=[self._append(feed=feed) for feed in feeds])
+
+    def _append(self, feed: Feed) -> int:
+        """Append a feed to the columns and return its id."""
+        created_at = getattr(feed, "created_at", None) or \
+            datetime.datetime.now(datetime.timezone.utc)
+        created_at_us = self._microseconds(created_at)
+        origin = self._encode(feed.origin)
+        event = self._encode(feed.event)
+
+        row = len(self)
+        self._created_at.append(created_at_us)
+        self._origins.append(origin)
+        self._events.append(event)
+        self._descriptions.append(feed.description)
+        self._origin_rows.setdefault(origin, array("I")).append(row)
+        self._event_rows.setdefault(event, array("I")).append(row)
+
+        hour = created_at_us - created_at_us % 3600000000
+        self._stats[(hour, origin, event)] = \
+            self._stats.get((hour, origin, event), 0) + 1
+        return row + 1
+
+    def _feed(self, row: int) -> FeedDetail:
+        """Return the feed of a row."""
+        return FeedDetail.construct(
+            id=row + 1,
+            origin=self._strings[self._origins[row]],
+            event=self._strings[self._events[row]],
+            description=self._descriptions[row],
+            created_at=self._datetime(self._created_at[row]),
+        )
+
+    def _encode(self, value: str) -> int:
+        """Return the code of a string, added to the dictionary if new."""
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self._strings)
+            self._strings.append(value)
+        return code
+
+    def _lookup(self, values: Optional[List[str]]) -> Optional[Set[int]]:
+        """Return the codes of known strings, None without filter."""
+        if not values:
+            return None
+        return {self._codes[value] for value in values if value in self._codes}
+
+    @staticmethod
+    def _indexed_rows(
+            index: Dict[int, array],
+            codes: Set[int],
+            start: int,
+            stop: int,
+            backward: bool,
+    ) -> Iterator[int]:
+        """Merge the rows of the codes between start and stop, in order."""
+        ranges = []
+        for code in codes:
+            rows = index[code]
+            low = bisect.bisect_left(rows, start)
+            high = bisect.bisect_left(rows, stop)
+            positions = range(high - 1, low - 1, -1) if backward \
+                else range(low, high)
+            ranges.append(map(rows.__getitem__, positions))
+
+        return heapq.merge(*ranges, reverse=backward)
+
+    @classmethod
+    def _microseconds(cls, moment: datetime.datetime) -> int:
+        """Return the microseconds since the epoch, UTC if naive."""
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=datetime.timezone.utc)
+        return (moment - cls.EPOCH) // datetime.timedelta(microseconds=1)
+
+    @classmethod
+    def _datetime(cls, microseconds: int) -> datetime.datetime:
+        """Return the UTC moment of microseconds since the epoch."""
+        return cls.EPOCH + datetime.timedelta(microseconds=microseconds)
+
+
+class FeedPartitionProvider(FeedPartitionInterface):
+    """
+    Range partitions of the feed table by creation time (Postgres).
+
+    Partition bounds are read from the catalog, creating or dropping a
+    partition only changes metadata of the feed table.
+    """
+
+    READ_PARTITIONS = r"""
+        SELECT c.relname AS name,
+               (regexp_match(pg_get_expr(c.relpartbound, c.oid),
+                             'FROM \(''([^'']+)''\)'))[1]::timestamptz
+                   AS start,
+               (regexp_match(pg_get_expr(c.relpartbound, c.oid),
+                             'TO \(''([^'']+)''\)'))[1]::timestamptz
+                   AS "end"
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'feed'::regclass
+        ORDER BY start NULLS FIRST, c.relname
+    """
+
+    def __init__(self, database: Database):
+        """Init."""
+        self.database = database
+
+    async def read_partitions(self) -> List[FeedPartition]:
+        """
+        Read the partitions of the feed table, the oldest first.
+
+        Returns:
+            A list of FeedPartition DTO
+        """
+        async with self.database.connection() as db:
+            rows = await db.fetch_all(query=self.READ_PARTITIONS)
+
+        return [FeedPartition(
+            name=row["name"],
+            start=row["start"],
+            end=row["end"],
+        ) for row in rows]
+
+    async def create_partition(self, partition: FeedPartition) -> None:
+        """
+        Create a partition of the feed table, if it doesn't exist.
+
+        Args:
+            partition: A FeedPartition DTO with a start and an end
+        """
+        async with self.database.connection() as db:
+            await db.execute(query=self.create_statement(partition))
+
+    async def drop_partition(self, partition: FeedPartition) -> None:
+        """
+        Drop a partition of the feed table and its feeds.
+
+        The partition is detached first without blocking the feed table
+        (Postgres 14): a detach interrupted by a previous run is finalized.
+
+        Args:
+            partition: A FeedPartition DTO
+        """
+        name = self._quote(partition.name)
+        async with self.database.connection() as db:
+            pending = await db.fetch_val(
+                query=text(
+                    "SELECT inhdetachpending FROM pg_inherits "
+                    "WHERE inhparent = 'feed'::regclass "
+                    "AND inhrelid = to_regclass(:name)"
+                ).bindparams(name=name))
+            if pending is not None:
+                # Not in a transaction: CONCURRENTLY commits twice.
+                await db.execute(
+                    query=f"ALTER TABLE feed DETACH PARTITION {name} "
+                          f"{'FINALIZE' if pending else 'CONCURRENTLY'}")
+            async with db.transaction():
+                await db.execute(query=f"DROP TABLE IF EXISTS {name}")
+                await db.execute(query=bump_feeds_version("postgresql"))
+
+    @classmethod
+    def create_statement(cls, partition: FeedPartition) -> str:
+        """
+        Return the statement creating a partition.
+
+        DDL takes no parameters: the bounds are bound as literals, quoted
+        by the dialect.
+
+        Args:
+            partition: A FeedPartition DTO with a start and an end
+
+        Returns:
+            A CREATE TABLE statement
+        """
+        query = text(
+            f"CREATE TABLE IF NOT EXISTS {cls._quote(partition.name)} "
+            f"PARTITION OF feed FOR VALUES FROM (:start) TO (:end)"
+        ).bindparams(
+            bindparam("start", partition.start.isoformat(), type_=String),
+            bindparam("end", partition.end.isoformat(), type_=String),
+        )
+        return str(query.compile(
+            dialect=postgresql.dialect(),
+            compile_kwargs={"literal_binds": True}))
+
+    @staticmethod
+    def _quote(name: str) -> str:
+        """Quote a table name."""
+        return postgresql.dialect().identifier_preparer.quote_identifier(name)
+
+
+class InMemoryFeedBroker(FeedBrokerInterface):
+    """Feed broker for a single worker."""
+
+    def __init__(self):
+        """Init."""
+        self.handlers: List[Callable[[FeedDetail], Awaitable[None]]] = []
+        self.dropped_handlers: \
+            List[Callable[[FeedPartition], Awaitable[None]]] = []
+
+    def subscribe(
+            self,
+            handler: Callable[[FeedDetail], Awaitable[None]]
+    ) -> None:
+        """
+        Add a handler called for each published feed.
+
+        Args:
+            handler: An async callable taking a FeedDetail DTO
+        """
+        self.handlers.append(handler)
+
+    def subscribe_dropped(
+            self,
+            handler: Callable[[FeedPartition], Awaitable[None]]
+    ) -> None:
+        """
+        Add a handler called for each dropped partition.
+
+        Args:
+            handler: An async callable taking a FeedPartition DTO
+        """
+        self.dropped_handlers.append(handler)
+
+    async def publish_dropped(self, partition: FeedPartition) -> None:
+        """
+        Tell the handlers that a partition was dropped.
+
+        Only the handlers of this process are called: the workers don't
+        hear of a drop made by the maintenance command.
+
+        Args:
+            partition: A FeedPartition DTO
+        """
+        for handler in self.dropped_handlers:
+            await handler(partition)
+
+    async def start(self) -> None:
+        """Start receiving feeds."""
+
+    async def stop(self) -> None:
+        """Stop receiving feeds."""
+
+    async def publish(self, feed: FeedDetail) -> None:
+        """
+        Publish a new feed to the handlers.
+
+        Args:
+            feed: A FeedDetail DTO
+        """
+        for handler in self.handlers:
+            await handler(feed)
+
+
+class PostgresFeedBroker(FeedBrokerInterface):
+    """
+    Feed broker shared by every worker through Postgres LISTEN/NOTIFY.
+
+    Published feeds are batched for `batch_delay` seconds or `batch_size`
+    feeds and sent as JSON arrays with NOTIFY. A dedicated connection
+    LISTENs to the channel; it is health-checked and reopened when lost.
+    NOTIFY and health checks share it, one query at a time.
+    """
+
+    # NOTIFY payloads must be shorter than 8000 bytes.
+    MAX_PAYLOAD_SIZE = 7900
+
+    def __init__(
+            self,
+            dsn: str,
+            channel: str = "simplefeed_feeds",
+            batch_delay: float = 0.01,
+            batch_size: int = 100,
+            max_pending: int = 10000,
+            reconnect_delay: float = 1.0,
+            health_interval: float = 30.0,
+            connect: Optional[Callable[[], Awaitable[Any]]] = None,
+    ):
+        """
+        Init.
+
+        Args:
+            dsn: A postgres url
+            channel: The NOTIFY channel
+            batch_delay: Maximum delay before sending a published feed
+            batch_size: Maximum number of feeds per batch
+            max_pending: Maximum number of unsent feeds, the oldest are
+                dropped while the connection is lost
+            reconnect_delay: Delay between two connection attempts
+            health_interval: Delay between two connection health checks
+            connect: An async callable returning a connection, defaults
+                to `asyncpg.connect(dsn)`
+        """
+        self.channel = channel
+        self.batch_delay = batch_delay
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.reconnect_delay = reconnect_delay
+        self.health_interval = health_interval
+        self.handlers: List[Callable[[FeedDetail], Awaitable[None]]] = []
+        self.dropped_handlers: \
+            List[Callable[[FeedPartition], Awaitable[None]]] = []
+        self.reconnects = 0
+        self.dropped = 0
+        self._connect = connect or (lambda: asyncpg.connect(dsn))
+        self._connection: Optional[Any] = None
+        # asyncpg runs one operation at a time per connection
+        self._lock = asyncio.Lock()
+        self._pending: List[FeedDetail] = []
+        self._flusher: Optional[asyncio.Task] = None
+        self._supervisor: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def pending(self) -> int:
+        """Return the number of feeds waiting for the next NOTIFY."""
+        return len(self._pending)
+
+    def subscribe(
+            self,
+            handler: Callable[[FeedDetail], Awaitable[None]]
+    ) -> None:
+        """
+        Add a handler called for each published feed.
+
+        Args:
+            handler: An async callable taking a FeedDetail DTO
+        """
+        self.handlers.append(handler)
+
+    def subscribe_dropped(
+            self,
+            handler: Callable[[FeedPartition], Awaitable[None]]
+    ) -> None:
+        """
+        Add a handler called for each dropped partition.
+
+        Args:
+            handler: An async callable taking a FeedPartition DTO
+        """
+        self.dropped_handlers.append(handler)
+
+    async def publish_dropped(self, partition: FeedPartition) -> None:
+        """
+        NOTIFY every worker that a partition was dropped.
+
+        Sent at once, on the LISTEN connection when started, else on a
+        connection of its own (the maintenance command doesn't listen).
+
+        Args:
+            partition: A FeedPartition DTO
+        """
+        payload = json.dumps({"dropped": json.loads(partition.json())})
+        if self._connection is not None:
+            async with self._lock:
+                await self._connection.execute(
+                    "SELECT pg_notify($1, $2)", self.channel, payload)
+            return
+
+        connection = await self._connect()
+        try:
+            await connection.execute(
+                "SELECT pg_notify($1, $2)", self.channel, payload)
+        finally:
+            await connection.close()
+
+    async def start(self) -> None:
+        """Open the LISTEN connection in background."""
+        if self._supervisor is None:
+            self._supervisor = asyncio.create_task(self._supervise())
+
+    async def stop(self) -> None:
+        """Send the pending feeds and close the connection."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+        await self._flush()
+        if self._flusher is not None:
+            # Feeds that can't be sent before stopping are lost.
+            self._flusher.cancel()
+            self._flusher = None
+
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            self._supervisor = None
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def publish(self, feed: FeedDetail) -> None:
+        """
+        Add a feed to the next NOTIFY batch.
+
+        Args:
+            feed: A FeedDetail DTO
+        """
+        self._pending.append(feed)
+        if len(self._pending) > self.max_pending:
+            del self._pending[0]
+            self.dropped += 1
+
+        if len(self._pending) >= self.batch_size:
+            await self._flush()
+        elif self._flusher is None:
+            self._flusher = asyncio.create_task(
+                self._flush_later(self.batch_delay))
+
+    def _payloads(self, feeds: List[FeedDetail]) -> List[Tuple[int, str]]:
+        """
+        Split feeds into NOTIFY payloads.
+
+        Args:
+            feeds: A list of FeedDetail DTO
+
+        Returns:
+            A list of (number of feeds, JSON array), each JSON array
+            fitting in a NOTIFY payload
+        """
+        payloads, items, size = [], [], 2
+        for feed in feeds:
+            item = feed.json()
+            item_size = len(item.encode()) + 1
+            if items and size + item_size > self.MAX_PAYLOAD_SIZE:
+                payloads.append((len(items), f"[{','.join(items)}]"))
+                items, size = [], 2
+            items.append(item)
+            size += item_size
+
+        if items:
+            payloads.append((len(items), f"[{','.join(items)}]"))
+
+        return payloads
+
+    async def _flush_later(self, delay: float) -> None:
+        """Send the pending feeds after a delay."""
+        await asyncio.sleep(delay)
+        self._flusher = None
+        await self._flush()
+
+    async def _flush(self) -> None:
+        """Send the pending feeds, retry later if the connection is lost."""
+        async with self._lock:
+            # Taken once the previous flush is done: feeds keep their order.
+            feeds, self._pending = self._pending, []
+            if not feeds:
+                return
+
+            try:
+                if self._connection is None:
+                    raise ConnectionError("Not connected.")
+                for count, payload in self._payloads(feeds):
+                    await self._connection.execute(
+                        "SELECT pg_notify($1, $2)", self.channel, payload)
+                    feeds = feeds[count:]
+
+            except Exception:  # Noqa
+                self._pending = feeds + self._pending
+                if self._flusher is None:
+                    self._flusher = asyncio.create_task(
+                        self._flush_later(self.reconnect_delay))
+
+    def _on_notification(
+            self,
+            connection: Any,
+            pid: int,
+            channel: str,
+            payload: str
+    ) -> None:
+        """Deliver the feeds or dropped partition of a notification."""
+        message = json.loads(payload)
+        if isinstance(message, dict):
+            task = asyncio.create_task(self._dispatch_dropped(
+                FeedPartition(**message["dropped"])))
+        else:
+            task = asyncio.create_task(self._dispatch(
+                [FeedDetail(**item) for item in message]))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, feeds: List[FeedDetail]) -> None:
+        """Call every handler for every feed."""
+        for feed in feeds:
+            for handler in self.handlers:
+                await handler(feed)
+
+    async def _dispatch_dropped(self, partition: FeedPartition) -> None:
+        """Call every handler of dropped partitions."""
+        for handler in self.dropped_handlers:
+            await handler(partition)
+
+    async def _supervise(self) -> None:
+        """Keep a LISTEN connection open, reconnect when it is lost."""
+        while True:
+            lost = asyncio.Event()
+            connection = None
+            try:
+                connection = await self._connect()
+                connection.add_termination_listener(lambda _: lost.set())
+                await connection.add_listener(
+                    self.channel, self._on_notification)
+                self._connection = connection
+
+                while not lost.is_set():
+                    try:
+                        await asyncio.wait_for(
+                            lost.wait(), timeout=self.health_interval)
+                    except asyncio.TimeoutError:
+                        async with self._lock:
+                            await connection.execute("SELECT 1")
+
+            except asyncio.CancelledError:
+                raise
+
+            except Exception:  # Noqa
+                pass
+
+            if connection is not None and not connection.is_closed():
+                connection.terminate()
+            if self._connection is not None:
+                self._connection = None
+                self.reconnects += 1
+            await asyncio.sleep(self.reconnect_delay)
@@ -1,12 +1,19 @@
 """Unit test for Feed API."""
-from unittest import IsolatedAsyncioTestCase
+import asyncio
+import json
+import tempfile
+from unittest import IsolatedAsyncioTestCase, TestCase
 
 from databases import Database
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine, insert
+from jinja2 import Template
+from sqlalchemy import create_engine, delete, insert
 
-from main import app, DB_PROVIDER
-from src.domains.feed import Base, FeedModel, FeedDetail
+from main import app, DB_PROVIDER, ROOT_FRAGMENT, READ_YOUR_WRITES_COOKIE, \
+    HUB_SETTINGS, FEED_HUB, FEED_BROKER
+from src.apis.feed import FeedJSONResponse, LatestFeedsFragment, dumps
+from src.configs.feed import DatabaseSettings
+from src.domains.feed import Base, FeedModel, FeedDetail, FeedPartition
 
 
 class TestSimpleFeedAPI(IsolatedAsyncioTestCase):
@@ -31,11 +38,70 @@ class TestSimpleFeedAPI(IsolatedAsyncioTestCase):
         query = insert(FeedModel)
         await database.execute_many(query=query, values=values)
 
+    @staticmethod
+    def without_created_at(feeds):
+        """Remove the server-set created_at of JSON feeds."""
+        if isinstance(feeds, list):
+            return [{key: value for key, value in feed.items()
+                     if key != "created_at"} for feed in feeds]
+        return {key: value for key, value in feeds.items()
+                if key != "created_at"}
+
     async def test_read_root(self):
-        response = self.client.get("/")
-        self.assertEqual(response.status_code, 200)
-        self.assertEqual(
-            response.headers['content-type'], 'text/html; charset=utf-8')
+        async with Database(self.database_url, force_rollback=True) as db:
+            DB_PROVIDER.database = db
+            response = self.client.get("/")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                response.headers['content-type'], 'text/html; charset=utf-8')
+
+    async def test_read_root_latest_feeds(self):
+        """
+        Read root html.
+
+        test 1: the feeds are rendered newest first
+        test 2: a created feed is rendered without reloading the feeds
+        """
+        async with Database(self.database_url, force_rollback=True) as db:
+            await self.load_db(database=db)
+            DB_PROVIDER.database = db
+            ROOT_FRAGMENT.clear()
+            response = self.client.get("/")
+            self.assertLess(response.text.index("fake description 5"),
+                            response.text.index("fake description 1"))
+
+            self.client.post("/feed/", json={
+                "origin": "fake.origin",
+                "event": "A fake event",
+                "description": "This is a new fake description"
+            })
+            response = self.client.get("/")
+            self.assertLess(response.text.index("new fake description"),
+                            response.text.index("fake description 5"))
+            ROOT_FRAGMENT.clear()
+
+    async def test_read_root_after_drop(self):
+        """
+        Read root html after a partition is dropped.
+
+        test 1: the rendered feeds are forgotten
+        test 2: the next read renders the remaining feeds
+        """
+        async with Database(self.database_url, force_rollback=True) as db:
+            await self.load_db(database=db)
+            DB_PROVIDER.database = db
+            ROOT_FRAGMENT.clear()
+            self.client.get("/")
+            self.assertTrue(ROOT_FRAGMENT.loaded)
+
+            await db.execute(delete(FeedModel).where(FeedModel.id < 3))
+            await FEED_BROKER.publish_dropped(
+                FeedPartition(name="feed_p20220501"))
+            self.assertFalse(ROOT_FRAGMENT.loaded)
+            response = self.client.get("/")
+            self.assertNotIn("fake description 1<", response.text)
+            self.assertIn("fake description 3", response.text)
+            ROOT_FRAGMENT.clear()
 
     async def test_read_feeds(self):
         """
@@ -48,7 +114,7 @@ class TestSimpleFeedAPI(IsolatedAsyncioTestCase):
             origin=f"fake.origin_{i}",
             event=f"A fake event {i}",
             description=f"This is a fake description {i}",
-            id=i).dict() for i in range(1, 6)]
+            id=i).dict(exclude={"created_at"}) for i in range(1, 6)]
 
         async with Database(self.database_url, force_rollback=True) as db:
             await self.load_db(database=db)
@@ -56,7 +122,236 @@ class TestSimpleFeedAPI(IsolatedAsyncioTestCase):
             response = self.client.get("/feeds")
 
             self.assertEqual(response.status_code, 200)
-            self.assertEqual(response.json(), feed_details)
+            self.assertEqual(
+                self.without_created_at(response.json()), feed_details)
+
+    async def test_read_feeds_paginated(self):
+        """
+        Read feeds page by page.
+
+        test 1: X-Next-Cursor header is returned while there are more feeds
+        test 2: the cursor returns the next page
+        """
+        async with Database(self.database_url, force_rollback=True) as db:
+            await self.load_db(database=db)
+            DB_PROVIDER.database = db
+            response = self.client.get("/feeds", params={"limit": 3})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                [feed["id"] for feed in response.json()], [1, 2, 3])
+
+            cursor = response.headers["X-Next-Cursor"]
+            response = self.client.get(
+                "/feeds", params={"limit": 3, "cursor": cursor})
+            self.assertEqual(
+                [feed["id"] for feed in response.json()], [4, 5])
+            self.assertNotIn("X-Next-Cursor", response.headers)
+
+    async def test_read_feeds_since(self):
+        """
+        Read feeds created since a time.
+
+        test 1: only the feeds created since then are returned
+        """
+        async with Database(self.database_url, force_rollback=True) as db:
+            await self.load_db(database=db)
+            DB_PROVIDER.database = db
+            response = self.client.get(
+                "/feeds", params={"since": "2000-01-01T00:00:00+00:00"})
+            self.assertEqual(len(response.json()), 5)
+            response = self.client.get(
+                "/feeds", params={"since": "2100-01-01T00:00:00+00:00"})
+            self.assertEqual(response.json(), [])
+
+    async def test_read_feeds_by_origin_and_event(self):
+        """
+        Read feeds filtered by origin and event.
+
+        test 1: repeated origin parameters select any of them
+        test 2: event filters the selected origins
+        """
+        async with Database(self.database_url, force_rollback=True) as db:
+            await self.load_db(database=db)
+            DB_PROVIDER.database = db
+            response = self.client.get("/feeds", params={
+                "origin": ["fake.origin_1", "fake.origin_5"]})
+            self.assertEqual(
+                [feed["id"] for feed in response.json()], [1, 5])
+            response = self.client.get("/feeds", params={
+                "origin": ["fake.origin_1", "fake.origin_5"],
+                "event": "A fake event 5"})
+            self.assertEqual([feed["id"] for feed in response.json()], [5])
+
+    async def test_read_feed_stats(self):
+        """
+        Read the number of feeds created.
+
+        test 1: Status code == 200
+        test 2: one count per origin and event of the created feeds
+        """
+        async with Database(self.database_url, force_rollback=True) as db:
+            DB_PROVIDER.database = db
+            for i in range(3):
+                self.client.post("/feed/", json={
+                    "origin": "github.com",
+                    "event": f"event_{i % 2}",
+                    "description": "A new repository",
+                })
+            response = self.client.get(
+                "/feeds/stats", params={"group_by": "event"})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json(), [
+                {"bucket": None, "origin": None, "event": "event_0",
+                 "count": 2},
+                {"bucket": None, "origin": None, "event": "event_1",
+                 "count": 1},
+            ])
+
+    async def test_search_feeds(self):
+        """
+        Search feeds.
+
+        test 1: Status code == 200
+        test 2: only the matching feed is found, with its rank
+        test 3: an invalid cursor gets a 400
+        """
+        async with Database(self.database_url, force_rollback=True) as db:
+            await self.load_db(database=db)
+            DB_PROVIDER.database = db
+            response = self.client.get(
+                "/feeds/search", params={"q": "description 3"})
+            self.assertEqual(response.status_code, 200)
+            hits = response.json()
+            self.assertEqual([hit["id"] for hit in hits], [3])
+            self.assertIn("rank", hits[0])
+            self.assertNotIn("X-Next-Cursor", response.headers)
+
+            response = self.client.get(
+                "/feeds/search", params={"q": "fake", "cursor": "bad"})
+            self.assertEqual(response.status_code, 400)
+
+    async def test_read_feeds_invalid_cursor(self):
+        """
+        Read feeds with an invalid cursor.
+
+        test 1: Status code == 400
+        """
+        async with Database(self.database_url, force_rollback=True) as db:
+            DB_PROVIDER.database = db
+            response = self.client.get("/feeds", params={"cursor": "bad"})
+            self.assertEqual(response.status_code, 400)
+
+    async def test_stream_feeds_last_event_id(self):
+        """
+        Stream feeds after a Last-Event-ID.
+
+        test 1: missed feeds are replayed as events with their id
+        test 2: a reset event ends the stream when too many were missed
+        """
+        chunk_size = HUB_SETTINGS.ws_replay_chunk_size
+        replay_max = HUB_SETTINGS.ws_replay_max
+        HUB_SETTINGS.ws_replay_chunk_size = 2
+        HUB_SETTINGS.ws_replay_max = 3
+        try:
+            async with Database(
+                    self.database_url, force_rollback=True) as db:
+                await self.load_db(database=db)
+                DB_PROVIDER.database = db
+                response = self.client.get(
+                    "/feeds/stream", headers={"Last-Event-ID": "1"})
+        finally:
+            HUB_SETTINGS.ws_replay_chunk_size = chunk_size
+            HUB_SETTINGS.ws_replay_max = replay_max
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith(
+            "text/event-stream"))
+        events = response.text.split("\n\n")
+        self.assertEqual(events[0], "retry: 3000")
+        self.assertTrue(events[1].startswith("id: 2\ndata: {"))
+        self.assertEqual(json.loads(events[2].split("data: ")[1])["id"], 3)
+        self.assertEqual(events[3], "event: reset\ndata: {}")
+
+    async def test_export_feeds(self):
+        """
+        Export feeds as NDJSON.
+
+        test 1: Status code == 200
+        test 2: One JSON document per line
+        """
+        feed_details = [FeedDetail(
+            origin=f"fake.origin_{i}",
+            event=f"A fake event {i}",
+            description=f"This is a fake description {i}",
+            id=i).dict(exclude={"created_at"}) for i in range(1, 6)]
+
+        async with Database(self.database_url, force_rollback=True) as db:
+            await self.load_db(database=db)
+            DB_PROVIDER.database = db
+            response = self.client.get("/feeds/export")
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                response.headers["content-type"], "application/x-ndjson")
+            lines = response.text.splitlines()
+            self.assertEqual(
+                self.without_created_at([json.loads(line) for line in lines]),
+                feed_details)
+
+    async def test_read_feeds_not_modified(self):
+        """
+        Read feeds with the ETag of the previous response.
+
+        test 1: Status code == 304 while nothing changed
+        test 2: Status code == 200 once a feed is created
+        """
+        async with Database(self.database_url, force_rollback=True) as db:
+            await self.load_db(database=db)
+            DB_PROVIDER.database = db
+            etag = self.client.get("/feeds").headers["ETag"]
+            response = self.client.get(
+                "/feeds", headers={"If-None-Match": etag})
+            self.assertEqual(response.status_code, 304)
+
+            self.client.post("/feed/", json={
+                "origin": "fake.origin",
+                "event": "A fake event",
+                "description": "This is a fake description"
+            })
+            response = self.client.get(
+                "/feeds", headers={"If-None-Match": etag})
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response.headers["ETag"], etag)
+
+    async def test_read_feed_by_id_not_modified(self):
+        """
+        Read a feed with the ETag of the previous response.
+
+        test 1: Status code == 304
+        """
+        async with Database(self.database_url, force_rollback=True) as db:
+            await self.load_db(database=db)
+            DB_PROVIDER.database = db
+            etag = self.client.get("/feed/1").headers["ETag"]
+            response = self.client.get(
+                "/feed/1", headers={"If-None-Match": f'W/{etag}'})
+            self.assertEqual(response.status_code, 304)
+
+    async def test_read_deleted_feed_not_modified(self):
+        """
+        Read a deleted feed with the ETag of a previous response.
+
+        test 1: Status code == 200, the feed is not found
+        """
+        async with Database(self.database_url, force_rollback=True) as db:
+            await self.load_db(database=db)
+            DB_PROVIDER.database = db
+            etag = self.client.get("/feed/1").headers["ETag"]
+            await db.execute(delete(FeedModel).where(FeedModel.id == 1))
+            response = self.client.get(
+                "/feed/1", headers={"If-None-Match": etag})
+            self.assertEqual(response.status_code, 200)
+            self.assertIsNone(response.json())
 
     async def test_read_feeds_empty_list(self):
         """
@@ -72,7 +367,8 @@ class TestSimpleFeedAPI(IsolatedAsyncioTestCase):
             response = self.client.get("/feeds")
 
             self.assertEqual(response.status_code, 200)
-            self.assertEqual(response.json(), feed_details)
+            self.assertEqual(
+                self.without_created_at(response.json()), feed_details)
 
     async def test_read_feed_by_id(self):
         """
@@ -85,7 +381,7 @@ class TestSimpleFeedAPI(IsolatedAsyncioTestCase):
             origin=f"fake.origin_1",
             event=f"A fake event 1",
             description=f"This is a fake description 1",
-            id=1).dict()
+            id=1).dict(exclude={"created_at"})
 
         async with Database(self.database_url, force_rollback=True) as db:
             await self.load_db(database=db)
@@ -93,7 +389,8 @@ class TestSimpleFeedAPI(IsolatedAsyncioTestCase):
             response = self.client.get("/feed/1")
 
             self.assertEqual(response.status_code, 200)
-            self.assertEqual(response.json(), feed_details)
+            self.assertEqual(
+                self.without_created_at(response.json()), feed_details)
 
     async def test_read_feed_by_id_invalid_feed_id(self):
         """
@@ -121,7 +418,7 @@ class TestSimpleFeedAPI(IsolatedAsyncioTestCase):
             origin="fake.origin",
             event="A fake event",
             description="This is a fake description",
-            id=6).dict()
+            id=6).dict(exclude={"created_at"})
 
         async with Database(self.database_url, force_rollback=True) as db:
             await self.load_db(database=db)
@@ -136,7 +433,113 @@ class TestSimpleFeedAPI(IsolatedAsyncioTestCase):
             )
 
             self.assertEqual(response.status_code, 200)
-            self.assertEqual(response.json(), feed_details)
+            self.assertEqual(
+                self.without_created_at(response.json()), feed_details)
+            self.assertIsNotNone(response.json()["created_at"])
+
+    async def test_create_feed_read_your_writes(self):
+        """
+        Read a created feed with a replica configured.
+
+        test 1: the creation sets the read-your-writes cookie
+        test 2: with the cookie, the feed is read from the primary
+        test 3: without it, the feed is read from the replica
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            replica_url = f"sqlite:///{directory}/replica.db"
+            Base.metadata.create_all(create_engine(replica_url))
+            async with Database(self.database_url, force_rollback=True) \
+                    as db, Database(replica_url) as replica:
+                DB_PROVIDER.database = db
+                DB_PROVIDER.replicas = [replica]
+                DB_PROVIDER.settings = DatabaseSettings(
+                    read_your_writes_window=2)
+                try:
+                    response = self.client.post("/feed/", json={
+                        "origin": "fake.origin",
+                        "event": "A fake event",
+                        "description": "This is a fake description"
+                    })
+                    self.assertIn(
+                        READ_YOUR_WRITES_COOKIE, response.cookies)
+                    feed_id = response.json()["id"]
+                    response = self.client.get(f"/feed/{feed_id}")
+                    self.assertEqual(response.json()["id"], feed_id)
+
+                    self.client.cookies.clear()
+                    response = self.client.get(f"/feed/{feed_id}")
+                    self.assertIsNone(response.json())
+
+                finally:
+                    self.client.cookies.clear()
+                    DB_PROVIDER.replicas = []
+                    del DB_PROVIDER.settings
+
+    async def test_create_feeds(self):
+        """
+        Create new feeds.
+
+        test 1: Status code == 200
+        test 2: Result has the feed ids in input order
+        """
+        async with Database(self.database_url, force_rollback=True) as db:
+            await self.load_db(database=db)
+            DB_PROVIDER.database = db
+            response = self.client.post(
+                "/feeds/batch",
+                json=[{
+                    "origin": "fake.origin",
+                    "event": "A fake event",
+                    "description": f"This is a fake description {i}"
+                } for i in range(3)]
+            )
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json(), {"ids": [6, 7, 8], "errors": []})
+
+    async def test_create_feeds_invalid_items(self):
+        """
+        Create new feeds, some of them invalid.
+
+        test 1: Status code == 200, the batch is not rejected
+        test 2: The valid feeds are created, in input order
+        test 3: The invalid feeds are reported with their index
+        """
+        async with Database(self.database_url, force_rollback=True) as db:
+            await self.load_db(database=db)
+            DB_PROVIDER.database = db
+            response = self.client.post(
+                "/feeds/batch",
+                json=[
+                    {
+                        "origin": "fake.origin",
+                        "event": "A fake event",
+                        "description": "This is a fake description 0"
+                    },
+                    {
+                        "origin": "fake.origin",
+                        "event": "A fake event",
+                    },
+                    {
+                        "origin": "x" * 26,
+                        "event": "A fake event",
+                        "description": "This is a fake description 2"
+                    },
+                    {
+                        "origin": "fake.origin",
+                        "event": "A fake event",
+                        "description": "This is a fake description 3"
+                    },
+                ]
+            )
+
+            self.assertEqual(response.status_code, 200)
+            result = response.json()
+            self.assertEqual(result["ids"], [6, None, None, 7])
+            self.assertEqual(
+                [error["index"] for error in result["errors"]], [1, 2])
+            self.assertIn("description", result["errors"][0]["detail"])
+            self.assertIn("origin", result["errors"][1]["detail"])
 
     async def test_create_feed_invalid_body(self):
         """
@@ -178,3 +581,292 @@ class TestSimpleFeedAPI(IsolatedAsyncioTestCase):
             )
 
             self.assertEqual(response.status_code, 404)
+
+    async def test_read_pool_stats(self):
+        """
+        Read pool statistics.
+
+        test 1: Status code == 200
+        test 2: Result has the acquired counter
+        """
+        async with Database(self.database_url, force_rollback=True) as db:
+            DB_PROVIDER.database = db
+            response = self.client.get("/stats/pool")
+
+            self.assertEqual(response.status_code, 200)
+            self.assertIn("acquired", response.json())
+
+    async def test_read_metrics(self):
+        """
+        Read metrics after a few requests.
+
+        test 1: Status code == 200, Prometheus text format
+        test 2: requests are timed per route template, queries per operation
+        """
+        async with Database(self.database_url, force_rollback=True) as db:
+            await self.load_db(database=db)
+            DB_PROVIDER.database = db
+            self.client.get("/feed/1")
+            self.client.get("/feed/2")
+            response = self.client.get("/metrics")
+
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(
+                response.headers["content-type"].startswith("text/plain"))
+            self.assertIn(
+                'http_request_duration_seconds_count{method="GET",'
+                'route="/feed/{feed_id}",status="200"}', response.text)
+            self.assertIn(
+                'db_query_duration_seconds_count{operation="read_feed_by_id"}',
+                response.text)
+            self.assertIn("websocket_connections 0", response.text)
+            self.assertIn("feed_hub_rejected_total", response.text)
+
+    async def test_read_cache_stats_disabled(self):
+        """
+        Read cache statistics while the cache is disabled.
+
+        test 1: Status code == 404
+        """
+        response = self.client.get("/stats/cache")
+        self.assertEqual(response.status_code, 404)
+
+    async def test_websocket_new_feed(self):
+        """
+        Create a new feed while a websocket client is connected.
+
+        test 1: the client receives the created feed
+        """
+        async with Database(self.database_url, force_rollback=True) as db:
+            await self.load_db(database=db)
+            DB_PROVIDER.database = db
+            with TestClient(app) as client:
+                with client.websocket_connect("/ws") as websocket:
+                    response = client.post(
+                        "/feed/",
+                        json={
+                            "origin": "fake.origin",
+                            "event": "A fake event",
+                            "description": "This is a fake description"
+                        }
+                    )
+                    self.assertEqual(websocket.receive_json(), response.json())
+
+    async def test_websocket_resume(self):
+        """
+        Reconnect to the websocket with the last feed id seen.
+
+        test 1: the missed feeds are sent first, then the new feeds
+        """
+        async with Database(self.database_url, force_rollback=True) as db:
+            await self.load_db(database=db)
+            DB_PROVIDER.database = db
+            with TestClient(app) as client:
+                with client.websocket_connect("/ws?after_id=3") as websocket:
+                    self.assertEqual(websocket.receive_json()["id"], 4)
+                    self.assertEqual(websocket.receive_json()["id"], 5)
+                    response = client.post(
+                        "/feed/",
+                        json={
+                            "origin": "fake.origin",
+                            "event": "A fake event",
+                            "description": "This is a fake description"
+                        }
+                    )
+                    self.assertEqual(websocket.receive_json(), response.json())
+
+    async def test_websocket_batch_delivery(self):
+        """
+        Receive feeds by batches.
+
+        test 1: the replayed feeds come in one array frame
+        test 2: the frames sent are counted per connection
+        """
+        async with Database(self.database_url, force_rollback=True) as db:
+            await self.load_db(database=db)
+            DB_PROVIDER.database = db
+            with TestClient(app) as client:
+                with client.websocket_connect(
+                        "/ws?after_id=2&delivery=batch") as websocket:
+                    feeds = websocket.receive_json()
+                    self.assertEqual(
+                        [feed["id"] for feed in feeds], [3, 4, 5])
+
+                    stats = client.get("/stats/websockets").json()
+                    self.assertEqual(len(stats), 1)
+                    self.assertEqual(stats[0]["feeds"], 3)
+                    self.assertEqual(stats[0]["frames"], 1)
+
+    async def test_websocket_topics(self):
+        """
+        Connect to the websocket with topics.
+
+        test 1: only the feeds of the topics are replayed
+        test 2: an invalid subscription closes the websocket with 1008
+        """
+        async with Database(self.database_url, force_rollback=True) as db:
+            await self.load_db(database=db)
+            DB_PROVIDER.database = db
+            with TestClient(app) as client:
+                with client.websocket_connect(
+                        "/ws?after_id=0&delivery=batch"
+                        "&origin=fake.origin_2&origin=fake.origin_4"
+                ) as websocket:
+                    feeds = websocket.receive_json()
+                    self.assertEqual(
+                        [feed["id"] for feed in feeds], [2, 4])
+
+                    websocket.send_json({"action": "ignore", "topics": []})
+                    message = websocket.receive()
+                    self.assertEqual(message["type"], "websocket.close")
+                    self.assertEqual(message["code"], 1008)
+
+    async def test_websocket_max_connections(self):
+        """
+        Connect more clients than allowed.
+
+        test 1: a websocket beyond the cap is closed with 1013
+        test 2: a stream beyond the cap gets a 503 with Retry-After
+        """
+        max_subscribers = FEED_HUB.max_subscribers
+        FEED_HUB.max_subscribers = 1
+        try:
+            with TestClient(app) as client:
+                with client.websocket_connect("/ws"):
+                    with client.websocket_connect("/ws") as refused:
+                        message = refused.receive()
+                        self.assertEqual(message["type"], "websocket.close")
+                        self.assertEqual(message["code"], 1013)
+
+                    response = client.get("/feeds/stream")
+                    self.assertEqual(response.status_code, 503)
+                    self.assertIn("retry-after", response.headers)
+        finally:
+            FEED_HUB.max_subscribers = max_subscribers
+
+    async def test_websocket_disconnect_during_handshake(self):
+        """
+        Disconnect and cancel a websocket while it is being accepted.
+
+        test 1: the subscriber is unregistered from the hub
+        test 2: its slot is free for the next client
+        """
+        max_subscribers = FEED_HUB.max_subscribers
+        FEED_HUB.max_subscribers = 1
+        messages = [
+            {"type": "websocket.connect"},
+            {"type": "websocket.disconnect", "code": 1006},
+        ]
+        sent = []
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await asyncio.Event().wait()
+
+        async def send(message):
+            sent.append(message)
+            if message["type"] == "websocket.accept":
+                # Delivered at the first await after the accept.
+                asyncio.get_running_loop().call_soon(handler.cancel)
+
+        scope = {
+            "type": "websocket",
+            "path": "/ws",
+            "raw_path": b"/ws",
+            "root_path": "",
+            "scheme": "ws",
+            "query_string": b"",
+            "headers": [],
+            "client": ("testclient", 50000),
+            "server": ("testserver", 80),
+            "subprotocols": [],
+        }
+        try:
+            handler = asyncio.create_task(app(scope, receive, send))
+            with self.assertRaises(asyncio.CancelledError):
+                await handler
+            self.assertEqual(sent[0]["type"], "websocket.accept")
+            self.assertEqual(len(FEED_HUB.subscribers), 0)
+
+            async with Database(self.database_url) as db:
+                DB_PROVIDER.database = db
+                with TestClient(app) as client:
+                    with client.websocket_connect("/ws"):
+                        self.assertEqual(len(FEED_HUB.subscribers), 1)
+        finally:
+            FEED_HUB.max_subscribers = max_subscribers
+
+
+class TestFeedJSONResponse(TestCase):
+    """Unit Test for the trusted JSON response."""
+
+    def test_render(self):
+        """
+        Render constructed DTOs.
+
+        test 1: same JSON as the validated DTOs
+        """
+        feed_data = {
+            "origin": "fake.origin",
+            "event": "A fake event",
+            "description": "This is a fake description",
+            "id": 1,
+            "created_at": None,
+        }
+        response = FeedJSONResponse(
+            content=[FeedDetail.construct(**feed_data)])
+        self.assertEqual(json.loads(response.body), [feed_data])
+
+    def test_dumps_unknown_type(self):
+        """
+        Serialize an unsupported object.
+
+        test 1: raise TypeError
+        """
+        with self.assertRaises(TypeError):
+            dumps(object())
+
+
+class TestLatestFeedsFragment(TestCase):
+    """Unit Test for the rendered latest feeds."""
+
+    @staticmethod
+    def feed(feed_id: int) -> FeedDetail:
+        """Return a feed for testing."""
+        return FeedDetail(
+            id=feed_id,
+            origin=f"fake.origin_{feed_id}",
+            event=f"A fake event {feed_id}",
+            description=f"This is a fake description {feed_id}",
+        )
+
+    def fragment(self, size: int) -> LatestFeedsFragment:
+        """Return a fragment rendering the feed ids."""
+        return LatestFeedsFragment(
+            item_template=Template("<{{ feed.id }}>"), size=size)
+
+    def test_load(self):
+        """
+        Load feeds in id order.
+
+        test 1: newest first
+        test 2: the oldest feeds beyond size are dropped
+        """
+        fragment = self.fragment(size=3)
+        fragment.load([self.feed(feed_id) for feed_id in range(1, 6)])
+        self.assertEqual(fragment.html, "<5><4><3>")
+        self.assertEqual(fragment.oldest_id, 3)
+
+    def test_publish(self):
+        """
+        Publish new feeds after loading.
+
+        test 1: a new feed is rendered first
+        test 2: a feed already rendered is ignored
+        """
+        fragment = self.fragment(size=3)
+        fragment.load([self.feed(feed_id) for feed_id in range(1, 4)])
+        asyncio.run(fragment.publish(self.feed(4)))
+        asyncio.run(fragment.publish(self.feed(4)))
+        self.assertEqual(fragment.html, "<4><3><2>")
@@ -0,0 +1,72 @@
+"""Unit test for metrics API."""
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+from src.apis.metrics import MetricsMiddleware
+from src.core.metrics import MetricsRegistry
+
+
+class TestMetricsMiddleware(IsolatedAsyncioTestCase):
+    """Unit Test for MetricsMiddleware."""
+
+    async def test_streamed_response(self):
+        """
+        Time a response streamed until the client leaves.
+
+        test 1: the request is in flight until its response starts
+        test 2: its latency is observed once, when the response starts
+        """
+        registry = MetricsRegistry()
+        opened, closed = asyncio.Event(), asyncio.Event()
+
+        async def stream(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200,
+                        "headers": []})
+            opened.set()
+            await closed.wait()
+            await send({"type": "http.response.body", "body": b""})
+
+        async def receive():
+            return {"type": "http.request"}
+
+        async def send(message):
+            pass
+
+        middleware = MetricsMiddleware(
+            stream, registry=registry, routes=lambda: {stream: "/stream"})
+        task = asyncio.create_task(middleware(
+            {"type": "http", "method": "GET", "endpoint": stream},
+            receive, send))
+        await opened.wait()
+        lines = registry.render().splitlines()
+        self.assertIn("http_requests_in_flight 0", lines)
+        self.assertIn('http_request_duration_seconds_count{method="GET",'
+                      'route="/stream",status="200"} 1', lines)
+
+        closed.set()
+        await task
+        lines = registry.render().splitlines()
+        self.assertIn("http_requests_in_flight 0", lines)
+        self.assertIn('http_request_duration_seconds_count{method="GET",'
+                      'route="/stream",status="200"} 1', lines)
+
+    async def test_failed_request(self):
+        """
+        Time a request failing before its response.
+
+        test 1: it is observed with status 500, no longer in flight
+        """
+        registry = MetricsRegistry()
+
+        async def fail(scope, receive, send):
+            raise RuntimeError("failed")
+
+        middleware = MetricsMiddleware(
+            fail, registry=registry, routes=lambda: {})
+        with self.assertRaises(RuntimeError):
+            await middleware(
+                {"type": "http", "method": "GET"}, None, None)
+        lines = registry.render().splitlines()
+        self.assertIn("http_requests_in_flight 0", lines)
+        self.assertIn('http_request_duration_seconds_count{method="GET",'
+                      'route="unmatched",status="500"} 1', lines)
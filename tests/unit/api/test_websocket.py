@@ -0,0 +1,49 @@
+"""Unit tests for websocket."""
+from unittest import TestCase
+
+from websockets.frames import Frame, OP_TEXT, OP_PING
+
+from src.apis.websocket import ThresholdPerMessageDeflate, deflate_factory
+from src.configs.feed import FeedHubSettings
+
+
+class TestPerMessageDeflate(TestCase):
+
+    settings = FeedHubSettings(
+        ws_deflate_min_size=64, ws_deflate_window_bits=10)
+
+    def negotiate(self) -> ThresholdPerMessageDeflate:
+        """Accept the offer of a client without parameters."""
+        response, extension = deflate_factory(
+            self.settings).process_request_params([], [])
+        self.assertIn(("server_max_window_bits", "10"), response)
+        return extension
+
+    def test_small_message_not_compressed(self):
+        """
+        Encode a message smaller than the threshold.
+
+        test 1: the frame is sent as is, without rsv1
+        test 2: control frames are not compressed
+        """
+        extension = self.negotiate()
+        frame = Frame(OP_TEXT, b'{"id":1}')
+        self.assertEqual(extension.encode(frame), frame)
+        ping = Frame(OP_PING, b"x" * 100)
+        self.assertEqual(extension.encode(ping), ping)
+
+    def test_large_message_compressed(self):
+        """
+        Encode a message larger than the threshold.
+
+        test 1: the frame is compressed, with rsv1
+        test 2: the client decodes it back
+        """
+        extension = self.negotiate()
+        data = b'[' + b'{"origin":"github.com"},' * 20 + b'{}]'
+        frame = extension.encode(Frame(OP_TEXT, data))
+        self.assertTrue(frame.rsv1)
+        self.assertLess(len(frame.data), len(data))
+
+        client = ThresholdPerMessageDeflate(False, False, 10, 15)
+        self.assertEqual(client.decode(frame).data, data)
@@ -1,13 +1,19 @@
 """Unit tests for feed."""
+import datetime
+from typing import List
 from unittest import TestCase, IsolatedAsyncioTestCase
 
 from databases import Database
 from sqlalchemy import create_engine, insert
 
 from src.applications.feed import ReadFeeds, ReadFeedById, CreateNewFeed, \
-    CreateNewFeedAndReadFeedByID
-from src.domains.feed import Base, FeedModel, Feed
-from src.providers.feed import SimpleFeedProvider
+    CreateNewFeedAndReadFeedByID, ReadFeedsPage, ExportFeeds, CreateNewFeeds, \
+    SearchFeeds, MaintainFeedPartitions, ResumeFeeds
+from src.core.feed import FeedHub
+from src.domains.feed import Base, FeedModel, Feed, FeedCursor, \
+    FeedSearchCursor, FeedPartition, FeedReplayError
+from src.interfaces.feed import FeedPartitionInterface
+from src.providers.feed import SimpleFeedProvider, InMemoryFeedBroker
 
 
 class TestFeedApplications(IsolatedAsyncioTestCase):
@@ -49,7 +55,8 @@ class TestFeedApplications(IsolatedAsyncioTestCase):
                 "id": 1
             }
             self.assertEqual(len(feeds), 5)
-            self.assertEqual(feeds[0].dict(), expected)
+            self.assertEqual(
+                feeds[0].dict(exclude={"created_at"}), expected)
 
     async def test_read_feeds_empty_list(self):
         """
@@ -63,6 +70,133 @@ class TestFeedApplications(IsolatedAsyncioTestCase):
             feeds = await ReadFeeds(feed_provider=provider)()
             self.assertListEqual(feeds, [])
 
+    async def test_read_feeds_page(self):
+        """
+        Read feeds page by page.
+
+        test 1: each page has the expected feeds
+        test 2: the last page has no next cursor
+        """
+        async with Database(self.database_url, force_rollback=True) as db:
+            await self.load_db(database=db)
+            provider = SimpleFeedProvider()
+            provider.database = db
+            page = await ReadFeedsPage(feed_provider=provider)(limit=3)
+            self.assertEqual([feed.id for feed in page.feeds], [1, 2, 3])
+            self.assertIsNotNone(page.next_cursor)
+
+            cursor = FeedCursor.decode(page.next_cursor)
+            page = await ReadFeedsPage(feed_provider=provider)(
+                limit=3, cursor=cursor)
+            self.assertEqual([feed.id for feed in page.feeds], [4, 5])
+            self.assertIsNone(page.next_cursor)
+
+    async def test_read_feeds_page_filtered(self):
+        """
+        Read filtered feeds page by page.
+
+        test 1: every page only has feeds matching the filters
+        """
+        async with Database(self.database_url, force_rollback=True) as db:
+            await self.load_db(database=db)
+            provider = SimpleFeedProvider()
+            provider.database = db
+            origins = ["fake.origin_0", "fake.origin_2", "fake.origin_4"]
+            page = await ReadFeedsPage(feed_provider=provider)(
+                limit=2, origins=origins)
+            self.assertEqual([feed.id for feed in page.feeds], [1, 3])
+
+            page = await ReadFeedsPage(feed_provider=provider)(
+                limit=2, cursor=FeedCursor.decode(page.next_cursor),
+                origins=origins)
+            self.assertEqual([feed.id for feed in page.feeds], [5])
+            self.assertIsNone(page.next_cursor)
+
+    async def test_search_feeds(self):
+        """
+        Search feeds page by page.
+
+        test 1: hits with the same rank are ordered by decreasing id
+        test 2: the last page has no next cursor
+        """
+        async with Database(self.database_url, force_rollback=True) as db:
+            await self.load_db(database=db)
+            provider = SimpleFeedProvider()
+            provider.database = db
+            page = await SearchFeeds(feed_provider=provider)(
+                terms="fake description", limit=3)
+            self.assertEqual([hit.id for hit in page.hits], [5, 4, 3])
+
+            page = await SearchFeeds(feed_provider=provider)(
+                terms="fake description", limit=3,
+                cursor=FeedSearchCursor.decode(page.next_cursor))
+            self.assertEqual([hit.id for hit in page.hits], [2, 1])
+            self.assertIsNone(page.next_cursor)
+
+    async def test_export_feeds(self):
+        """
+        Export feeds.
+
+        test 1: every feed is exported
+        """
+        async with Database(self.database_url, force_rollback=True) as db:
+            await self.load_db(database=db)
+            provider = SimpleFeedProvider()
+            provider.database = db
+            feeds = [feed async for feed in ExportFeeds(
+                feed_provider=provider)()]
+            self.assertEqual(len(feeds), 5)
+
+    async def test_resume_feeds(self):
+        """
+        Resume after a feed id while new feeds are published.
+
+        test 1: missed feeds are replayed by chunks, then new feeds follow
+        test 2: a feed both replayed and published is yielded once
+        """
+        async with Database(self.database_url, force_rollback=True) as db:
+            await self.load_db(database=db)
+            provider = SimpleFeedProvider()
+            provider.database = db
+            hub = FeedHub()
+            subscriber = hub.subscribe()
+            feed = Feed(
+                origin="fake_origin",
+                event="fake_event",
+                description="fake_description"
+            )
+            # Created after the subscription, before the replay.
+            await CreateNewFeedAndReadFeedByID(
+                feed_provider=provider, feed_publisher=hub)(feed=feed)
+
+            feeds = ResumeFeeds(feed_provider=provider)(
+                subscriber=subscriber, after_id=2, chunk_size=2)
+            ids = [(await feeds.__anext__()).id for _ in range(4)]
+            self.assertEqual(ids, [3, 4, 5, 6])
+
+            new_feed = await CreateNewFeedAndReadFeedByID(
+                feed_provider=provider, feed_publisher=hub)(feed=feed)
+            self.assertEqual((await feeds.__anext__()).id, new_feed.id)
+
+            subscriber.close()
+            self.assertEqual([feed async for feed in feeds], [])
+
+    async def test_resume_feeds_too_many_missed(self):
+        """
+        Resume after too many feeds.
+
+        test 1: FeedReplayError is raised
+        """
+        async with Database(self.database_url, force_rollback=True) as db:
+            await self.load_db(database=db)
+            provider = SimpleFeedProvider()
+            provider.database = db
+            feeds = ResumeFeeds(feed_provider=provider)(
+                subscriber=FeedHub().subscribe(), after_id=0, chunk_size=2,
+                max_feeds=3)
+            with self.assertRaises(FeedReplayError):
+                [feed async for feed in feeds]
+
     async def test_read_feed_by_id(self):
         """
         Read feed by id.
@@ -81,7 +215,7 @@ class TestFeedApplications(IsolatedAsyncioTestCase):
                 "description": f"This is a fake description 0",
                 "id": 1
             }
-            self.assertEqual(feed.dict(), expected)
+            self.assertEqual(feed.dict(exclude={"created_at"}), expected)
 
     async def test_read_feed_by_id_result_is_none(self):
         """
@@ -116,6 +250,24 @@ class TestFeedApplications(IsolatedAsyncioTestCase):
             feed_id = await CreateNewFeed(feed_provider=provider)(feed=feed)
             self.assertEqual(feed_id, feed_id_expected)
 
+    async def test_create_new_feeds(self):
+        """
+        Create new feeds.
+
+        test 1: result has the feed ids in input order
+        """
+        async with Database(self.database_url, force_rollback=True) as db:
+            await self.load_db(database=db)
+            provider = SimpleFeedProvider()
+            provider.database = db
+            feeds = [Feed(
+                origin="fake_origin",
+                event="fake_event",
+                description=f"fake_description {i}"
+            ) for i in range(3)]
+            result = await CreateNewFeeds(feed_provider=provider)(feeds=feeds)
+            self.assertEqual(result.ids, [6, 7, 8])
+
     async def test_create_new_feed_and_read_feed_by_id(self):
         """
         Create a new feed and read feed by ID.
@@ -139,5 +291,150 @@ class TestFeedApplications(IsolatedAsyncioTestCase):
             )
             feed_result = await CreateNewFeedAndReadFeedByID(
                 feed_provider=provider)(feed=feed)
-            self.assertEqual(feed_result.dict(), feed_expected)
+            self.assertEqual(
+                feed_result.dict(exclude={"created_at"}), feed_expected)
+            self.assertIsNotNone(feed_result.created_at)
+
+    async def test_create_new_feed_and_read_feed_by_id_publish(self):
+        """
+        Create a new feed with a publisher.
+
+        test 1: the created feed is published once
+        """
+        async with Database(self.database_url, force_rollback=True) as db:
+            await self.load_db(database=db)
+            provider = SimpleFeedProvider()
+            provider.database = db
+            hub = FeedHub()
+            subscriber = hub.subscribe()
+            feed = Feed(
+                origin="fake_origin",
+                event="fake_event",
+                description="fake_description"
+            )
+            feed_result = await CreateNewFeedAndReadFeedByID(
+                feed_provider=provider, feed_publisher=hub)(feed=feed)
+            self.assertEqual(await subscriber.get(), feed_result)
+            self.assertTrue(subscriber.queue.empty())
+
+
+class FakeFeedPartitionProvider(FeedPartitionInterface):
+    """In-memory partitions of the feed table."""
+
+    def __init__(self, partitions: List[FeedPartition]):
+        """Init."""
+        self.partitions = partitions
+
+    async def read_partitions(self) -> List[FeedPartition]:
+        """Read the partitions."""
+        return list(self.partitions)
+
+    async def create_partition(self, partition: FeedPartition) -> None:
+        """Create a partition."""
+        self.partitions.append(partition)
+
+    async def drop_partition(self, partition: FeedPartition) -> None:
+        """Drop a partition."""
+        self.partitions.remove(partition)
+
+
+class TestMaintainFeedPartitions(IsolatedAsyncioTestCase):
+
+    now = datetime.datetime(2022, 5, 9, 15, 30, tzinfo=datetime.timezone.utc)
+
+    @staticmethod
+    def day(month: int, day: int) -> datetime.datetime:
+        """Return a UTC midnight in 2022."""
+        return datetime.datetime(
+            2022, month, day, tzinfo=datetime.timezone.utc)
+
+    async def test_create_monthly_partitions(self):
+        """
+        Create monthly partitions after the legacy one.
+
+        test 1: the rest of the current month gets its own partition
+        test 2: the next months are created
+        test 3: the next month is created even without premake
+        """
+        provider = FakeFeedPartitionProvider(partitions=[
+            FeedPartition(name="feed_legacy", end=self.day(5, 10)),
+        ])
+        report = await MaintainFeedPartitions(partition_provider=provider)(
+            interval="month", premake=0, now=self.now, dry_run=True)
+        self.assertEqual(
+            [p.name for p in report.created],
+            ["feed_p20220510", "feed_p20220601"])
+
+        report = await MaintainFeedPartitions(partition_provider=provider)(
+            interval="month", premake=2, now=self.now)
+        self.assertEqual(
+            [(p.name, p.start, p.end) for p in report.created], [
+                ("feed_p20220510", self.day(5, 10), self.day(6, 1)),
+                ("feed_p20220601", self.day(6, 1), self.day(7, 1)),
+                ("feed_p20220701", self.day(7, 1), self.day(8, 1)),
+            ])
+        self.assertEqual(report.dropped, [])
+        self.assertEqual(len(provider.partitions), 4)
+
+        report = await MaintainFeedPartitions(partition_provider=provider)(
+            interval="month", premake=2, now=self.now)
+        self.assertEqual(report.created, [])
+
+    async def test_drop_expired_partitions(self):
+        """
+        Drop the partitions older than the retention.
+
+        test 1: only partitions ending before the retention are dropped
+        test 2: nothing changes on a dry run
+        """
+        partitions = [FeedPartition(
+            name=f"feed_p202205{day:02}",
+            start=self.day(5, day),
+            end=self.day(5, day + 1),
+        ) for day in range(5, 11)]
+        provider = FakeFeedPartitionProvider(partitions=list(partitions))
+        report = await MaintainFeedPartitions(partition_provider=provider)(
+            interval="day", premake=2, retention=2, now=self.now,
+            dry_run=True)
+        self.assertEqual(report.dropped, partitions[:2])
+        self.assertEqual(
+            [p.name for p in report.created], ["feed_p20220511"])
+        self.assertEqual(provider.partitions, partitions)
+
+        await MaintainFeedPartitions(partition_provider=provider)(
+            interval="day", premake=2, retention=2, now=self.now)
+        self.assertEqual(
+            [p.name for p in provider.partitions], [
+                "feed_p20220507", "feed_p20220508", "feed_p20220509",
+                "feed_p20220510", "feed_p20220511",
+            ])
+
+    async def test_drop_publishes_partitions(self):
+        """
+        Drop partitions with a broker.
+
+        test 1: every dropped partition is published once dropped
+        test 2: nothing is published on a dry run
+        """
+        partitions = [FeedPartition(
+            name=f"feed_p202205{day:02}",
+            start=self.day(5, day),
+            end=self.day(5, day + 1),
+        ) for day in range(5, 11)]
+        provider = FakeFeedPartitionProvider(partitions=list(partitions))
+        broker = InMemoryFeedBroker()
+        dropped = []
+
+        async def handler(partition: FeedPartition):
+            self.assertNotIn(partition, provider.partitions)
+            dropped.append(partition)
+
+        broker.subscribe_dropped(handler)
+        maintain = MaintainFeedPartitions(
+            partition_provider=provider, feed_broker=broker)
+        await maintain(interval="day", premake=2, retention=2, now=self.now,
+                       dry_run=True)
+        self.assertEqual(dropped, [])
 
+        await maintain(interval="day", premake=2, retention=2, now=self.now)
+        self.assertEqual(dropped, partitions[:2])
@@ -0,0 +1,221 @@
+"""Unit tests for feed."""
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+from src.core.feed import FeedHub, batch_feeds, heartbeat_feeds
+from src.domains.feed import FeedCapacityError, FeedDetail, \
+    FeedSubscriptionError
+
+
+class TestFeedHub(IsolatedAsyncioTestCase):
+
+    @staticmethod
+    def feed(feed_id: int) -> FeedDetail:
+        """Return a feed for testing."""
+        return FeedDetail(
+            id=feed_id,
+            origin=f"fake.origin_{feed_id}",
+            event=f"A fake event {feed_id}",
+            description=f"This is a fake description {feed_id}",
+        )
+
+    async def test_publish(self):
+        """
+        Publish a feed.
+
+        test 1: every subscriber receives the feed
+        """
+        hub = FeedHub()
+        subscribers = [hub.subscribe() for _ in range(3)]
+        await hub.publish(self.feed(1))
+        for subscriber in subscribers:
+            self.assertEqual(await subscriber.get(), self.feed(1))
+
+    async def test_unsubscribe(self):
+        """
+        Publish a feed after unsubscribe.
+
+        test 1: the subscriber receives nothing
+        """
+        hub = FeedHub()
+        subscriber = hub.subscribe()
+        hub.unsubscribe(subscriber)
+        await hub.publish(self.feed(1))
+        self.assertTrue(subscriber.queue.empty())
+
+    async def test_slow_subscriber_drop(self):
+        """
+        Publish more feeds than the queue size with the drop policy.
+
+        test 1: the oldest feeds are dropped
+        test 2: the subscriber is still subscribed
+        """
+        hub = FeedHub(queue_size=2, policy="drop")
+        subscriber = hub.subscribe()
+        for feed_id in range(1, 5):
+            await hub.publish(self.feed(feed_id))
+        self.assertEqual(subscriber.dropped, 2)
+        self.assertEqual((await subscriber.get()).id, 3)
+        self.assertEqual((await subscriber.get()).id, 4)
+        self.assertIn(subscriber, hub.subscribers)
+
+    async def test_slow_subscriber_disconnect(self):
+        """
+        Publish more feeds than the queue size with the disconnect policy.
+
+        test 1: the subscriber is closed and removed
+        test 2: the other subscribers are not affected
+        """
+        hub = FeedHub(queue_size=2, policy="disconnect")
+        slow = hub.subscribe()
+        fast = hub.subscribe()
+        for feed_id in range(1, 4):
+            await hub.publish(self.feed(feed_id))
+            await fast.get()
+        self.assertTrue(slow.closed)
+        self.assertIsNone(await slow.get())
+        self.assertNotIn(slow, hub.subscribers)
+        self.assertIn(fast, hub.subscribers)
+
+    async def test_publish_to_topics(self):
+        """
+        Publish feeds to subscribers of topics.
+
+        test 1: a feed reaches the subscribers of its origin or event only
+        test 2: topics change without subscribing again
+        """
+        hub = FeedHub()
+        everything = hub.subscribe()
+        origin = hub.subscribe(topics=hub.topics(origins=["fake.origin_1"]))
+        pair = hub.subscribe(topics=hub.topics(
+            origins=["fake.origin_1", "fake.origin_2"],
+            events=["A fake event 2"]))
+        await hub.publish(self.feed(1))
+        await hub.publish(self.feed(2))
+        self.assertEqual(everything.queue.qsize(), 2)
+        self.assertEqual((await origin.get()).id, 1)
+        self.assertTrue(origin.queue.empty())
+        self.assertEqual((await pair.get()).id, 2)
+        self.assertTrue(pair.queue.empty())
+
+        hub.unsubscribe_topics(subscriber=origin, topics=origin.topics)
+        hub.subscribe_topics(
+            subscriber=origin, topics=hub.topics(events=["A fake event 3"]))
+        await hub.publish(self.feed(1))
+        await hub.publish(self.feed(3))
+        self.assertEqual((await origin.get()).id, 3)
+        self.assertTrue(origin.queue.empty())
+
+    async def test_max_topics(self):
+        """
+        Subscribe to more topics than allowed.
+
+        test 1: FeedSubscriptionError is raised, no topic is added
+        test 2: unsubscribe removes the subscriber from its topics
+        """
+        hub = FeedHub(max_topics=2)
+        subscriber = hub.subscribe(topics=hub.topics(origins=["a"]))
+        with self.assertRaises(FeedSubscriptionError):
+            hub.subscribe_topics(
+                subscriber=subscriber, topics=hub.topics(events=["b", "c"]))
+        self.assertEqual(subscriber.topics, {("a", None)})
+
+        hub.unsubscribe(subscriber)
+        self.assertEqual(hub._topics, {})  # Noqa
+
+    async def test_max_subscribers(self):
+        """
+        Subscribe more subscribers than allowed.
+
+        test 1: FeedCapacityError is raised, the refusal is counted
+        test 2: an unsubscribe makes room for a new subscriber
+        test 3: an evicted subscriber is closed and counted
+        """
+        hub = FeedHub(max_subscribers=1)
+        subscriber = hub.subscribe()
+        self.assertTrue(hub.full)
+        with self.assertRaises(FeedCapacityError):
+            hub.subscribe()
+        self.assertEqual(hub.rejected, 1)
+
+        hub.unsubscribe(subscriber)
+        subscriber = hub.subscribe()
+        self.assertEqual(len(hub.subscribers), 1)
+
+        hub.evict(subscriber)
+        self.assertIsNone(await subscriber.get())
+        self.assertEqual(hub.evicted, 1)
+
+    async def test_sent_totals(self):
+        """
+        Count the frames sent to subscribers.
+
+        test 1: the counters of each subscriber are kept
+        test 2: the totals include the subscribers gone
+        """
+        hub = FeedHub()
+        first = hub.subscribe()
+        second = hub.subscribe()
+        first.sent(feeds=3, size=300)
+        second.sent(feeds=1, size=100)
+        self.assertEqual(first.stats().frames, 1)
+        self.assertEqual(first.stats().bytes, 300)
+
+        hub.unsubscribe(first)
+        totals = hub.sent_totals()
+        self.assertEqual((totals.id, totals.frames), (1, 2))
+        self.assertEqual((totals.feeds, totals.bytes), (4, 400))
+
+    async def test_batch_feeds(self):
+        """
+        Group the feeds of a subscriber into batches.
+
+        test 1: queued feeds are sent by batches of max_feeds
+        test 2: a batch waits no longer than the delay
+        test 3: the last batch is sent once the feeds end
+        """
+        hub = FeedHub()
+        subscriber = hub.subscribe()
+
+        async def feeds():
+            while True:
+                feed = await subscriber.get()
+                if feed is None:
+                    return
+                yield feed
+
+        for feed_id in range(1, 6):
+            await hub.publish(self.feed(feed_id))
+        batches = batch_feeds(feeds=feeds(), delay=0.01, max_feeds=2)
+        ids = [[feed.id for feed in await batches.__anext__()]
+               for _ in range(3)]
+        self.assertEqual(ids, [[1, 2], [3, 4], [5]])
+
+        await hub.publish(self.feed(6))
+        asyncio.get_running_loop().call_later(0.05, subscriber.close)
+        self.assertEqual(
+            [[feed.id for feed in batch] async for batch in batches], [[6]])
+
+    async def test_heartbeat_feeds(self):
+        """
+        Wait for feeds with heartbeats.
+
+        test 1: None is yielded while no feed comes
+        test 2: feeds are yielded as they come
+        """
+        hub = FeedHub()
+        subscriber = hub.subscribe()
+
+        async def feeds():
+            while True:
+                feed = await subscriber.get()
+                if feed is None:
+                    return
+                yield feed
+
+        stream = heartbeat_feeds(feeds=feeds(), interval=0.01)
+        self.assertIsNone(await stream.__anext__())
+        await hub.publish(self.feed(1))
+        self.assertEqual((await stream.__anext__()).id, 1)
+        subscriber.close()
+        self.assertEqual([feed async for feed in stream], [])
@@ -0,0 +1,84 @@
+"""Unit tests for metrics."""
+from unittest import TestCase
+
+from src.core.metrics import MetricsRegistry, resident_memory
+
+
+class TestMetricsRegistry(TestCase):
+
+    def test_render_histogram(self):
+        """
+        Render a histogram.
+
+        test 1: buckets are cumulative and end with +Inf
+        test 2: sum and count are rendered per label set
+        """
+        registry = MetricsRegistry()
+        histogram = registry.histogram(
+            "latency_seconds", "A latency.", labels=("route",),
+            buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 2.0):
+            histogram.observe("/feeds", value=value)
+
+        self.assertEqual(registry.render(), "\n".join([
+            "# HELP latency_seconds A latency.",
+            "# TYPE latency_seconds histogram",
+            'latency_seconds_bucket{route="/feeds",le="0.1"} 1',
+            'latency_seconds_bucket{route="/feeds",le="1"} 2',
+            'latency_seconds_bucket{route="/feeds",le="+Inf"} 3',
+            'latency_seconds_sum{route="/feeds"} 2.55',
+            'latency_seconds_count{route="/feeds"} 3',
+        ]) + "\n")
+
+    def test_render_gauge(self):
+        """
+        Render gauges.
+
+        test 1: a gauge is set by inc and dec
+        test 2: a collected gauge is read when rendered
+        """
+        registry = MetricsRegistry()
+        gauge = registry.gauge("in_flight", "In flight.")
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+        depths = {("a",): 3}
+        registry.gauge(
+            "depth", "Depth.", labels=("queue",), collect=lambda: depths)
+        depths[("b",)] = 1
+
+        lines = registry.render().splitlines()
+        self.assertIn("in_flight 1", lines)
+        self.assertIn('depth{queue="a"} 3', lines)
+        self.assertIn('depth{queue="b"} 1', lines)
+
+    def test_render_escaped_labels(self):
+        """
+        Render label values with quotes.
+
+        test 1: quotes and backslashes are escaped
+        """
+        registry = MetricsRegistry()
+        registry.counter("total", "Total.", labels=("path",)).inc('a"\\b')
+        self.assertIn('total{path="a\\"\\\\b"} 1', registry.render())
+
+    def test_register_twice(self):
+        """
+        Register two metrics with the same name.
+
+        test 1: ValueError is raised
+        """
+        registry = MetricsRegistry()
+        registry.counter("total", "Total.")
+        with self.assertRaises(ValueError):
+            registry.counter("total", "Total.")
+
+    def test_resident_memory(self):
+        """
+        Read the resident memory of the process.
+
+        test 1: a number of bytes, or None without /proc
+        """
+        memory = resident_memory()
+        if memory is not None:
+            self.assertGreater(memory, 0)
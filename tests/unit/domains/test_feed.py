@@ -1,7 +1,12 @@
 """Unit tests for feed."""
+import datetime
 from unittest import TestCase
 
-from src.domains.feed import Feed, FeedDetail
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.schema import CreateTable
+
+from src.domains.feed import Feed, FeedDetail, FeedCursor, FeedCursorError, \
+    FeedModel
 
 
 class TestFeedDomains(TestCase):
@@ -20,7 +25,26 @@ class TestFeedDomains(TestCase):
             "origin": "fake_origin",
             "event": "fake_event",
             "description": "fake_description",
-            "id": 1
+            "id": 1,
+            "created_at": datetime.datetime(2022, 4, 1, 12, 0),
         }
         feed_detail = FeedDetail(**feed_detail_data)
         self.assertEqual(feed_detail.dict(), feed_detail_data)
+
+    def test_feed_cursor(self):
+        cursor = FeedCursor(after_id=10)
+        self.assertEqual(FeedCursor.decode(cursor.encode()), cursor)
+        self.assertFalse(cursor.backward)
+        self.assertTrue(FeedCursor(before_id=10).backward)
+
+    def test_feed_cursor_invalid(self):
+        with self.assertRaises(FeedCursorError):
+            FeedCursor.decode("not-a-cursor")
+
+    def test_feed_table_primary_key(self):
+        # Partitioned by the migrations on Postgres, not by create_all.
+        for dialect in (postgresql.dialect(), sqlite.dialect()):
+            ddl = str(CreateTable(FeedModel.__table__).compile(
+                dialect=dialect))
+            self.assertIn("PRIMARY KEY (id)", ddl)
+            self.assertNotIn("PARTITION", ddl)